@@ -0,0 +1,122 @@
+"""Detection of DDoS-Guard / Cloudflare challenge pages.
+
+Building a soup of every error page is expensive during big crawls. Instead, the raw HTML is checked first:
+
+- The `<title>` is read from the first few KB of the page. A known challenge title is a positive verdict
+- Every selector needs some literal text (an id, a class, an URL) to be in the markup to match.
+  If none of those markers is in the HTML, the page is not a challenge page
+
+Only when a marker is found (or the title could not be read from the head), a full soup is built to run the selectors
+"""
+
+from __future__ import annotations
+
+import html
+import re
+from typing import TYPE_CHECKING
+
+from cyberdrop_dl.utils import css
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+
+_HEAD_SIZE: int = 1024 * 8
+_TITLE_REGEX = re.compile(r"<title[^>]*>(.*?)</title\s*>", re.IGNORECASE | re.DOTALL)
+_TITLE_TAG_REGEX = re.compile(r"<title[\s>]", re.IGNORECASE)
+
+
+class DDosGuard:
+    TITLES = ("Just a moment...", "DDoS-Guard")
+    SELECTORS = (
+        "#cf-challenge-running",
+        ".ray_id",
+        ".attack-box",
+        "#cf-please-wait",
+        "#challenge-spinner",
+        "#trk_jschal_js",
+        "#turnstile-wrapper",
+        ".lds-ring",
+    )
+    ALL_SELECTORS = ", ".join(SELECTORS)
+    # Literal text that must be in the HTML for any of the selectors to match
+    MARKERS = (
+        "cf-challenge-running",
+        "ray_id",
+        "attack-box",
+        "cf-please-wait",
+        "challenge-spinner",
+        "trk_jschal_js",
+        "turnstile-wrapper",
+        "lds-ring",
+    )
+
+
+class CloudflareTurnstile:
+    TITLES = ("Simpcity Cuck Detection", "Attention Required! | Cloudflare", "Sentinel CAPTCHA")
+    SELECTORS = (
+        "captchawrapper",
+        "cf-turnstile",
+        "script[src*='challenges.cloudflare.com/turnstile']",
+        "script:-soup-contains('Dont open Developer Tools')",
+    )
+    ALL_SELECTORS = ", ".join(SELECTORS)
+    MARKERS = (
+        "captchawrapper",
+        "cf-turnstile",
+        "challenges.cloudflare.com/turnstile",
+        "Dont open Developer Tools",
+    )
+
+
+_TITLES = frozenset(title.casefold() for title in DDosGuard.TITLES + CloudflareTurnstile.TITLES)
+_MARKERS_REGEX = re.compile("|".join(map(re.escape, DDosGuard.MARKERS + CloudflareTurnstile.MARKERS)), re.IGNORECASE)
+
+
+def quick_check(html_text: str) -> bool | None:
+    """Checks the raw HTML for challenge markers without parsing it.
+
+    Returns `True` or `False` if the verdict is certain, `None` if a full parse is required"""
+    head = html_text[:_HEAD_SIZE]
+    if match := _TITLE_REGEX.search(head):
+        if html.unescape(match.group(1)).casefold() in _TITLES:
+            return True
+    elif _TITLE_TAG_REGEX.search(html_text):
+        # The title does not fit in the head (or it is malformed)
+        return None
+
+    if _MARKERS_REGEX.search(html_text):
+        return None
+    return False
+
+
+def check_ddos_guard(soup: BeautifulSoup) -> bool:
+    if (title := soup.select_one("title")) and (title_str := title.string):
+        if any(title.casefold() == title_str.casefold() for title in DDosGuard.TITLES):
+            return True
+
+    return bool(soup.select_one(DDosGuard.ALL_SELECTORS))
+
+
+def check_cloudflare(soup: BeautifulSoup) -> bool:
+    if (title := soup.select_one("title")) and (title_str := title.string):
+        if any(title.casefold() == title_str.casefold() for title in CloudflareTurnstile.TITLES):
+            return True
+
+    return bool(soup.select_one(CloudflareTurnstile.ALL_SELECTORS))
+
+
+def check_soup(soup: BeautifulSoup) -> bool:
+    return check_ddos_guard(soup) or check_cloudflare(soup)
+
+
+def is_challenge_page(html_text: str) -> bool:
+    if (verdict := quick_check(html_text)) is not None:
+        return verdict
+    return check_soup(css.make_soup(html_text))
+
+
+async def is_challenge_page_async(html_text: str) -> bool:
+    if (verdict := quick_check(html_text)) is not None:
+        return verdict
+    return check_soup(await css.make_soup_async(html_text))
@@ -8,8 +8,11 @@ import weakref
 from http import HTTPStatus
 from typing import TYPE_CHECKING
 
-import aiofiles
+from aiohttp import ClientError
 
+from cyberdrop_dl.clients.download_segments import Segment, SegmentedDownload, get_state_file, plan_segments
+from cyberdrop_dl.clients.file_writer import FileWriter
+from cyberdrop_dl.clients.hls_stream import HlsStream, fetch_in_order
 from cyberdrop_dl.constants import FILE_FORMATS
 from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL
 from cyberdrop_dl.exceptions import DDOSGuardError, DownloadError, InvalidContentTypeError, SlowDownloadError
@@ -18,12 +21,14 @@ from cyberdrop_dl.utils.logger import log, log_debug
 from cyberdrop_dl.utils.utilities import get_size_or_none
 
 if TYPE_CHECKING:
-    from collections.abc import Callable, Coroutine, Generator, Mapping
+    from collections.abc import Callable, Coroutine, Generator, Mapping, Sequence
     from pathlib import Path
     from typing import Any
 
     import aiohttp
+    from yarl import URL
 
+    from cyberdrop_dl.clients.download_limiter import AdaptiveDownloadLimiter
     from cyberdrop_dl.data_structures.url_objects import MediaItem
     from cyberdrop_dl.managers.client_manager import ClientManager
     from cyberdrop_dl.managers.manager import Manager
@@ -44,6 +49,9 @@ class DownloadClient:
         self.manager = manager
         self.client_manager = client_manager
         self.download_speed_threshold = self.manager.config_manager.settings_data.runtime_options.slow_download_speed
+        self.max_segments_per_download = (
+            self.manager.config_manager.global_settings_data.rate_limiting_options.max_segments_per_download
+        )
         self._null_context = contextlib.nullcontext()
         self._server_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
         self._use_server_locks: set[str] = set()
@@ -94,13 +102,13 @@ class DownloadClient:
         download_headers = self._get_download_headers(domain, media_item.referer)
         downloaded_filename = await self.manager.db_manager.history_table.get_downloaded_filename(domain, media_item)
         download_dir = self.get_download_dir(media_item)
-        if media_item.is_segment:
-            media_item.partial_file = media_item.complete_file = download_dir / media_item.filename
-        else:
-            media_item.partial_file = download_dir / f"{downloaded_filename}.part"
+        self.manager.path_manager.add_download_folder(download_dir)
+        media_item.partial_file = download_dir / f"{downloaded_filename}.part"
 
         resume_point = 0
-        if media_item.partial_file and (size := await asyncio.to_thread(get_size_or_none, media_item.partial_file)):
+        # Segmented downloads resume each segment individually. Request the entire file to validate the saved state
+        has_segments_state = await asyncio.to_thread(get_state_file(media_item.partial_file).is_file)
+        if not has_segments_state and (size := await asyncio.to_thread(get_size_or_none, media_item.partial_file)):
             resume_point = size
             download_headers["Range"] = f"bytes={size}-"
 
@@ -112,8 +120,7 @@ class DownloadClient:
 
             await self.client_manager.check_http_status(resp, download=True)
 
-            if not media_item.is_segment:
-                _ = get_content_type(media_item.ext, resp.headers)
+            _ = get_content_type(media_item.ext, resp.headers)
 
             media_item.filesize = int(resp.headers.get("Content-Length", "0")) or None
             if not media_item.complete_file:
@@ -123,8 +130,6 @@ class DownloadClient:
                     self.manager.progress_manager.download_progress.add_skipped()
                     return False
                 if not proceed:
-                    if media_item.is_segment:
-                        return True
                     log(f"Skipping {media_item.url} as it has already been downloaded", 10)
                     self.manager.progress_manager.download_progress.add_previously_completed(False)
                     await self.process_completed(media_item, domain)
@@ -132,7 +137,11 @@ class DownloadClient:
 
                     return False
 
-            if resp.status != HTTPStatus.PARTIAL_CONTENT:
+            n_segments = self._get_number_of_segments(media_item, resp)
+            if n_segments <= 1 and has_segments_state:
+                await asyncio.to_thread(get_state_file(media_item.partial_file).unlink, missing_ok=True)
+
+            if resp.status != HTTPStatus.PARTIAL_CONTENT and n_segments <= 1:
                 await asyncio.to_thread(media_item.partial_file.unlink, missing_ok=True)
 
             if not media_item.datetime and (last_modified := get_last_modified(resp.headers)):
@@ -148,6 +157,11 @@ class DownloadClient:
                 )
                 media_item.set_task_id(task_id)
 
+            if n_segments > 1:
+                resp.release()
+                await self._download_segments(domain, media_item, resp.url, download_headers, n_segments)
+                return True
+
             self.manager.progress_manager.file_progress.advance_file(task_id, resume_point)
 
             await self._append_content(media_item, resp.content)
@@ -201,9 +215,17 @@ class DownloadClient:
         await check_free_space()
         await self._pre_download_check(media_item)
 
-        async with aiofiles.open(media_item.partial_file, mode="ab") as f:
+        media_item.hashes = {}
+        hashers = self.manager.hash_manager.get_download_hashers(media_item)
+        if hashers:
+            # Feed the hashers with the data already in the partial file (if any). New data is hashed as it is written
+            await self.manager.hash_manager.update_hashers(media_item.partial_file, hashers)
+
+        running = self.manager.states.RUNNING
+        async with FileWriter(media_item.partial_file, hashers=tuple(hashers.values())) as f:
             async for chunk in content.iter_chunked(self.client_manager.speed_limiter.chunk_size):
-                await self.manager.states.RUNNING.wait()
+                if not running.is_set():
+                    await running.wait()
                 await check_free_space()
                 chunk_size = len(chunk)
                 await self.client_manager.speed_limiter.acquire(chunk_size)
@@ -212,6 +234,186 @@ class DownloadClient:
                 check_download_speed()
 
         self._post_download_check(media_item, content)
+        media_item.hashes = {hash_type: hasher.hexdigest() for hash_type, hasher in hashers.items()}
+
+    def _get_number_of_segments(self, media_item: MediaItem, resp: aiohttp.ClientResponse) -> int:
+        """Returns the number of segments (parallel connections) to use to download this file.
+
+        `1` means the file will be downloaded with a single request (the default)"""
+        if (
+            self.max_segments_per_download <= 1
+            or not media_item.filesize
+            or resp.status != HTTPStatus.OK
+            or "bytes" not in resp.headers.get("Accept-Ranges", "").lower()
+            or resp.headers.get("Content-Encoding", "identity").lower() != "identity"
+        ):
+            return 1
+        return plan_segments(media_item.filesize, self.max_segments_per_download)
+
+    async def _download_segments(
+        self, domain: str, media_item: MediaItem, url: URL, download_headers: dict[str, str], n_segments: int
+    ) -> None:
+        """Downloads a file with multiple concurrent range requests, writing every segment in place.
+
+        The first connection uses the download slot already acquired by the downloader.
+        Additional connections are only opened if a global and a domain download slot are free at that moment"""
+        assert media_item.task_id is not None
+        assert media_item.filesize
+        task_id = media_item.task_id
+        check_free_space = self.make_free_space_checker(media_item)
+        check_download_speed = self.make_speed_checker(media_item)
+        await check_free_space()
+
+        def load_or_create_state() -> SegmentedDownload:
+            state = SegmentedDownload.load(media_item.partial_file, media_item.filesize)  # type: ignore[reportArgumentType]
+            if state is None:
+                state = SegmentedDownload.new(media_item.partial_file, media_item.filesize, n_segments)  # type: ignore[reportArgumentType]
+                state.preallocate()
+            return state
+
+        state = await asyncio.to_thread(load_or_create_state)
+        if resume_point := state.downloaded:
+            log(f"Resuming segmented download of {media_item.url} ({len(state.pending)} segments left)", 10)
+        self.manager.progress_manager.file_progress.advance_file(task_id, resume_point)
+
+        pending = state.pending
+        domain_slots = self.client_manager.get_download_limiter(domain)
+        global_slots = self.client_manager.global_download_slots
+
+        running = self.manager.states.RUNNING
+
+        async def download_segment(segment: Segment) -> None:
+            headers = download_headers | {"Range": segment.range_header}
+            already_downloaded = segment.downloaded
+            async with self.client_manager._download_session.get(url, headers=headers) as resp:
+                await self.client_manager.check_http_status(resp, download=True)
+                if resp.status != HTTPStatus.PARTIAL_CONTENT:
+                    msg = f"Server ignored range request for segment {segment.range_header}"
+                    raise DownloadError(status=HTTPStatus.RANGE_NOT_SATISFIABLE, message=msg)
+
+                writer = FileWriter(media_item.partial_file, offset=segment.offset)
+                try:
+                    async with writer:
+                        remaining = segment.remaining
+                        async for chunk in resp.content.iter_chunked(self.client_manager.speed_limiter.chunk_size):
+                            if not running.is_set():
+                                await running.wait()
+                            await check_free_space()
+                            chunk = chunk[:remaining]
+                            chunk_size = len(chunk)
+                            await self.client_manager.speed_limiter.acquire(chunk_size)
+                            await writer.write(chunk)
+                            remaining -= chunk_size
+                            self.manager.progress_manager.file_progress.advance_file(task_id, chunk_size)
+                            check_download_speed()
+                            if not remaining:
+                                break
+                finally:
+                    # Only what is actually on disk counts as downloaded
+                    segment.downloaded = already_downloaded + writer.written
+
+            if not segment.done:
+                raise DownloadError(status=HTTPStatus.INTERNAL_SERVER_ERROR, message="Incomplete segment")
+
+        async def worker(extra_slots: list[asyncio.Semaphore | AdaptiveDownloadLimiter]) -> None:
+            try:
+                while pending:
+                    await download_segment(pending.pop(0))
+                    await asyncio.to_thread(state.save)
+            finally:
+                for slot in extra_slots:
+                    slot.release()
+
+        async def acquire_free_slots() -> list[asyncio.Semaphore | AdaptiveDownloadLimiter]:
+            # Never wait for a slot, other downloads have priority over additional connections of this one
+            if domain_slots.locked() or global_slots.locked():
+                return []
+            slots = [domain_slots, global_slots]
+            for slot in slots:
+                await slot.acquire()  # Does not block, the semaphore is not locked
+            return slots
+
+        workers = [worker([])]
+        while len(workers) < min(n_segments, len(pending)) and (slots := await acquire_free_slots()):
+            workers.append(worker(slots))
+
+        log_debug(f"Downloading {media_item.url} in {len(pending)} segments using {len(workers)} connections", 20)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for coro in workers:
+                    tg.create_task(coro)
+        except ExceptionGroup as eg:
+            raise eg.exceptions[0] from None
+        finally:
+            await asyncio.to_thread(state.save)
+
+        await asyncio.to_thread(state.delete)
+
+    async def download_hls_stream(
+        self,
+        domain: str,
+        media_item: MediaItem,
+        segment_urls: Sequence[AbsoluteHttpURL],
+        output: Path,
+        *,
+        max_pending: int,
+        max_attempts: int,
+    ) -> None:
+        """Downloads every segment of an HLS playlist, appending them in order to `output`.
+
+        Up to `max_pending` segments are downloaded at the same time. Segments are kept in memory until all the previous
+        ones have been written. Each segment is retried up to `max_attempts` times.
+        Resumes from the last segment written by a previous attempt"""
+        assert media_item.task_id is not None
+        task_id = media_item.task_id
+        state = await asyncio.to_thread(HlsStream.load_or_create, output, len(segment_urls))
+        if state.written:
+            log(f"Resuming HLS download of {media_item.url} ({state.n_segments - state.written:,} segments left)", 10)
+        self.manager.progress_manager.file_progress.advance_file(task_id, state.size)
+        if state.done:
+            return
+
+        download_headers = self._get_download_headers(domain, media_item.referer)
+        check_free_space = self.make_free_space_checker(media_item)
+        check_download_speed = self.make_speed_checker(media_item)
+        await check_free_space()
+        running = self.manager.states.RUNNING
+
+        async def download_segment(index: int) -> bytes:
+            attempt = 1
+            while True:
+                try:
+                    return await self._fetch_hls_segment(segment_urls[index], download_headers)
+                except (DownloadError, ClientError, TimeoutError) as e:
+                    if attempt >= max_attempts:
+                        raise
+                    attempt += 1
+                    log_debug(f"Download of HLS segment #{index + 1} of {media_item.url} failed, retrying: {e!r}", 30)
+
+        segments = fetch_in_order(download_segment, range(state.written, state.n_segments), max_pending)
+        async with FileWriter(output, offset=state.size) as writer, contextlib.aclosing(segments):
+            async for index, content in segments:
+                if not running.is_set():
+                    await running.wait()
+                await check_free_space()
+                await writer.write(content)
+                await writer.flush()
+                state.written, state.size = index + 1, state.size + len(content)
+                await asyncio.to_thread(state.save)
+                self.manager.progress_manager.file_progress.advance_file(task_id, len(content))
+                check_download_speed()
+
+    async def _fetch_hls_segment(self, url: AbsoluteHttpURL, download_headers: dict[str, str]) -> bytes:
+        chunks: list[bytes] = []
+        async with self.client_manager._download_session.get(url, headers=download_headers) as resp:
+            await self.client_manager.check_http_status(resp, download=True)
+            async for chunk in resp.content.iter_chunked(self.client_manager.speed_limiter.chunk_size):
+                await self.client_manager.speed_limiter.acquire(len(chunk))
+                chunks.append(chunk)
+
+        if not chunks:
+            raise DownloadError(status=HTTPStatus.INTERNAL_SERVER_ERROR, message="HLS segment is empty")
+        return b"".join(chunks)
 
     def _pre_download_check(self, media_item: MediaItem) -> Coroutine[Any, Any, None]:
         def prepare() -> None:
@@ -257,7 +459,7 @@ class DownloadClient:
 
     async def download_file(self, domain: str, media_item: MediaItem) -> bool:
         """Starts a file."""
-        if self.manager.config.download_options.skip_download_mark_completed and not media_item.is_segment:
+        if self.manager.config.download_options.skip_download_mark_completed:
             log(f"Download Removed {media_item.url} due to mark completed option", 10)
             self.manager.progress_manager.download_progress.add_skipped()
             # set completed path
@@ -269,25 +471,23 @@ class DownloadClient:
 
         if downloaded:
             await asyncio.to_thread(media_item.partial_file.rename, media_item.complete_file)
-            if not media_item.is_segment:
-                proceed = self.client_manager.check_file_duration(media_item)
-                await self.manager.db_manager.history_table.add_duration(domain, media_item)
-                if not proceed:
-                    log(f"Download Skip {media_item.url} due to runtime restrictions", 10)
-                    await asyncio.to_thread(media_item.complete_file.unlink)
-                    await self.mark_incomplete(media_item, domain)
-                    self.manager.progress_manager.download_progress.add_skipped()
-                    return False
-                await self.process_completed(media_item, domain)
-                await self.handle_media_item_completion(media_item, downloaded=True)
+            await self.client_manager.probe_file_duration(media_item)
+            proceed = self.client_manager.check_file_duration(media_item)
+            await self.manager.db_manager.history_table.add_duration(domain, media_item)
+            if not proceed:
+                log(f"Download Skip {media_item.url} due to runtime restrictions", 10)
+                await asyncio.to_thread(media_item.complete_file.unlink)
+                await self.mark_incomplete(media_item, domain)
+                self.manager.progress_manager.download_progress.add_skipped()
+                return False
+            await self.process_completed(media_item, domain)
+            await self.handle_media_item_completion(media_item, downloaded=True)
         return downloaded
 
     """~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~"""
 
     async def mark_incomplete(self, media_item: MediaItem, domain: str) -> None:
         """Marks the media item as incomplete in the database."""
-        if media_item.is_segment:
-            return
         await self.manager.db_manager.history_table.insert_incompleted(domain, media_item)
 
     async def process_completed(self, media_item: MediaItem, domain: str) -> None:
@@ -340,11 +540,8 @@ class DownloadClient:
         proceed = True
         skip = False
 
-        if not TYPE_CHECKING:
-            log = log_debug if media_item.is_segment else globals()["log"]
-
         while True:
-            if expected_size and not media_item.is_segment:
+            if expected_size:
                 file_size_check = self.check_filesize_limits(media_item)
                 if not file_size_check:
                     log(f"Download Skip {media_item.url} due to filesize restrictions", 10)
@@ -376,7 +573,11 @@ class DownloadClient:
                     log(f"Found {downloaded_filename} locally, trying to resume")
                     assert media_item.filesize
                     size = media_item.partial_file.stat().st_size
-                    if size >= media_item.filesize != 0:
+                    if get_state_file(media_item.partial_file).is_file():
+                        # Segmented downloads are preallocated, the partial file always has the final size
+                        pass
+
+                    elif size >= media_item.filesize != 0:
                         log(f"Deleting partial file {media_item.partial_file}")
                         media_item.partial_file.unlink()
 
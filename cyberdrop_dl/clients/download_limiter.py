@@ -0,0 +1,136 @@
+"""Adaptive limit of simultaneous downloads per domain.
+
+Uses AIMD (additive increase, multiplicative decrease), same as TCP congestion control:
+
+- The limit is halved on errors that mean the server is overloaded or rate limiting us (429, 5xx, timeouts, slow downloads)
+- The limit grows by 1 after `limit` successful downloads in a row, as long as the throughput of each connection holds
+
+The limit never goes above the configured `max_simultaneous_downloads_per_domain` (or the crawler's own limit)"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import time
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Self
+
+from cyberdrop_dl.exceptions import DownloadError, SlowDownloadError
+from cyberdrop_dl.utils.logger import log
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+
+_DECREASE_COOLDOWN: float = 10  # seconds. Errors of downloads that were already running count as a single event
+_THROUGHPUT_DROP: float = 0.5  # Speed (relative to the average) to consider that a connection is slower than before
+_EWMA_ALPHA: float = 0.2
+_TIMEOUT_STATUSES = 999, "TimeoutError", "ClientConnectorError", "ServerDisconnectedError"
+
+
+def is_congestion_error(error: Exception) -> bool:
+    """Returns `True` if the error means that the server may be overloaded or rate limiting us"""
+    if isinstance(error, SlowDownloadError):
+        return True
+    if isinstance(error, TimeoutError):
+        return True
+    status = getattr(error, "status", None)
+    if isinstance(status, int) and status != 999:
+        return status == HTTPStatus.TOO_MANY_REQUESTS or status >= HTTPStatus.INTERNAL_SERVER_ERROR
+    return status in _TIMEOUT_STATUSES
+
+
+class AdaptiveDownloadLimiter:
+    """Semaphore with a limit that adapts to how the server responds."""
+
+    def __init__(self, domain: str, max_limit: int, min_limit: int = 1) -> None:
+        self.domain = domain
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.limit = max_limit
+        self.in_use: int = 0
+        self._waiters: collections.deque[asyncio.Future[None]] = collections.deque()
+        self._successes: int = 0
+        self._last_decrease: float = 0
+        self._avg_throughput: float | None = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(domain={self.domain!r}, limit={self.limit}, max_limit={self.max_limit}, in_use={self.in_use})"
+
+    @property
+    def is_throttled(self) -> bool:
+        return self.limit < self.max_limit
+
+    async def __aenter__(self) -> Self:
+        await self.acquire()
+        return self
+
+    async def __aexit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None
+    ) -> None:
+        self.release()
+
+    def locked(self) -> bool:
+        return self.in_use >= self.limit or any(not waiter.cancelled() for waiter in self._waiters)
+
+    async def acquire(self) -> bool:
+        if not self.locked():
+            self.in_use += 1
+            return True
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # We got a slot right before being cancelled. Give it to someone else
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        return True
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._wake_up_waiters()
+
+    def _wake_up_waiters(self) -> None:
+        while self._waiters and self.in_use < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_use += 1
+                waiter.set_result(None)
+
+    def record_success(self, size: int | None = None, elapsed: float | None = None) -> None:
+        """Updates the limit after a successful download of `size` bytes in `elapsed` seconds."""
+        if size and elapsed:
+            throughput = size / elapsed
+            if self._avg_throughput is None:
+                self._avg_throughput = throughput
+            else:
+                if throughput < self._avg_throughput * _THROUGHPUT_DROP:
+                    # Connections are getting slower, more connections will not help
+                    self._successes = 0
+                self._avg_throughput += _EWMA_ALPHA * (throughput - self._avg_throughput)
+
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_limit:
+            self._successes = 0
+            self.limit += 1
+            log(f"Increased download limit of {self.domain} to {self.limit}", 10)
+            self._wake_up_waiters()
+
+    def record_error(self, error: Exception) -> None:
+        """Updates the limit after a failed download."""
+        if not is_congestion_error(error):
+            return
+        self._successes = 0
+        now = time.monotonic()
+        if self.limit <= self.min_limit or now - self._last_decrease < _DECREASE_COOLDOWN:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit // 2)
+        reason = error.ui_failure if isinstance(error, DownloadError) else type(error).__name__
+        log(f"Reduced download limit of {self.domain} to {self.limit} ({reason})", 30)
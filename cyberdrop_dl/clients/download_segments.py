@@ -0,0 +1,116 @@
+"""State of multi-connection (segmented) downloads.
+
+Each segmented download keeps a small JSON file next to its `.part` file with the byte ranges of every segment
+and how much of each one has already been written. This allows resuming every range independently"""
+
+from __future__ import annotations
+
+import dataclasses
+from typing import TYPE_CHECKING, Any, Self
+
+from cyberdrop_dl.utils import json
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+STATE_FILE_SUFFIX = ".cdl_segments"
+MIN_SEGMENT_SIZE: int = 1024 * 1024 * 16  # 16MB
+
+
+@dataclasses.dataclass(slots=True)
+class Segment:
+    start: int
+    end: int  # inclusive, same as the HTTP `Range` header
+    downloaded: int = 0
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start + 1
+
+    @property
+    def remaining(self) -> int:
+        return self.size - self.downloaded
+
+    @property
+    def offset(self) -> int:
+        """Absolute position in the file of the next byte to write"""
+        return self.start + self.downloaded
+
+    @property
+    def done(self) -> bool:
+        return self.downloaded >= self.size
+
+    @property
+    def range_header(self) -> str:
+        return f"bytes={self.offset}-{self.end}"
+
+
+@dataclasses.dataclass(slots=True)
+class SegmentedDownload:
+    file: Path
+    size: int
+    segments: list[Segment]
+
+    @property
+    def state_file(self) -> Path:
+        return get_state_file(self.file)
+
+    @property
+    def downloaded(self) -> int:
+        return sum(segment.downloaded for segment in self.segments)
+
+    @property
+    def pending(self) -> list[Segment]:
+        return [segment for segment in self.segments if not segment.done]
+
+    @classmethod
+    def new(cls, file: Path, size: int, n_segments: int) -> Self:
+        """Splits `size` bytes into `n_segments` ranges of (almost) the same size"""
+        n_segments = max(1, n_segments)
+        segment_size, extra = divmod(size, n_segments)
+        segments: list[Segment] = []
+        start = 0
+        for index in range(n_segments):
+            end = start + segment_size + (1 if index < extra else 0) - 1
+            segments.append(Segment(start, end))
+            start = end + 1
+        return cls(file, size, segments)
+
+    @classmethod
+    def load(cls, file: Path, size: int) -> Self | None:
+        """Reads the saved state of `file`.
+
+        Returns `None` if there is no state or if it does not match the expected `size`"""
+        try:
+            data: dict[str, Any] = json.loads(get_state_file(file).read_text(encoding="utf-8"))
+            segments = [Segment(**segment) for segment in data["segments"]]
+            state = cls(file, data["size"], segments)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        if state.size != size or not file.is_file() or file.stat().st_size != size:
+            return None
+        return state
+
+    def save(self) -> None:
+        data = {"size": self.size, "segments": self.segments}
+        self.state_file.write_text(json.dumps(data), encoding="utf-8")
+
+    def delete(self) -> None:
+        self.state_file.unlink(missing_ok=True)
+
+    def preallocate(self) -> None:
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        with self.file.open("wb") as f:
+            f.truncate(self.size)
+        self.save()
+
+
+def get_state_file(file: Path) -> Path:
+    return file.with_name(file.name + STATE_FILE_SUFFIX)
+
+
+def plan_segments(size: int, max_segments: int) -> int:
+    """Number of segments to use for a file of `size` bytes. Returns `1` if the file is too small to split"""
+    return max(1, min(max_segments, size // MIN_SEGMENT_SIZE))
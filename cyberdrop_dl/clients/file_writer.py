@@ -0,0 +1,140 @@
+"""Buffered file writer for downloads.
+
+Small network chunks are coalesced into bigger buffers and written by a dedicated thread pool,
+with at most one write in flight per file. If the disk can not keep up, `write` waits for the previous write,
+which stops reading from the socket (backpressure).
+
+Optionally, the data can be hashed as it is written (on the same thread, in order), so the file does not
+need to be read again after the download to hash it"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Self
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+    from pathlib import Path
+    from types import TracebackType
+    from typing import Any
+
+
+BUFFER_SIZE: int = 1024 * 1024 * 4  # 4MB
+_MAX_WORKERS: int = 4
+_IOV_MAX: int = 1024  # Max number of buffers per `writev` call on most systems
+_HAS_PWRITEV = hasattr(os, "pwritev")
+
+
+@functools.cache
+def _get_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=_MAX_WORKERS, thread_name_prefix="cdl_file_writer")
+
+
+def _write_all(fd: int, buffers: list[memoryview], offset: int, hashers: Sequence[Any] = ()) -> None:
+    """Writes all `buffers` at `offset`. Handles partial writes"""
+    for hasher in hashers:
+        for buffer in buffers:
+            hasher.update(buffer)
+    while buffers:
+        batch = buffers[:_IOV_MAX]
+        if _HAS_PWRITEV:
+            written = os.pwritev(fd, batch, offset)
+        else:  # Windows
+            _ = os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, b"".join(batch))
+        offset += written
+        while written:
+            first = buffers[0]
+            if written >= len(first):
+                written -= len(first)
+                del buffers[0]
+            else:
+                buffers[0] = first[written:]
+                written = 0
+
+
+def _close_after_write(fd: int, future: asyncio.Future[None]) -> None:
+    _ = future.exception()
+    os.close(fd)
+
+
+class FileWriter:
+    """Async writer for a single file.
+
+    Writes at `offset` (or at the end of the file if `offset` is `None`). Use it as an async context manager.
+
+    Every `hashers` object (`hashlib` / `xxhash` like) is updated with the written data, in order"""
+
+    def __init__(
+        self, path: Path, offset: int | None = None, buffer_size: int = BUFFER_SIZE, hashers: Sequence[Any] = ()
+    ) -> None:
+        self.path = path
+        self.offset = offset
+        self.buffer_size = buffer_size
+        self.hashers = hashers
+        self._fd: int | None = None
+        self._buffers: list[memoryview] = []
+        self._buffered: int = 0
+        self._pending_write: asyncio.Future[None] | None = None
+        self._pending_size: int = 0
+        self.written: int = 0
+        """Number of bytes already written to disk"""
+
+    async def __aenter__(self) -> Self:
+        flags = os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        self._fd = await asyncio.to_thread(os.open, self.path, flags, 0o666)
+        if self.offset is None:
+            self.offset = await asyncio.to_thread(os.lseek, self._fd, 0, os.SEEK_END)
+        return self
+
+    async def __aexit__(
+        self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None
+    ) -> None:
+        assert self._fd is not None
+        try:
+            if exc_type is None:
+                await self.flush()
+            else:
+                # Data already received is still valid. Write it to be able to resume from it
+                with contextlib.suppress(OSError):
+                    await self.flush()
+        finally:
+            fd, self._fd = self._fd, None
+            pending, self._pending_write = self._pending_write, None
+            if pending is not None and not pending.done():
+                # We were cancelled while the write was still running. Close the file after it finishes
+                pending.add_done_callback(functools.partial(_close_after_write, fd))
+            else:
+                await asyncio.to_thread(os.close, fd)
+
+    async def write(self, chunk: bytes) -> None:
+        self._buffers.append(memoryview(chunk))
+        self._buffered += len(chunk)
+        if self._buffered >= self.buffer_size:
+            await self._submit()
+
+    async def flush(self) -> None:
+        await self._submit()
+        await self._wait_pending_write()
+
+    async def _wait_pending_write(self) -> None:
+        if self._pending_write is not None:
+            await asyncio.shield(self._pending_write)
+            self._pending_write = None
+            self.written += self._pending_size
+
+    async def _submit(self) -> None:
+        await self._wait_pending_write()
+        if not self._buffers:
+            return
+        assert self._fd is not None and self.offset is not None
+        buffers, offset = self._buffers, self.offset
+        self.offset += self._buffered
+        self._pending_size = self._buffered
+        self._buffers, self._buffered = [], 0
+        loop = asyncio.get_running_loop()
+        self._pending_write = loop.run_in_executor(_get_executor(), _write_all, self._fd, buffers, offset, self.hashers)
@@ -8,9 +8,9 @@ from http.cookies import SimpleCookie
 from typing import TYPE_CHECKING, Any
 
 import aiohttp
-from bs4 import BeautifulSoup
 from multidict import CIMultiDict, CIMultiDictProxy
 
+from cyberdrop_dl.clients import ddos_guard
 from cyberdrop_dl.compat import StrEnum
 from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL
 from cyberdrop_dl.exceptions import DDOSGuardError
@@ -123,8 +123,7 @@ class FlareSolverr:
             f"\n  Flaresolverr: '{solution.user_agent}'"
         )
 
-        soup = BeautifulSoup(solution.content, "html.parser")
-        if self.manager.client_manager.check_ddos_guard(soup) or self.manager.client_manager.check_cloudflare(soup):
+        if ddos_guard.is_challenge_page(solution.content):
             if solution.user_agent != cdl_user_agent:
                 raise DDOSGuardError(mismatch_ua_msg)
 
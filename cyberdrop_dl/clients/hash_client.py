@@ -1,23 +1,33 @@
 from __future__ import annotations
 
 import asyncio
-from collections import defaultdict
+import os
+from collections import Counter, defaultdict
 from pathlib import Path
 from typing import TYPE_CHECKING, Literal
 
+import xxhash
 from send2trash import send2trash
 
 from cyberdrop_dl.data_structures.hash import Hashing
 from cyberdrop_dl.ui.prompts.basic_prompts import enter_to_continue
 from cyberdrop_dl.utils.logger import log
 from cyberdrop_dl.utils.utilities import get_size_or_none
+from cyberdrop_dl.utils.walker import TreeWalker
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
     from yarl import URL
 
     from cyberdrop_dl.config.config_model import DupeCleanup
     from cyberdrop_dl.data_structures.url_objects import MediaItem
     from cyberdrop_dl.managers.manager import Manager
+    from cyberdrop_dl.managers.path_manager import CompletedDownload
+
+
+MAX_HASHING_WORKERS: int = min(8, os.cpu_count() or 1)
+_PARTIAL_HASH_CHUNK_SIZE: int = 1024 * 64  # 64KB
 
 
 def hash_directory_scanner(manager: Manager, path: Path) -> None:
@@ -40,7 +50,7 @@ class HashClient:
         self.xxhash = "xxh128"
         self.md5 = "md5"
         self.sha256 = "sha256"
-        self.hashed_media_items: set[MediaItem] = set()
+        self.hashed_files: set[Path] = set()
         self.hashes_dict: defaultdict[str, defaultdict[int, set[Path]]] = defaultdict(lambda: defaultdict(set))
         self._sem = asyncio.BoundedSemaphore(20)
 
@@ -56,6 +66,15 @@ class HashClient:
     def dupe_cleanup_options(self) -> DupeCleanup:
         return self.manager.config.dupe_cleanup_options
 
+    @property
+    def hash_types(self) -> list[str]:
+        hash_types = [self.xxhash]
+        if self.dupe_cleanup_options.add_md5_hash:
+            hash_types.append(self.md5)
+        if self.dupe_cleanup_options.add_sha256_hash:
+            hash_types.append(self.sha256)
+        return hash_types
+
     async def startup(self) -> None:
         pass
 
@@ -67,70 +86,84 @@ class HashClient:
         ):
             if not await asyncio.to_thread(path.is_dir):
                 raise NotADirectoryError
-            for file in path.rglob("*"):
-                _ = await self.update_db_and_retrive_hash(file)
-
-    async def hash_item(self, media_item: MediaItem) -> None:
-        if media_item.is_segment:
-            return
-        hash = await self.update_db_and_retrive_hash(
-            media_item.complete_file, media_item.original_filename, media_item.referer
-        )
-        await self.save_hash_data(media_item, hash)
+            semaphore = asyncio.BoundedSemaphore(MAX_HASHING_WORKERS * 2)
+
+            async def hash_file(file: Path) -> None:
+                try:
+                    _ = await self.update_db_and_retrive_hash(file)
+                except Exception as e:
+                    log(f"Error hashing '{file}' : {e}", 40, exc_info=True)
+                finally:
+                    semaphore.release()
+
+            async with asyncio.TaskGroup() as tg:
+                async for batch in TreeWalker(path).iter_batches_async():
+                    for entry in batch:
+                        if not entry.is_file():
+                            continue
+                        await semaphore.acquire()
+                        tg.create_task(hash_file(Path(entry.path)))
 
     async def hash_item_during_download(self, media_item: MediaItem) -> None:
-        if media_item.is_segment:
-            return
         if self.manager.config_manager.settings_data.dupe_cleanup_options.hashing != Hashing.IN_PLACE:
             return
         await self.manager.states.RUNNING.wait()
         try:
             assert media_item.original_filename
             hash = await self.update_db_and_retrive_hash(
-                media_item.complete_file, media_item.original_filename, media_item.referer
+                media_item.complete_file, media_item.original_filename, media_item.referer, media_item.hashes
             )
             await self.save_hash_data(media_item, hash)
         except Exception as e:
             log(f"After hash processing failed: '{media_item.complete_file}' with error {e}", 40, exc_info=True)
 
     async def update_db_and_retrive_hash(
-        self, file: Path | str, original_filename: str | None = None, referer: URL | None = None
+        self,
+        file: Path | str,
+        original_filename: str | None = None,
+        referer: URL | None = None,
+        known_hashes: Mapping[str, str] | None = None,
     ) -> str | None:
+        """Adds the hashes of the file to the database and returns its xxh128 hash.
+
+        `known_hashes` are hashes computed while downloading the file. The file will only be read to compute missing hashes"""
         file = Path(file)
-        if file.suffix in (".cdl_hls", ".cdl_hsl", ".part"):
+        if file.suffix in (".cdl_hls", ".cdl_hsl", ".cdl_segments", ".part"):
             return
         if not await asyncio.to_thread(get_size_or_none, file):
             return
-        hash = await self._update_db_and_retrive_hash_helper(file, original_filename, referer, hash_type=self.xxhash)
-        if self.manager.config_manager.settings_data.dupe_cleanup_options.add_md5_hash:
-            await self._update_db_and_retrive_hash_helper(file, original_filename, referer, hash_type=self.md5)
-        if self.manager.config_manager.settings_data.dupe_cleanup_options.add_sha256_hash:
-            await self._update_db_and_retrive_hash_helper(file, original_filename, referer, hash_type=self.sha256)
-        return hash
-
-    async def _update_db_and_retrive_hash_helper(
+        hashes = await self._update_db_and_retrive_hashes(
+            file, original_filename, referer, self.hash_types, known_hashes or {}
+        )
+        return hashes.get(self.xxhash)
+
+    async def _update_db_and_retrive_hashes(
         self,
-        file: Path | str,
+        file: Path,
         original_filename: str | None,
         referer: URL | None,
-        hash_type: str,
-    ) -> str | None:
-        """Generates hash of a file."""
+        hash_types: list[str],
+        known_hashes: Mapping[str, str],
+    ) -> dict[str, str]:
+        """Generates all the missing hashes of a file in a single pass."""
         self.manager.progress_manager.hash_progress.update_currently_hashing(file)
-        hash = await self.manager.db_manager.hash_table.get_file_hash_exists(file, hash_type)
+        hashes: dict[str, str] = {}
         try:
-            if not hash:
-                hash = await self.manager.hash_manager.hash_file(file, hash_type)
-                await self.manager.db_manager.hash_table.insert_or_update_hash_db(
-                    hash,
-                    hash_type,
-                    file,
-                    original_filename,
-                    referer,
-                )
-                self.manager.progress_manager.hash_progress.add_new_completed_hash(hash_type)
-            else:
-                self.manager.progress_manager.hash_progress.add_prev_hash()
+            for hash_type in hash_types:
+                if hash := known_hashes.get(hash_type):
+                    hashes[hash_type] = hash
+                    self.manager.progress_manager.hash_progress.add_new_completed_hash(hash_type)
+                elif hash := await self.manager.db_manager.hash_table.get_file_hash_exists(file, hash_type):
+                    hashes[hash_type] = hash
+                    self.manager.progress_manager.hash_progress.add_prev_hash()
+
+            if missing := [hash_type for hash_type in hash_types if hash_type not in hashes]:
+                new_hashes = await self.manager.hash_manager.hash_file_multi(file, missing)
+                for hash_type in new_hashes:
+                    self.manager.progress_manager.hash_progress.add_new_completed_hash(hash_type)
+                hashes.update(new_hashes)
+
+            for hash_type, hash in hashes.items():
                 await self.manager.db_manager.hash_table.insert_or_update_hash_db(
                     hash,
                     hash_type,
@@ -140,16 +173,16 @@ class HashClient:
                 )
         except Exception as e:
             log(f"Error hashing '{file}' : {e}", 40, exc_info=True)
-        else:
-            return hash
+            return {}
+        return hashes
 
     async def save_hash_data(self, media_item: MediaItem, hash: str | None) -> None:
         if not hash:
             return
-        absolute_path = await asyncio.to_thread(media_item.complete_file.resolve)
+        absolute_path = await asyncio.to_thread(media_item.complete_file.absolute)
         size = await asyncio.to_thread(get_size_or_none, media_item.complete_file)
         assert size
-        self.hashed_media_items.add(media_item)
+        self.hashed_files.add(media_item.complete_file)
         if hash:
             media_item.hash = hash
         self.hashes_dict[hash][size].add(absolute_path)
@@ -162,27 +195,19 @@ class HashClient:
         if self.manager.config_manager.settings_data.runtime_options.ignore_history:
             return
         with self.manager.live_manager.get_hash_live(stop=True):
-            file_hashes_dict = await self.get_file_hashes_dict()
+            dupes = await self.find_dupes()
         with self.manager.live_manager.get_remove_file_via_hash_live(stop=True):
-            await self.final_dupe_cleanup(file_hashes_dict)
+            await self.final_dupe_cleanup(dupes)
 
-    async def final_dupe_cleanup(self, final_dict: dict[str, dict]) -> None:
+    async def final_dupe_cleanup(self, dupes: dict[str, list[Path]]) -> None:
         """cleanup files based on dedupe setting"""
 
-        get_matches = self.manager.db_manager.hash_table.get_files_with_hash_matches
         async with asyncio.TaskGroup() as tg:
-
-            async def delete_dupes(hash_value: str, size: int) -> None:
-                db_matches = await get_matches(hash_value, size, "xxh128")
-                for row in db_matches[1:]:
-                    file = Path(row["folder"], row["download_filename"])
+            for hash_value, files in dupes.items():
+                for file in files[1:]:
                     await self._sem.acquire()
                     tg.create_task(self._delete_and_log(file, hash_value))
 
-            for hash_value, size_dict in final_dict.items():
-                for size in size_dict:
-                    tg.create_task(delete_dupes(hash_value, size))
-
     async def _delete_and_log(self, file: Path, xxh128_value: str) -> None:
         hash_string = f"xxh128:{xxh128_value}"
         try:
@@ -203,24 +228,117 @@ class HashClient:
         finally:
             self._sem.release()
 
-    async def get_file_hashes_dict(self) -> dict:
-        """Get a dictionary of files based on matching file hashes and file size."""
-        downloads = self.manager.path_manager.completed_downloads - self.hashed_media_items
+    async def find_dupes(self) -> dict[str, list[Path]]:
+        """Finds files downloaded in this run with the same content as other files.
+
+        Files are grouped by size first (from the database). Only files with the same size as another file are hashed,
+        using a partial hash (start and end of the file) to discard most of them before reading the entire file.
 
-        async def exists(item: MediaItem) -> MediaItem | None:
-            if await asyncio.to_thread(item.complete_file.is_file):
-                return item
+        Returns a mapping of `xxh128` to files, in the order they were added to the database"""
+        new_files = await self._get_new_files()
+        rows = await self.manager.db_manager.hash_table.get_files_with_size_matches(new_files.values(), self.xxhash)
+        size_groups: defaultdict[int, dict[Path, str | None]] = defaultdict(dict)
+        for row in rows:
+            size_groups[row["file_size"]][Path(row["folder"], row["download_filename"])] = row["hash"]
 
-        results = await asyncio.gather(*(exists(item) for item in downloads))
-        for media_item in results:
-            if media_item is None:
+        dupes: dict[str, list[Path]] = {}
+        semaphore = asyncio.BoundedSemaphore(MAX_HASHING_WORKERS * 2)
+
+        async def find_dupes_in_group(size: int, group: dict[Path, str | None]) -> None:
+            async with semaphore:
+                hashes = await self._hash_size_group(size, group)
+            for hash_value, files in _group_by_hash(hashes).items():
+                if any(file in new_files for file in files):
+                    dupes[hash_value] = files
+
+        async with asyncio.TaskGroup() as tg:
+            for size, group in size_groups.items():
+                if len(group) > 1:
+                    tg.create_task(find_dupes_in_group(size, group))
+        return dupes
+
+    async def _get_new_files(self) -> dict[Path, int]:
+        """Returns the path and size of every file downloaded in this run.
+
+        Files that were not hashed during the download are added to the database, so they can be grouped by size"""
+        new_files = {
+            file: size for size_dict in self.hashes_dict.values() for size, files in size_dict.items() for file in files
+        }
+        downloads = [
+            download
+            for download in self.manager.path_manager.completed_downloads
+            if download.file not in self.hashed_files
+        ]
+        rows = await asyncio.to_thread(_get_file_rows, downloads)
+        await self.manager.db_manager.hash_table.insert_or_update_files(rows)
+        for folder, download_filename, _, size, _, _ in rows:
+            new_files[Path(folder, download_filename)] = size
+        return new_files
+
+    async def _hash_size_group(self, size: int, group: dict[Path, str | None]) -> dict[Path, str]:
+        """Returns the xxh128 hash of every file in a group of files of the same size, hashing files if needed.
+
+        Files that do not exist anymore and files that can not have a duplicate (by partial hash) are not included"""
+        partial_hashes = await asyncio.to_thread(_get_partial_hashes, group, size)
+        counts = Counter(partial_hashes.values())
+        hashes: dict[Path, str] = {}
+        for file, partial_hash in partial_hashes.items():
+            if counts[partial_hash] < 2:
+                continue
+            if hash_value := group[file]:
+                hashes[file] = hash_value
+                self.manager.progress_manager.hash_progress.add_prev_hash()
                 continue
             try:
-                await self.hash_item(media_item)
+                new_hashes = await self.manager.hash_manager.hash_file_multi(file, self.hash_types)
+                for hash_type, hash_value in new_hashes.items():
+                    self.manager.progress_manager.hash_progress.add_new_completed_hash(hash_type)
+                    _ = await self.manager.db_manager.hash_table.insert_or_update_hashes(hash_value, hash_type, file)
             except Exception as e:
-                msg = f"Unable to hash file = {media_item.complete_file}: {e}"
-                log(msg, 40)
-        return self.hashes_dict
+                log(f"Error hashing '{file}' : {e}", 40, exc_info=True)
+            else:
+                hashes[file] = new_hashes[self.xxhash]
+        return hashes
+
+
+def _group_by_hash(hashes: dict[Path, str]) -> dict[str, list[Path]]:
+    groups: defaultdict[str, list[Path]] = defaultdict(list)
+    for file, hash_value in hashes.items():
+        groups[hash_value].append(file)
+    return {hash_value: files for hash_value, files in groups.items() if len(files) > 1}
+
+
+def _get_file_rows(downloads: Iterable[CompletedDownload]) -> list[tuple[str, str, str | None, int, str | None, int]]:
+    rows = []
+    for download in downloads:
+        file = download.file.absolute()
+        try:
+            stat = file.stat()
+        except OSError:
+            continue
+        referer = download.referer or None
+        rows.append(
+            (str(file.parent), file.name, download.original_filename, stat.st_size, referer, int(stat.st_mtime))
+        )
+    return rows
+
+
+def _get_partial_hashes(files: Iterable[Path], size: int) -> dict[Path, str]:
+    """Returns the xxh128 of the first and last `_PARTIAL_HASH_CHUNK_SIZE` bytes of every file that exists.
+
+    For small files, this is the hash of the entire file"""
+    partial_hashes: dict[Path, str] = {}
+    for file in files:
+        try:
+            with file.open("rb") as fp:
+                hasher = xxhash.xxh128(fp.read(_PARTIAL_HASH_CHUNK_SIZE))
+                if size > _PARTIAL_HASH_CHUNK_SIZE * 2:
+                    _ = fp.seek(-_PARTIAL_HASH_CHUNK_SIZE, os.SEEK_END)
+                hasher.update(fp.read())
+        except OSError:
+            continue
+        partial_hashes[file] = hasher.hexdigest()
+    return partial_hashes
 
 
 async def _delete_file(path: Path, to_trash: bool = True) -> bool:
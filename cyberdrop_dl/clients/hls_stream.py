@@ -0,0 +1,104 @@
+"""State and ordering helpers of HLS downloads.
+
+The segments of a playlist are fetched concurrently, but they are appended in order to a single `.ts` file.
+Segments that arrive before the previous ones wait in memory, so at most `max_pending` segments are buffered at any time.
+
+A small JSON file next to the output keeps the number of segments already written and the size of the output at that
+point. Resuming truncates the output to that size (dropping any half written segment) and continues with the next one"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import dataclasses
+from typing import TYPE_CHECKING, Any, Self, TypeVar
+
+from cyberdrop_dl.utils import json
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Callable, Coroutine, Iterable
+    from pathlib import Path
+
+
+STATE_FILE_SUFFIX = ".cdl_hls"
+
+_T = TypeVar("_T")
+
+
+@dataclasses.dataclass(slots=True)
+class HlsStream:
+    file: Path
+    n_segments: int
+    written: int = 0  # Number of segments (from the start) already on disk
+    size: int = 0  # Size of the file after the last written segment
+
+    @property
+    def state_file(self) -> Path:
+        return get_state_file(self.file)
+
+    @property
+    def done(self) -> bool:
+        return self.written >= self.n_segments
+
+    @classmethod
+    def load(cls, file: Path, n_segments: int) -> Self | None:
+        """Reads the saved state of `file`.
+
+        Returns `None` if there is no state, if it is for a different playlist or if the file is missing some data"""
+        try:
+            data: dict[str, Any] = json.loads(get_state_file(file).read_text(encoding="utf-8"))
+            state = cls(file, **data)
+        except (OSError, ValueError, TypeError):
+            return None
+
+        if state.n_segments != n_segments or not file.is_file() or file.stat().st_size < state.size:
+            return None
+        return state
+
+    @classmethod
+    def load_or_create(cls, file: Path, n_segments: int) -> Self:
+        """Loads the saved state and truncates `file` to the last written segment. Starts from scratch if there is no state"""
+        state = cls.load(file, n_segments)
+        if state is None:
+            state = cls(file, n_segments)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with file.open("ab") as f:
+            f.truncate(state.size)
+        state.save()
+        return state
+
+    def save(self) -> None:
+        data = {"n_segments": self.n_segments, "written": self.written, "size": self.size}
+        self.state_file.write_text(json.dumps(data), encoding="utf-8")
+
+    def delete(self) -> None:
+        self.state_file.unlink(missing_ok=True)
+
+
+def get_state_file(file: Path) -> Path:
+    return file.with_name(file.name + STATE_FILE_SUFFIX)
+
+
+async def fetch_in_order(
+    fetch: Callable[[int], Coroutine[Any, Any, _T]], indexes: Iterable[int], max_pending: int
+) -> AsyncGenerator[tuple[int, _T]]:
+    """Runs `fetch` for every index concurrently and yields the results in the same order as `indexes`.
+
+    At most `max_pending` fetches (running or finished, but not yielded yet) exist at the same time.
+    If any fetch fails, the remaining ones are cancelled and the exception is raised"""
+    max_pending = max(1, max_pending)
+    indexes_iter = iter(indexes)
+    pending: collections.deque[tuple[int, asyncio.Task[_T]]] = collections.deque()
+    try:
+        while True:
+            while len(pending) < max_pending and (index := next(indexes_iter, None)) is not None:
+                pending.append((index, asyncio.create_task(fetch(index))))
+            if not pending:
+                return
+            index, task = pending.popleft()
+            yield index, await task
+    finally:
+        for _, task in pending:
+            _ = task.cancel()
+        if pending:
+            _ = await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
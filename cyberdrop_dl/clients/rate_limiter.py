@@ -0,0 +1,104 @@
+"""Request rate limiter that adapts to rate limiting responses (`429` / `503`) of a domain.
+
+- On a rate limiting response, all requests to the domain are paused for the time in the `Retry-After` header
+  (or an exponential backoff if the header is missing) and the rate is halved
+- After enough successful requests, the rate is increased gradually (10%) up to the configured rate of the domain
+
+The learned rates are saved to the cache file to start the next run at a safe pace"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from http import HTTPStatus
+
+from aiolimiter import AsyncLimiter
+
+from cyberdrop_dl.utils.dates import parse_http_date
+from cyberdrop_dl.utils.logger import log
+
+_RATE_LIMITED_STATUSES = HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.SERVICE_UNAVAILABLE
+_MAX_BACKOFF: float = 300  # seconds
+_MIN_RATE_FACTOR: float = 1 / 32  # Never go below this fraction of the original rate
+_RECOVERY_FACTOR: float = 1.1
+_RECOVERY_SUCCESSES: int = 20  # Successful requests required before increasing the rate
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parses the value of a `Retry-After` header (seconds or an HTTP-date) into seconds from now"""
+    if not value:
+        return None
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0, parse_http_date(value) - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter(AsyncLimiter):
+    __slots__ = ("_backoff_strikes", "_max_rate_per_sec", "_paused_until", "_successes", "domain")
+
+    def __init__(self, max_rate: float, time_period: float = 60, domain: str = "") -> None:
+        super().__init__(max_rate, time_period)
+        self.domain = domain
+        self._max_rate_per_sec = self._rate_per_sec
+        self._paused_until: float = 0
+        self._backoff_strikes: int = 0
+        self._successes: int = 0
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(domain={self.domain!r}, rate={self.rate:.2f}/s, max_rate={self._max_rate_per_sec:.2f}/s)"
+
+    @property
+    def rate(self) -> float:
+        """Current number of requests per second"""
+        return self._rate_per_sec
+
+    @property
+    def is_throttled(self) -> bool:
+        return self._rate_per_sec < self._max_rate_per_sec
+
+    def set_rate(self, rate: float) -> None:
+        min_rate = self._max_rate_per_sec * _MIN_RATE_FACTOR
+        self._rate_per_sec = max(min_rate, min(rate, self._max_rate_per_sec))
+        # Smaller bucket, so a lower rate can not be bypassed with a burst of requests
+        self.max_rate = max(1.0, self._rate_per_sec * self.time_period)
+
+    async def acquire(self, amount: float = 1) -> None:
+        if (delay := self._paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+        await super().acquire(amount)
+
+    def record_response(self, status: int, retry_after: str | None = None) -> None:
+        if status not in _RATE_LIMITED_STATUSES:
+            if status < HTTPStatus.BAD_REQUEST:
+                self._record_success()
+            return
+
+        self._successes = 0
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = min(_MAX_BACKOFF, 2**self._backoff_strikes)
+        self._backoff_strikes += 1
+        now = time.monotonic()
+        already_paused = self._paused_until > now
+        self._paused_until = max(self._paused_until, now + min(delay, _MAX_BACKOFF))
+        if already_paused:
+            return  # Responses to requests sent before the pause. Do not reduce the rate more than once
+
+        self.set_rate(self._rate_per_sec / 2)
+        msg = f"Rate limited by {self.domain} ({status}). Pausing requests for {delay:.0f}s, new rate: {self.rate:.2f} requests per second"
+        log(msg, 30)
+
+    def _record_success(self) -> None:
+        self._backoff_strikes = 0
+        if not self.is_throttled:
+            return
+        self._successes += 1
+        if self._successes >= _RECOVERY_SUCCESSES:
+            self._successes = 0
+            self.set_rate(self._rate_per_sec * _RECOVERY_FACTOR)
+            log(f"Increased request rate of {self.domain} to {self.rate:.2f} requests per second", 10)
@@ -10,15 +10,17 @@ import aiohttp.multipart
 from aiohttp import ClientResponse
 from aiohttp.client_reqrep import ContentDisposition
 from aiohttp_client_cache.response import CachedResponse
-from bs4 import BeautifulSoup
 from multidict import CIMultiDict, CIMultiDictProxy
 from propcache import under_cached_property
 
+from cyberdrop_dl.clients import ddos_guard
 from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL
 from cyberdrop_dl.exceptions import InvalidContentTypeError, ScrapeError
+from cyberdrop_dl.utils import css
 from cyberdrop_dl.utils.utilities import parse_url
 
 if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
     from curl_cffi.requests.models import Response as CurlResponse
 
     from cyberdrop_dl.clients.flaresolverr import FlareSolverrSolution
@@ -43,6 +45,7 @@ class AbstractResponse:
     _text: str = ""
     _cache: dict[str, Any] = dataclasses.field(init=False, default_factory=dict)
     _read_lock: asyncio.Lock = dataclasses.field(init=False, default_factory=asyncio.Lock)
+    _is_challenge_page: bool | None = dataclasses.field(init=False, default=None)
 
     @classmethod
     def from_resp(cls, response: ClientResponse | CachedResponse | CurlResponse) -> Self:
@@ -137,7 +140,16 @@ class AbstractResponse:
 
     async def soup(self, encoding: str | None = None) -> BeautifulSoup:
         self._check_content_type("text", "html", expecting="HTML")
-        return BeautifulSoup(await self.text(encoding), "html.parser")
+        return await css.make_soup_async(await self.text(encoding))
+
+    async def is_challenge_page(self) -> bool:
+        """Returns `True` if the response is a DDoS-Guard / Cloudflare challenge page. The verdict is cached"""
+        if self._is_challenge_page is None:
+            if "html" not in self.content_type:
+                self._is_challenge_page = False
+            else:
+                self._is_challenge_page = await ddos_guard.is_challenge_page_async(await self.text())
+        return self._is_challenge_page
 
     async def json(self, encoding: str | None = None, content_type: str | bool = True) -> Any:
         if self.status == 204:
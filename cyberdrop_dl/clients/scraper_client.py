@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
+import contextvars
 import time
 from datetime import datetime
 from json import dumps as json_dumps
@@ -9,6 +10,7 @@ from pathlib import Path
 from typing import TYPE_CHECKING, Any, cast
 
 import cyberdrop_dl.constants as constants
+from cyberdrop_dl.clients.rate_limiter import AdaptiveRateLimiter
 from cyberdrop_dl.clients.response import AbstractResponse
 from cyberdrop_dl.exceptions import DDOSGuardError
 from cyberdrop_dl.utils.cookie_management import make_simple_cookie
@@ -24,6 +26,11 @@ if TYPE_CHECKING:
     from cyberdrop_dl.managers.client_manager import ClientManager
 
 
+_CURRENT_RATE_LIMITER: contextvars.ContextVar[AdaptiveRateLimiter | None] = contextvars.ContextVar(
+    "_CURRENT_RATE_LIMITER", default=None
+)
+
+
 class ScraperClient:
     """AIOHTTP / CURL operations for scraping."""
 
@@ -40,7 +47,12 @@ class ScraperClient:
             domain_limiter = self.client_manager.get_rate_limiter(domain)
             async with self.client_manager.global_rate_limiter, domain_limiter:
                 await self.client_manager.manager.states.RUNNING.wait()
-                yield
+                adaptive_limiter = domain_limiter if isinstance(domain_limiter, AdaptiveRateLimiter) else None
+                token = _CURRENT_RATE_LIMITER.set(adaptive_limiter)
+                try:
+                    yield
+                finally:
+                    _CURRENT_RATE_LIMITER.reset(token)
 
     @contextlib.asynccontextmanager
     async def _request(
@@ -127,6 +139,8 @@ class ScraperClient:
         """Checks the HTTP response status and retries DDOS Guard errors with FlareSolverr.
 
         Returns an AbstractResponse confirmed to not be a DDOS Guard page."""
+        if limiter := _CURRENT_RATE_LIMITER.get():
+            limiter.record_response(abs_resp.status, abs_resp.headers.get("Retry-After"))
         try:
             await self.client_manager.check_http_status(abs_resp)
             return abs_resp
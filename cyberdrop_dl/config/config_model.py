@@ -183,6 +183,7 @@ class RuntimeOptions(BaseModel):
     console_log_level: NonNegativeInt = 100
     deep_scrape: bool = False
     delete_partial_files: bool = False
+    full_post_run_scan: bool = False
     ignore_history: bool = False
     jdownloader_autostart: bool = False
     jdownloader_download_dir: PathOrNone = None
@@ -200,6 +201,7 @@ class Sorting(BaseModel):
     sort_downloads: bool = False
     sort_folder: Path = DEFAULT_DOWNLOAD_STORAGE / "Cyberdrop-DL Sorted Downloads"
     sort_incrementer_format: NonEmptyStr = " ({i})"
+    sort_workers: NonNegativeInt = 0
     sorted_audio: NonEmptyStrOrNone = "{sort_dir}/{base_dir}/Audio/{filename}{ext}"
     sorted_image: NonEmptyStrOrNone = "{sort_dir}/{base_dir}/Images/{filename}{ext}"
     sorted_other: NonEmptyStrOrNone = "{sort_dir}/{base_dir}/Other/{filename}{ext}"
@@ -67,7 +67,12 @@ class RateLimiting(BaseModel):
     download_speed_limit: ByteSizeSerilized = ByteSize(0)
     file_host_cache_expire_after: timedelta = timedelta(days=7)
     forum_cache_expire_after: timedelta = timedelta(weeks=4)
+    input_queue_size: PositiveInt = 50
     jitter: NonNegativeFloat = 0
+    max_queued_downloads: PositiveInt = 10_000
+    max_queued_downloads_size: ByteSizeSerilized = ByteSize(0)
+    max_running_scrape_tasks: PositiveInt = 2_000
+    max_segments_per_download: PositiveInt = Field(1, le=16)
     max_simultaneous_downloads_per_domain: PositiveInt = 5
     max_simultaneous_downloads: PositiveInt = 15
     rate_limit: PositiveFloat = 25
@@ -11,14 +11,13 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import contextlib
 import dataclasses
 import datetime
 import re
 from abc import abstractmethod
 from typing import TYPE_CHECKING, ClassVar, Protocol, final
 
-from bs4 import BeautifulSoup, Tag
-
 from cyberdrop_dl.constants import HTTP_REGEX_LINKS
 from cyberdrop_dl.crawlers.crawler import Crawler
 from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL
@@ -31,6 +30,7 @@ if TYPE_CHECKING:
     from collections.abc import AsyncGenerator, Iterable, Sequence
 
     from aiohttp_client_cache.response import AnyResponse
+    from bs4 import BeautifulSoup, Tag
 
     from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL, ScrapeItem
 
@@ -98,6 +98,21 @@ class ForumPost:
             return to_timestamp(self.date)
 
 
+@dataclasses.dataclass(frozen=True, slots=True)
+class ParsedPost:
+    """Plain data of a post, extracted in a worker thread. It does not keep a reference to the soup"""
+
+    id: int
+    date: datetime.datetime | None
+    links: tuple[tuple[str, str], ...]  # (scraper_name, link)
+    error: Exception | None = None  # Raised by `process_parsed_post`, so it only fails this post
+
+    @property
+    def timestamp(self) -> TimeStamp | None:
+        if self.date:
+            return to_timestamp(self.date)
+
+
 class ForumPostProtocol(Protocol):
     # Concrete classes may define their own custom `ForumPost` class (ex: a Pydantic Model from an API response)
     # Those classes need to satisfy this Protocol to make sure they work with all of `MessageBoard` methods
@@ -372,9 +387,14 @@ class HTMLMessageBoardCrawler(MessageBoardCrawler, is_abc=True):
     - override `thumbnail_to_img`
 
     Concrete classes SHOULD define `ATTACHMENT_HOSTS` if internal images of the site are stored on servers with a different domain
+
+    After the first page of a thread, the remaining pages are requested concurrently (up to `MAX_CONCURRENT_PAGES`)
+    using the last page number from `SELECTORS.last_page`. Pages are still processed in order.
+    Set `MAX_CONCURRENT_PAGES` to `1` to follow the next page links one by one
     """
 
     IGNORE_EMBEDED_IMAGES_SRC = True
+    MAX_CONCURRENT_PAGES: ClassVar[int] = 4
     SELECTORS: ClassVar[MessageBoardSelectors]
     POST_URL_PART_NAME: ClassVar[str]
     PAGE_URL_PART_NAME: ClassVar[str]
@@ -420,7 +440,7 @@ class HTMLMessageBoardCrawler(MessageBoardCrawler, is_abc=True):
         if thread.url in self.scraped_threads:
             return
 
-        scrape_item.parent_threads.add(thread.url)
+        scrape_item.add_parent_thread(thread.url)
         if self.scrape_single_forum_post and not thread.post_id:
             msg = "`--scrape-single-forum-post` is `True`, but the provided URL has no post id"
             raise ScrapeError("User Error", msg)
@@ -431,28 +451,28 @@ class HTMLMessageBoardCrawler(MessageBoardCrawler, is_abc=True):
     async def process_thread(self, scrape_item: ScrapeItem, thread: ThreadProtocol) -> None:
         title: str = ""
         last_post_url = thread.url
-        async for soup in self.thread_pager(scrape_item):
-            if not title:
-                try:
-                    title = self.create_title(get_post_title(soup, self.SELECTORS), thread_id=thread.id)
-                except ScrapeError as e:
-                    self.log_debug("Got an unprocessable soup", 40, exc_info=e)
-                    raise
-                scrape_item.add_to_parent_title(title)
-
-            continue_scraping, last_post_url = self.process_thread_page(scrape_item, thread, soup)
-            if not continue_scraping:
-                break
+        async with contextlib.aclosing(self.thread_pager(scrape_item)) as pages:
+            async for soup in pages:
+                if not title:
+                    try:
+                        title = self.create_title(get_post_title(soup, self.SELECTORS), thread_id=thread.id)
+                    except ScrapeError as e:
+                        self.log_debug("Got an unprocessable soup", 40, exc_info=e)
+                        raise
+                    scrape_item.add_to_parent_title(title)
+
+                continue_scraping, last_post_url = await self.process_thread_page(scrape_item, thread, soup)
+                if not continue_scraping:
+                    break
 
         await self.write_last_forum_post(thread.url, last_post_url)
 
-    def process_thread_page(
+    async def process_thread_page(
         self, scrape_item: ScrapeItem, thread: ThreadProtocol, soup: BeautifulSoup
     ) -> tuple[bool, AbsoluteHttpURL]:
         continue_scraping = False
         post_url = thread.url
-        for article in soup.select(self.SELECTORS.posts.article):
-            current_post = ForumPost.new(article, self.SELECTORS.posts)
+        for current_post in await css.run_in_parser_pool(self.parse_posts, soup):
             continue_scraping, scrape_this_post = check_post_id(
                 thread.post_id, current_post.id, self.scrape_single_forum_post
             )
@@ -463,7 +483,7 @@ class HTMLMessageBoardCrawler(MessageBoardCrawler, is_abc=True):
                     possible_datetime=current_post.timestamp,
                     add_parent=post_url,
                 )
-                self.create_task(self.post(new_scrape_item, current_post))
+                self.create_task(self.process_parsed_post(new_scrape_item, current_post))
                 try:
                     scrape_item.add_children()
                 except MaxChildrenError:
@@ -473,34 +493,70 @@ class HTMLMessageBoardCrawler(MessageBoardCrawler, is_abc=True):
                 break
         return continue_scraping, post_url
 
+    def parse_posts(self, soup: BeautifulSoup) -> list[ParsedPost]:
+        """Extracts the id, date and links of every post in the page.
+
+        Runs in a worker thread: It must only use the soup and the (read only) config of the crawler"""
+        posts = []
+        for article in soup.select(self.SELECTORS.posts.article):
+            post = ForumPost.new(article, self.SELECTORS.posts)
+            try:
+                links = tuple(self.get_post_links(post))
+            except Exception as e:
+                posts.append(ParsedPost(post.id, post.date, (), e))
+            else:
+                posts.append(ParsedPost(post.id, post.date, links))
+        return posts
+
+    def get_post_links(self, post: ForumPostProtocol) -> Iterable[tuple[str, str]]:
+        for scraper in (
+            self._attachments,
+            self._images,
+            self._videos,
+            self._external_links,
+            self._embeds,
+            self._lazy_load_embeds,
+        ):
+            scraper_name = scraper.__name__.removeprefix("_")
+            for link in scraper(post):
+                yield scraper_name, link
+
     @error_handling_wrapper
     async def post(self, scrape_item: ScrapeItem, post: ForumPostProtocol) -> None:
+        await self._process_post_links(scrape_item, post.id, post.date, self.get_post_links(post))
+
+    @error_handling_wrapper
+    async def process_parsed_post(self, scrape_item: ScrapeItem, post: ParsedPost) -> None:
+        """Same as `post`, but for a post parsed by `parse_posts` in a worker thread."""
+        await self._process_post_links(scrape_item, post.id, post.date, post.links, post.error)
+
+    async def _process_post_links(
+        self,
+        scrape_item: ScrapeItem,
+        post_id: int,
+        post_date: datetime.datetime | None,
+        links: Iterable[tuple[str, str]],
+        error: Exception | None = None,
+    ) -> None:
         scrape_item.setup_as_post("")
-        post_title = self.create_separate_post_title(None, str(post.id), post.date)
+        post_title = self.create_separate_post_title(None, str(post_id), post_date)
         scrape_item.add_to_parent_title(post_title)
+        if error is not None:
+            raise error
         seen, duplicates, tasks = set(), set(), []
         stats: dict[str, int] = {}
         max_children_error: MaxChildrenError | None = None
         try:
-            for scraper in (
-                self._attachments,
-                self._images,
-                self._videos,
-                self._external_links,
-                self._embeds,
-                self._lazy_load_embeds,
-            ):
-                for link in scraper(post):
-                    duplicates.add(link) if link in seen else seen.add(link)
-                    scraper_name = scraper.__name__.removeprefix("_")
-                    stats[scraper_name] = stats.get(scraper_name, 0) + 1
-                    tasks.append(self.process_child(scrape_item, link, embeds="embeds" in scraper_name))
-                    scrape_item.add_children()
+            for scraper_name, link in links:
+                duplicates.add(link) if link in seen else seen.add(link)
+                stats[scraper_name] = stats.get(scraper_name, 0) + 1
+                tasks.append(self.process_child(scrape_item, link, embeds="embeds" in scraper_name))
+                scrape_item.add_children()
         except MaxChildrenError as e:
             max_children_error = e
 
         if seen:
-            self.log(f"[{self.FOLDER_DOMAIN}] post #{post.id} {stats = }")
+            self.log(f"[{self.FOLDER_DOMAIN}] post #{post_id} {stats = }")
         if duplicates:
             msg = f"Found duplicate links in post {scrape_item.parent}. Selectors are too generic: {duplicates}"
             self.log(msg, bug=True)
@@ -543,8 +599,29 @@ class HTMLMessageBoardCrawler(MessageBoardCrawler, is_abc=True):
             yield get_text_between(css.get_attr(lazy_media, selector.attribute), "loadMedia(this, '", "')")
 
     async def thread_pager(self, scrape_item: ScrapeItem) -> AsyncGenerator[BeautifulSoup]:
-        async for soup in self._web_pager(scrape_item.url, self.get_next_page):
-            yield soup
+        if self.MAX_CONCURRENT_PAGES <= 1 or self.scrape_single_forum_post:
+            # Do not request pages ahead if we are only going to scrape a single post
+            prefetch = 0 if self.scrape_single_forum_post else None
+            pager = self._web_pager(scrape_item.url, self.get_next_page, prefetch=prefetch)
+            async with contextlib.aclosing(pager) as pages:
+                async for soup in pages:
+                    yield soup
+            return
+
+        soup = await self.request_soup(scrape_item.url)
+        yield soup
+        if (page_urls := get_remaining_pages(soup, self.SELECTORS, self.PAGE_URL_PART_NAME)) is not None:
+            pages = (self.parse_url(page_url) for page_url in page_urls)
+            pager = self._ordered_pager(pages, self.MAX_CONCURRENT_PAGES)
+        elif next_page := self.get_next_page(soup):
+            # Unable to get the number of pages. Follow the next page links
+            pager = self._web_pager(self.parse_url(next_page), self.get_next_page)
+        else:
+            return
+
+        async with contextlib.aclosing(pager) as pages:
+            async for soup in pages:
+                yield soup
 
     def get_next_page(self, soup: BeautifulSoup) -> str | None:
         return css.select_one_get_attr_or_none(soup, *self.SELECTORS.next_page)
@@ -660,7 +737,7 @@ def get_thread_page_and_post(
 
 
 async def check_is_not_last_page(response: AnyResponse, selectors: MessageBoardSelectors) -> bool:
-    soup = BeautifulSoup(await response.text(), "html.parser")
+    soup = css.make_soup(await response.text())
     return not is_last_page(soup, selectors)
 
 
@@ -673,6 +750,28 @@ def is_last_page(soup: BeautifulSoup, selectors: MessageBoardSelectors) -> bool:
     return current_page == last_page
 
 
+def get_remaining_pages(soup: BeautifulSoup, selectors: MessageBoardSelectors, page_part_name: str) -> list[str] | None:
+    """Returns the links to every page after the current one, or `None` if the page numbers could not be found"""
+    try:
+        # The selector may match every page link. The last one is the last page
+        last_page = css.get_attr(soup.select(selectors.last_page.element)[-1], selectors.last_page.attribute)
+        current_page = css.select_one_get_attr(soup, *selectors.current_page)
+    except (AttributeError, IndexError, css.SelectorError):
+        return None
+
+    pattern = re.compile(rf"{re.escape(page_part_name)}[-/=]?(\d+)")
+    if not (matches := list(pattern.finditer(last_page))):
+        return None
+    last_page_match = matches[-1]
+    last_page_number = int(last_page_match.group(1))
+    current_page_matches = list(pattern.finditer(current_page))
+    current_page_number = int(current_page_matches[-1].group(1)) if current_page_matches else 1
+    start, end = last_page_match.span(1)
+    return [
+        f"{last_page[:start]}{page}{last_page[end:]}" for page in range(current_page_number + 1, last_page_number + 1)
+    ]
+
+
 def get_post_title(soup: BeautifulSoup, selectors: MessageBoardSelectors) -> str:
     try:
         title_block = css.select_one(soup, selectors.title.element)
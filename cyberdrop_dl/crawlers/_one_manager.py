@@ -91,4 +91,4 @@ class OneManagerCrawler(Crawler, is_abc=True):
             scrape_item.add_to_parent_title(part)
 
         # smugle url as as sentinel
-        scrape_item.parent_threads.add(self.PRIMARY_URL)
+        scrape_item.add_parent_thread(self.PRIMARY_URL)
@@ -3,14 +3,14 @@ from __future__ import annotations
 import itertools
 from typing import TYPE_CHECKING, Any, ClassVar
 
-from bs4 import BeautifulSoup
-
 from cyberdrop_dl.crawlers.crawler import Crawler, SupportedPaths, auto_task_id
 from cyberdrop_dl.exceptions import DDOSGuardError, PasswordProtectedError, ScrapeError
 from cyberdrop_dl.utils import css
 from cyberdrop_dl.utils.utilities import error_handling_wrapper, get_text_between
 
 if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
     from cyberdrop_dl.data_structures.url_objects import ScrapeItem
 
 
@@ -184,7 +184,7 @@ class YetiShareCrawler(Crawler, is_abc=True):
                 headers={"X-Requested-With": "XMLHttpRequest"},
             )
 
-            return BeautifulSoup(json_resp["html"].replace("\\", ""), "html.parser")
+            return css.make_soup(json_resp["html"].replace("\\", ""))
 
         soup = await ajax_api_request()
         if soup.select_one(Selector.PASSWORD_PROTECTED):
@@ -210,7 +210,7 @@ class YetiShareCrawler(Crawler, is_abc=True):
                 "submitme": 1,
             },
         )
-        soup = BeautifulSoup(content, "html.parser")
+        soup = css.make_soup(content)
 
         if soup.select_one(Selector.PASSWORD_PROTECTED):
             raise PasswordProtectedError("File password is invalid")
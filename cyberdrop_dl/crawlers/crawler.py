@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import asyncio
+import collections
 import contextlib
+import contextvars
 import datetime
 import inspect
 import re
@@ -13,10 +15,10 @@ from pathlib import Path
 from typing import TYPE_CHECKING, Any, ClassVar, Concatenate, Literal, NamedTuple, ParamSpec, TypeAlias, TypeVar, final
 
 import yarl
-from aiolimiter import AsyncLimiter
 from yarl import URL
 
 from cyberdrop_dl import constants
+from cyberdrop_dl.clients.rate_limiter import AdaptiveRateLimiter
 from cyberdrop_dl.clients.scraper_client import ScraperClient
 from cyberdrop_dl.data_structures.mediaprops import Resolution
 from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL, MediaItem, ScrapeItem, copy_signature
@@ -65,6 +67,7 @@ RateLimit = tuple[float, float]
 
 
 HASH_PREFIXES = "md5:", "sha1:", "sha256:", "xxh128:"
+_ALBUM_SCOPE: contextvars.ContextVar[_AlbumScope | None] = contextvars.ContextVar("_ALBUM_SCOPE", default=None)
 VALID_RESOLUTION_NAMES = "4K", "8K", "HQ", "Unknown"
 
 
@@ -80,6 +83,44 @@ class PlaceHolderConfig:
 _placeholder_config = PlaceHolderConfig()
 
 
+class _AlbumScope:
+    """Album results loaded while scraping an item.
+
+    Album crawlers usually spawn a task for each item and return right away. Every task created inside the scope
+    (scrape tasks and download tasks) keeps it alive. The results are released when the last one finishes"""
+
+    __slots__ = ("_crawler", "albums", "refs")
+
+    def __init__(self, crawler: Crawler) -> None:
+        self._crawler = crawler
+        self.albums: set[str] = set()
+        self.refs = 1
+
+    def add(self, album_id: str) -> None:
+        if album_id not in self.albums:
+            self.albums.add(album_id)
+            self._crawler._album_refs[album_id] += 1
+
+    def track(self, task: asyncio.Task[Any]) -> None:
+        self.refs += 1
+        task.add_done_callback(self._release_callback)
+
+    def _release_callback(self, _: asyncio.Task[Any]) -> None:
+        self.release()
+
+    def release(self) -> None:
+        self.refs -= 1
+        if self.refs:
+            return
+        album_refs, album_results = self._crawler._album_refs, self._crawler._album_results
+        for album_id in self.albums:
+            album_refs[album_id] -= 1
+            if album_refs[album_id] <= 0:
+                del album_refs[album_id]
+                _ = album_results.pop(album_id, None)
+        self.albums.clear()
+
+
 class CrawlerInfo(NamedTuple):
     site: str
     primary_url: URL
@@ -96,6 +137,7 @@ class Crawler(ABC):
     UPDATE_UNSUPPORTED: ClassVar[bool] = False
     SKIP_PRE_CHECK: ClassVar[bool] = False
     NEXT_PAGE_SELECTOR: ClassVar[str] = ""
+    NEXT_PAGE_PREFETCH: ClassVar[int] = 1  # Pages `web_pager` requests ahead, while the current page is being processed
 
     DEFAULT_TRIM_URLS: ClassVar[bool] = True
     FOLDER_DOMAIN: ClassVar[str] = ""
@@ -137,16 +179,21 @@ class Crawler(ABC):
         self.disabled: bool = False
         self.logged_in: bool = False
         self.scraped_items: set[str] = set()
-        self.RATE_LIMIT = AsyncLimiter(*self._RATE_LIMIT)
+        self.RATE_LIMIT = AdaptiveRateLimiter(*self._RATE_LIMIT)
         self.waiting_items = 0
         self.log = log
         self.log_debug = log_debug
         self._semaphore = asyncio.Semaphore(20)
+        self._album_results: dict[str, dict[str, int]] = {}
+        self._album_refs: collections.Counter[str] = collections.Counter()
         self.__post_init__()
 
     @final
     def create_task(self, coro: Coroutine[Any, Any, _T_co]) -> asyncio.Task[_T_co]:
-        return self.manager.task_group.create_task(coro)
+        task = self.manager.scrape_mapper.scheduler.create_scrape_task_nowait(coro)
+        if (scope := _ALBUM_SCOPE.get()) is not None:
+            scope.track(task)
+        return task
 
     def __post_init__(self) -> None: ...  # noqa: B027
 
@@ -254,7 +301,9 @@ class Crawler(ABC):
             if self.ready:
                 return
             self.client = self.manager.client_manager.scraper_client
+            self.RATE_LIMIT.domain = self.DOMAIN
             self.manager.client_manager.rate_limits[self.DOMAIN] = self.RATE_LIMIT
+            self.manager.client_manager.restore_learned_rate(self.DOMAIN)
             if self._DOWNLOAD_SLOTS:
                 self.manager.client_manager.download_slots[self.DOMAIN] = self._DOWNLOAD_SLOTS
             if self._USE_DOWNLOAD_SERVERS_LOCKS:
@@ -297,9 +346,15 @@ class Crawler(ABC):
                 return log(f"Skipping {url} as it has already been scraped", 10)
 
             self.scraped_items.add(url.path_qs)
-            async with self._fetch_context(scrape_item):
-                self.pre_check_scrape_item(scrape_item)
-                await self.fetch(scrape_item)
+            scope = _AlbumScope(self)
+            token = _ALBUM_SCOPE.set(scope)
+            try:
+                async with self._fetch_context(scrape_item):
+                    self.pre_check_scrape_item(scrape_item)
+                    await self.fetch(scrape_item)
+            finally:
+                _ALBUM_SCOPE.reset(token)
+                scope.release()
 
     def pre_check_scrape_item(self, scrape_item: ScrapeItem) -> None:
         if not self.SKIP_PRE_CHECK and scrape_item.url.path == "/":
@@ -392,7 +447,15 @@ class Crawler(ABC):
             scrape_item, url, self.DOMAIN, download_folder, filename, original_filename, debrid_link, ext=ext
         )
 
-        self.create_task(self.handle_media_item(media_item, m3u8))
+        await self._schedule_download(media_item, m3u8)
+
+    async def _schedule_download(self, media_item: MediaItem, m3u8: m3u8.RenditionGroup | None = None) -> None:
+        # Waits (pausing this crawler) while the download backlog is full
+        scheduler = self.manager.scrape_mapper.scheduler
+        coro = self.handle_media_item(media_item, m3u8)
+        task = await scheduler.create_download_task(coro, media_item.filesize or 0)
+        if (scope := _ALBUM_SCOPE.get()) is not None:
+            scope.track(task)
 
     @final
     async def _download(self, media_item: MediaItem, m3u8: m3u8.RenditionGroup | None) -> None:
@@ -424,9 +487,15 @@ class Crawler(ABC):
             msg = f"Invalid datetime from '{self.FOLDER_DOMAIN}' crawler . Got {media_item.datetime!r}, expected int."
             log(msg, bug=True)
 
-        check_complete = await self.check_complete(media_item.url, media_item.referer)
+        album_results = self._album_results.get(media_item.album_id) if media_item.album_id else None
+        in_album_results = album_results is not None and media_item.db_path in album_results
+        if in_album_results and not album_results[media_item.db_path]:  # type: ignore[reportOptionalSubscript]
+            check_complete = False  # We already know it was not completed. Skip the database query
+        else:
+            check_complete = await self.check_complete(media_item.url, media_item.referer)
+
         if check_complete:
-            if media_item.album_id:
+            if media_item.album_id and not in_album_results:
                 await self.manager.db_manager.history_table.set_album_id(self.DOMAIN, media_item)
             return
 
@@ -434,7 +503,7 @@ class Crawler(ABC):
             self.manager.progress_manager.download_progress.add_skipped()
             return
 
-        self.create_task(self._download(media_item, m3u8))
+        await self._download(media_item, m3u8)
 
     @final
     async def check_skip_by_config(self, media_item: MediaItem) -> bool:
@@ -495,8 +564,18 @@ class Crawler(ABC):
         return False
 
     async def get_album_results(self, album_id: str) -> dict[str, int]:
-        """Checks whether an album has completed given its domain and album id."""
-        return await self.manager.db_manager.history_table.check_album(self.DOMAIN, album_id)
+        """Checks whether an album has completed given its domain and album id.
+
+        Results are cached until the scrape item that requested them (and every task it spawned) finishes,
+        so `handle_media_item` can reuse them for every item of the album"""
+        scope = _ALBUM_SCOPE.get()
+        if (results := self._album_results.get(album_id)) is None:
+            results = await self.manager.db_manager.history_table.check_album(self.DOMAIN, album_id)
+            if scope is not None:
+                self._album_results[album_id] = results
+        if scope is not None:
+            scope.add(album_id)
+        return results
 
     def handle_external_links(self, scrape_item: ScrapeItem) -> None:
         """Maps external links to the scraper class."""
@@ -649,8 +728,9 @@ class Crawler(ABC):
         :param cffi: If `True`, uses `curl_cffi` to get the soup for each page. Otherwise, `aiohttp` will be used
         :param **kwargs: Will be forwarded to `self.parse_url` to parse each new page"""
 
-        async for soup in self._web_pager(url, next_page_selector, cffi=cffi, **kwargs):
-            yield soup
+        async with contextlib.aclosing(self._web_pager(url, next_page_selector, cffi=cffi, **kwargs)) as pages:
+            async for soup in pages:
+                yield soup
 
     async def _web_pager(
         self,
@@ -658,14 +738,20 @@ class Crawler(ABC):
         selector: Callable[[BeautifulSoup], str | None] | str | None = None,
         *,
         cffi: bool = False,
+        prefetch: int | None = None,
         **kwargs: Any,
     ) -> AsyncGenerator[BeautifulSoup]:
         """Generator of website pages.
 
+        The next page is requested as soon as its URL is known, while the current page is being processed.
+        Pages are not yielded while too many scrape tasks are waiting to start (`TaskScheduler.wait_for_scrape_room`)
+
         :param next_page_selector: If `None`, `self.next_page_selector` will be used
         :param cffi: If `True`, uses `curl_cffi` to get the soup for each page. Otherwise, `aiohttp` will be used
+        :param prefetch: Max number of pages to request ahead. If `None`, `self.NEXT_PAGE_PREFETCH` will be used
         :param **kwargs: Will be forwarded to `self.parse_url` to parse each new page"""
 
+        scheduler = self.manager.scrape_mapper.scheduler
         page_url = url
         if callable(selector):
             get_next_page = selector
@@ -675,13 +761,72 @@ class Crawler(ABC):
             func = css.select_one_get_attr_or_none
             get_next_page = partial(func, selector=selector, attribute="href")
 
-        while True:
-            soup = await self.request_soup(page_url, impersonate=cffi or None)
-            yield soup
-            page_url_str = get_next_page(soup)
-            if not page_url_str:
-                break
-            page_url = self.parse_url(page_url_str, **kwargs)
+        prefetch = self.NEXT_PAGE_PREFETCH if prefetch is None else prefetch
+        if prefetch <= 0:
+            while True:
+                soup = await self.request_soup(page_url, impersonate=cffi or None)
+                await scheduler.wait_for_scrape_room()
+                yield soup
+                page_url_str = get_next_page(soup)
+                if not page_url_str:
+                    break
+                page_url = self.parse_url(page_url_str, **kwargs)
+            return
+
+        # The page being processed by the caller + the prefetched pages
+        slots = asyncio.Semaphore(prefetch + 1)
+        pages: asyncio.Queue[BeautifulSoup | Exception | None] = asyncio.Queue()
+
+        async def request_pages(page_url: AbsoluteHttpURL | None) -> None:
+            try:
+                while page_url is not None:
+                    await slots.acquire()
+                    soup = await self.request_soup(page_url, impersonate=cffi or None)
+                    page_url_str = get_next_page(soup)
+                    pages.put_nowait(soup)
+                    page_url = self.parse_url(page_url_str, **kwargs) if page_url_str else None
+            except Exception as e:
+                pages.put_nowait(e)
+            else:
+                pages.put_nowait(None)
+
+        requests = asyncio.create_task(request_pages(page_url))
+        try:
+            while (soup := await pages.get()) is not None:
+                if isinstance(soup, Exception):
+                    raise soup
+                await scheduler.wait_for_scrape_room()
+                yield soup
+                slots.release()
+        finally:
+            requests.cancel()
+
+    async def _ordered_pager(
+        self, urls: Iterable[AbsoluteHttpURL], max_concurrency: int, *, cffi: bool = False
+    ) -> AsyncGenerator[BeautifulSoup]:
+        """Generator of website pages. Requests up to `max_concurrency` pages at once, but yields them in order.
+
+        Requests are still rate limited per domain. Pending requests are cancelled when the generator is closed.
+        Pages are not yielded while too many scrape tasks are waiting to start"""
+        scheduler = self.manager.scrape_mapper.scheduler
+        urls = iter(urls)
+        pending: collections.deque[asyncio.Task[BeautifulSoup]] = collections.deque()
+
+        def request_next_page() -> None:
+            if (url := next(urls, None)) is not None:
+                pending.append(asyncio.create_task(self.request_soup(url, impersonate=cffi or None)))
+
+        try:
+            for _ in range(max_concurrency):
+                request_next_page()
+            while pending:
+                soup = await pending.popleft()
+                request_next_page()
+                await scheduler.wait_for_scrape_room()
+                yield soup
+        finally:
+            for task in pending:
+                task.cancel()
 
     @error_handling_wrapper
     async def direct_file(self, scrape_item: ScrapeItem, url: URL | None = None, assume_ext: str | None = None) -> None:
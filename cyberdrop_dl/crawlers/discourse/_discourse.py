@@ -8,7 +8,6 @@ from __future__ import annotations
 import itertools
 from typing import TYPE_CHECKING, Any, ClassVar, TypeVar
 
-from bs4 import BeautifulSoup
 from pydantic import BaseModel
 
 from cyberdrop_dl.crawlers._forum import MessageBoardCrawler
@@ -134,7 +133,7 @@ class DiscourseCrawler(MessageBoardCrawler, is_generic=True):
 
     def extract_links(self, post: AvailablePost) -> Iterable[AbsoluteHttpURL]:
         def iter_links() -> Iterable[AbsoluteHttpURL]:
-            soup = BeautifulSoup(post.content_html, "html.parser")
+            soup = css.make_soup(post.content_html)
             images = css.iget(soup, *css.images)
             links = css.iget(soup, *css.links)
             external_links = (ref.url for ref in post.link_counts)
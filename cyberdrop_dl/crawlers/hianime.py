@@ -5,8 +5,6 @@ import dataclasses
 import weakref
 from typing import TYPE_CHECKING, Any, ClassVar
 
-import bs4
-
 from cyberdrop_dl.crawlers.crawler import Crawler, SupportedPaths, auto_task_id
 from cyberdrop_dl.crawlers.megacloud import MegaCloudCrawler
 from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL
@@ -15,6 +13,8 @@ from cyberdrop_dl.utils import css
 from cyberdrop_dl.utils.utilities import error_handling_wrapper
 
 if TYPE_CHECKING:
+    import bs4
+
     from cyberdrop_dl.data_structures.url_objects import ScrapeItem
 
 
@@ -162,14 +162,14 @@ def _parse_anime_id(slug: str) -> int | None:
 
 
 def _parse_episodes_resp(html: str):
-    episodes_soup = bs4.BeautifulSoup(html, "html.parser")
+    episodes_soup = css.make_soup(html)
     for ep_tag in episodes_soup.select(Selector.EPISODES):
         episode = Episode.from_tag(ep_tag)
         yield episode.id, episode
 
 
 def _parse_server_resp(html: str):
-    soup = bs4.BeautifulSoup(html, "html.parser")
+    soup = css.make_soup(html)
     for server_type in ("sub", "dub", "raw"):
         if server_tag := soup.select_one(f"div[data-type={server_type}]:-soup-contains('HD-1')"):
             server_id = css.get_attr(server_tag, "data-id")
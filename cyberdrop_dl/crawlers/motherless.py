@@ -177,7 +177,7 @@ class MotherlessCrawler(Crawler):
         parent_path = parent_id if from_gallery else f"g/{parent_id}"
         parent_url = PRIMARY_URL / parent_path
         if parent_url not in scrape_item.parents and parent_title:
-            scrape_item.parents.append(parent_url)
+            scrape_item.add_parent(parent_url)
             title = self.create_title(parent_title, parent_id)
             scrape_item.setup_as_album(title, album_id=parent_id)
             scrape_item.add_to_parent_title(f"{media_info.type.capitalize()}s")
@@ -13,7 +13,6 @@ import re
 from abc import abstractmethod
 from typing import TYPE_CHECKING, ClassVar, TypeVar, final
 
-from bs4 import BeautifulSoup
 from pydantic import BaseModel
 
 from cyberdrop_dl.crawlers.crawler import Crawler
@@ -28,6 +27,8 @@ from .models import HTML, Category, CategorySequence, ColletionType, Post, PostS
 if TYPE_CHECKING:
     from collections.abc import AsyncIterable, Iterable
 
+    from bs4 import BeautifulSoup
+
     from cyberdrop_dl.crawlers.crawler import SupportedPaths
     from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL, ScrapeItem
 
@@ -335,7 +336,7 @@ def _get_original_quality_link(link: str) -> str:
 
 
 def _iter_links(html: HTML, use_regex: bool) -> Iterable[str]:
-    soup = BeautifulSoup(html, "html.parser")
+    soup = css.make_soup(html)
     images = css.iget(soup, *css.images)
     iframes = css.iget(soup, *css.iframes)
     if use_regex:
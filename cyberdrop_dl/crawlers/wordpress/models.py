@@ -1,19 +1,22 @@
 from __future__ import annotations
 
 from datetime import UTC, datetime
-from typing import Annotated, Literal, NewType, TypeVar
+from typing import TYPE_CHECKING, Annotated, Literal, NewType, TypeVar
 
-from bs4 import BeautifulSoup
 from pydantic import AfterValidator, AliasPath, BaseModel, Field
 
 from cyberdrop_dl.compat import StrEnum
 from cyberdrop_dl.models.base_models import SequenceModel
+from cyberdrop_dl.utils import css
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 _ModelT = TypeVar("_ModelT", bound=BaseModel)
 
 
 def make_soup(string: str) -> BeautifulSoup:
-    return BeautifulSoup(string, "html.parser")
+    return css.make_soup(string)
 
 
 def unescape_html(string: str) -> str:
@@ -14,8 +14,6 @@ from __future__ import annotations
 import asyncio
 from typing import TYPE_CHECKING, ClassVar
 
-from bs4 import BeautifulSoup
-
 from cyberdrop_dl.crawlers._forum import HTMLMessageBoardCrawler, MessageBoardSelectors, PostSelectors
 from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL
 from cyberdrop_dl.exceptions import LoginError, ScrapeError
@@ -144,7 +142,7 @@ class XenforoCrawler(HTMLMessageBoardCrawler, is_abc=True):
 
 
 def parse_login_form(resp_text: str) -> dict[str, str]:
-    soup = BeautifulSoup(resp_text, "html.parser")
+    soup = css.make_soup(resp_text)
     inputs = soup.select("form:first-of-type input")
     data = {
         name: value
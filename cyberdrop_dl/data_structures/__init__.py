@@ -1,10 +1,9 @@
 from .mediaprops import Codecs, Resolution
-from .url_objects import AbsoluteHttpURL, HlsSegment, MediaItem, QueryDatetimeRange, ScrapeItem, ScrapeItemType
+from .url_objects import AbsoluteHttpURL, MediaItem, QueryDatetimeRange, ScrapeItem, ScrapeItemType
 
 __all__ = [
     "AbsoluteHttpURL",
     "Codecs",
-    "HlsSegment",
     "MediaItem",
     "QueryDatetimeRange",
     "Resolution",
@@ -1,9 +1,9 @@
 # type: ignore[reportIncompatibleVariableOverride]
 from __future__ import annotations
 
-import copy
 import datetime
-from dataclasses import asdict, dataclass, field
+import sys
+from dataclasses import asdict, dataclass, field, fields
 from enum import IntEnum
 from functools import partialmethod
 from pathlib import Path
@@ -143,12 +143,6 @@ FILE_HOST_PROFILE = ScrapeItemType.FILE_HOST_PROFILE
 FILE_HOST_ALBUM = ScrapeItemType.FILE_HOST_ALBUM
 
 
-class HlsSegment(NamedTuple):
-    part: str
-    name: str
-    url: AbsoluteHttpURL
-
-
 @dataclass(unsafe_hash=True, slots=True, kw_only=True)
 class MediaItem:
     url: AbsoluteHttpURL
@@ -162,19 +156,19 @@ class MediaItem:
     ext: str
     debrid_link: AbsoluteHttpURL | None = field(default=None, compare=False)
     duration: float | None = field(default=None, compare=False)
-    is_segment: bool = False
     fallbacks: Callable[[aiohttp.ClientResponse, int], AbsoluteHttpURL] | list[AbsoluteHttpURL] | None = field(
         default=None, compare=False
     )
     album_id: str | None = None
     datetime: int | None = field(default=None, compare=False)
-    parents: list[AbsoluteHttpURL] = field(default_factory=list, compare=False)
-    parent_threads: set[AbsoluteHttpURL] = field(default_factory=set, compare=False)
+    parents: tuple[AbsoluteHttpURL, ...] = field(default=(), compare=False)
+    parent_threads: frozenset[AbsoluteHttpURL] = field(default=frozenset(), compare=False)
 
     current_attempt: int = field(default=0, compare=False)
     partial_file: Path = None  # type: ignore
     complete_file: Path = None  # type: ignore
     hash: str | None = field(default=None, compare=False)
+    hashes: dict[str, str] = field(default_factory=dict, compare=False, repr=False)
     downloaded: bool = field(default=False, compare=False)
 
     parent_media_item: MediaItem | None = field(default=None, compare=False)
@@ -182,6 +176,9 @@ class MediaItem:
     _task_id: TaskID | None = field(default=None, compare=False)
 
     def __post_init__(self) -> None:
+        # Millions of items share a handful of distinct values
+        self.domain = sys.intern(self.domain)
+        self.ext = sys.intern(self.ext)
         self.db_path = self.create_db_path(self.url, self.domain)
 
     @staticmethod
@@ -212,7 +209,6 @@ class MediaItem:
         debrid_link: AbsoluteHttpURL | None = None,
         duration: float | None = None,
         ext: str = "",
-        is_segment: bool = False,
         fallbacks: Callable[[aiohttp.ClientResponse, int], AbsoluteHttpURL] | list[AbsoluteHttpURL] | None = None,
     ) -> MediaItem:
         return MediaItem(
@@ -226,12 +222,11 @@ class MediaItem:
             album_id=origin.album_id,
             ext=ext or Path(filename).suffix,
             original_filename=original_filename or filename,
-            is_segment=is_segment,
             fallbacks=fallbacks,
-            parents=origin.parents.copy(),
+            parents=origin.parents,
             datetime=origin.possible_datetime if isinstance(origin, ScrapeItem) else origin.datetime,
             parent_media_item=None if isinstance(origin, ScrapeItem) else origin,
-            parent_threads=origin.parent_threads.copy(),
+            parent_threads=origin.parent_threads,
         )
 
     @property
@@ -259,7 +254,7 @@ class MediaItem:
         item["attempts"] = item.pop("current_attempt")
         if self.hash:
             item["hash"] = f"xxh128:{self.hash}"
-        for name in ("fallbacks", "_task_id", "is_segment", "parent_media_item"):
+        for name in ("fallbacks", "_task_id", "parent_media_item", "hashes"):
             _ = item.pop(name)
         return item
 
@@ -274,8 +269,9 @@ class ScrapeItem:
     retry: bool = False
     retry_path: Path | None = None
 
-    parents: list[AbsoluteHttpURL] = field(default_factory=list, init=False)
-    parent_threads: set[AbsoluteHttpURL] = field(default_factory=set, init=False)
+    # parents and parent_threads are immutable so copies can share them. Use `add_parent` and `add_parent_thread`
+    parents: tuple[AbsoluteHttpURL, ...] = field(default=(), init=False)
+    parent_threads: frozenset[AbsoluteHttpURL] = field(default=frozenset(), init=False)
     children: int = field(default=0, init=False)
     children_limit: int = field(default=0, init=False)
     type: ScrapeItemType | None = field(default=None, init=False)
@@ -303,7 +299,15 @@ class ScrapeItem:
                 if last_domain_suffix == domain_suffix:
                     title = og_title
 
-        self.parent_title = (self.parent_title + "/" + title) if self.parent_title else title
+        # Every child of an album / thread has the same title. Interning it keeps a single copy in memory
+        self.parent_title = sys.intern((self.parent_title + "/" + title) if self.parent_title else title)
+
+    def add_parent(self, url: AbsoluteHttpURL) -> None:
+        self.parents = (*self.parents, url)
+
+    def add_parent_thread(self, url: AbsoluteHttpURL) -> None:
+        if url not in self.parent_threads:
+            self.parent_threads = self.parent_threads | {url}
 
     def set_type(self, scrape_item_type: ScrapeItemType | None, _: Manager | None = None) -> None:
         self.type = scrape_item_type
@@ -332,8 +336,8 @@ class ScrapeItem:
         self.part_of_album = False
         self.reset_childen()
         if reset_parents:
-            self.parents = []
-            self.parent_threads = set()
+            self.parents = ()
+            self.parent_threads = frozenset()
         if reset_parent_title:
             self.parent_title = ""
 
@@ -364,7 +368,7 @@ class ScrapeItem:
         if add_parent:
             new_parent = add_parent if isinstance(add_parent, AbsoluteHttpURL) else self.url
             assert is_absolute_http_url(new_parent)
-            scrape_item.parents.append(new_parent)
+            scrape_item.add_parent(new_parent)
         if new_title_part:
             scrape_item.add_to_parent_title(new_title_part)
         scrape_item.part_of_album = part_of_album or scrape_item.part_of_album
@@ -389,8 +393,13 @@ class ScrapeItem:
             return self.parents[-1]
 
     def copy(self) -> Self:
-        """Returns a deep copy of this scrape_item"""
-        return copy.deepcopy(self)
+        """Returns a copy of this scrape_item.
+
+        All the mutable attributes are replaced (never modified in place), so a shallow copy is enough"""
+        new = object.__new__(type(self))
+        for name in _SCRAPE_ITEM_FIELDS:
+            setattr(new, name, getattr(self, name))
+        return new
 
     def pop_query(self, name: str) -> str | None:
         """Get the value of a query param and remove it from this item's URL"""
@@ -399,6 +408,9 @@ class ScrapeItem:
         return value
 
 
+_SCRAPE_ITEM_FIELDS: tuple[str, ...] = tuple(f.name for f in fields(ScrapeItem))
+
+
 class QueryDatetimeRange(NamedTuple):
     before: datetime.datetime | None = None
     after: datetime.datetime | None = None
@@ -4,7 +4,8 @@ from typing import TYPE_CHECKING
 
 import aiosqlite
 
-from .tables import HashTable, HistoryTable, SchemaVersionTable, TempRefererTable
+from .tables import HashTable, HistoryTable, MediaPropertiesTable, SchemaVersionTable, TempRefererTable
+from .write_queue import WriteQueue
 
 if TYPE_CHECKING:
     from pathlib import Path
@@ -18,27 +19,42 @@ class Database:
         self.history_table: HistoryTable
         self.hash_table: HashTable
         self.temp_referer_table: TempRefererTable
+        self.media_properties_table: MediaPropertiesTable
+        self.write_queue: WriteQueue
 
     async def startup(self) -> None:
         """Startup process for the DBManager."""
         self._db_conn = await aiosqlite.connect(self._db_path)
         self._db_conn.row_factory = aiosqlite.Row
+        await self._set_pragmas()
+        self.write_queue = WriteQueue(self._db_conn)
         self.history_table = HistoryTable(self)
         self.hash_table = HashTable(self)
         self.temp_referer_table = TempRefererTable(self)
+        self.media_properties_table = MediaPropertiesTable(self)
         self._schema_versions = SchemaVersionTable(self)
 
         await self._pre_allocate()
         await self.history_table.startup()
         await self.hash_table.startup()
         await self.temp_referer_table.startup()
+        await self.media_properties_table.startup()
         await self._schema_versions.startup()
+        self.write_queue.start()
 
     async def close(self) -> None:
         """Close the DBManager."""
+        await self.write_queue.close()
+        self.history_table.log_completed_index_stats()
         await self.temp_referer_table.sql_drop_temp_referers()
         await self._db_conn.close()
 
+    async def _set_pragmas(self) -> None:
+        # WAL only needs to fsync on checkpoints. `NORMAL` is safe from corruption in WAL mode,
+        # a power loss may only rollback the last commits
+        await self._db_conn.execute("PRAGMA journal_mode = WAL;")
+        await self._db_conn.execute("PRAGMA synchronous = NORMAL;")
+
     async def _pre_allocate(self) -> None:
         """We pre-allocate 100MB of space to the SQL file just in case the user runs out of disk space."""
 
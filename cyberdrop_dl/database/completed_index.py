@@ -0,0 +1,78 @@
+"""In memory index of completed downloads.
+
+Answers `HistoryTable.check_complete` without a database query.
+
+Keys (`domain` + `url_path`) and referers are stored as 64 bits fingerprints in sorted arrays (16 bytes per row)
+instead of the actual strings. The chance of a collision is negligible, even with millions of rows"""
+
+from __future__ import annotations
+
+import bisect
+import dataclasses
+from array import array
+from typing import TYPE_CHECKING
+
+import xxhash
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+
+UNKNOWN_REFERER = 0
+
+
+def fingerprint(*parts: str) -> int:
+    return xxhash.xxh3_64_intdigest("\x00".join(parts).encode())
+
+
+@dataclasses.dataclass(slots=True)
+class IndexStats:
+    hits: int = 0
+    misses: int = 0
+    referer_updates: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+    def __str__(self) -> str:
+        return (
+            f"hits: {self.hits:,}, misses: {self.misses:,}, referer updates: {self.referer_updates:,}, "
+            f"hit rate: {self.hit_rate:.1%}"
+        )
+
+
+class CompletedIndex:
+    def __init__(self, rows: Iterable[tuple[str, str, str]] = ()) -> None:
+        """`rows` are `(domain, url_path, referer)` of every completed download."""
+        pairs = sorted((fingerprint(domain, url_path), fingerprint(referer)) for domain, url_path, referer in rows)
+        self._keys = array("Q", (key for key, _ in pairs))
+        self._referers = array("Q", (referer for _, referer in pairs))
+        self._new: dict[int, int] = {}
+        self.stats = IndexStats()
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._new)
+
+    def _find(self, key: int) -> int | None:
+        index = bisect.bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            return index
+
+    def get_referer(self, domain: str, url_path: str) -> int | None:
+        """Returns the fingerprint of the referer of a completed download, or `None` if it is not completed."""
+        key = fingerprint(domain, url_path)
+        if (referer := self._new.get(key)) is not None:
+            return referer
+        if (index := self._find(key)) is not None:
+            return self._referers[index]
+
+    def add(self, domain: str, url_path: str, referer: str | None) -> None:
+        """Adds (or updates) a completed download. Use `None` as referer if the referer in the database is unknown."""
+        key = fingerprint(domain, url_path)
+        referer_fp = fingerprint(referer) if referer is not None else UNKNOWN_REFERER
+        if (index := self._find(key)) is not None:
+            self._referers[index] = referer_fp
+        else:
+            self._new[key] = referer_fp
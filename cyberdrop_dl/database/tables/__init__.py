@@ -1,6 +1,7 @@
 from .hash import HashTable
 from .history import HistoryTable
+from .media_properties import MediaPropertiesTable
 from .schema import SchemaVersionTable
 from .temp_referer import TempRefererTable
 
-__all__ = ["HashTable", "HistoryTable", "SchemaVersionTable", "TempRefererTable"]
+__all__ = ["HashTable", "HistoryTable", "MediaPropertiesTable", "SchemaVersionTable", "TempRefererTable"]
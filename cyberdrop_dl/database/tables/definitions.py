@@ -74,3 +74,16 @@ CREATE TABLE IF NOT EXISTS temp_hash (
 create_hash_index = """
 CREATE INDEX IF NOT EXISTS idx_hash_type_hash ON hash (hash_type, hash);
 """
+
+create_files_size_index = """
+CREATE INDEX IF NOT EXISTS idx_files_file_size ON files (file_size);
+"""
+
+create_media_properties = """
+CREATE TABLE IF NOT EXISTS media_properties (
+  path TEXT NOT NULL PRIMARY KEY,
+  file_size INT NOT NULL,
+  mtime_ns INT NOT NULL,
+  ffprobe_output TEXT NOT NULL
+);
+"""
@@ -1,19 +1,25 @@
 from __future__ import annotations
 
+import itertools
 from pathlib import Path
 from typing import TYPE_CHECKING, cast
 
 from cyberdrop_dl.utils.logger import log
 
-from .definitions import create_files, create_hash, create_hash_index
+from .definitions import create_files, create_files_size_index, create_hash, create_hash_index
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     import aiosqlite
     from yarl import URL
 
     from cyberdrop_dl.database import Database
 
 
+_MAX_QUERY_PARAMS: int = 500
+
+
 class HashTable:
     def __init__(self, database: Database) -> None:
         self._database = database
@@ -27,6 +33,7 @@ class HashTable:
         await self.db_conn.execute(create_files)
         await self.db_conn.execute(create_hash)
         await self.db_conn.execute(create_hash_index)
+        await self.db_conn.execute(create_files_size_index)
         await self.db_conn.commit()
 
     async def get_file_hash_exists(self, path: Path | str, hash_type: str) -> str | None:
@@ -88,6 +95,27 @@ class HashTable:
             log(f"Error retrieving folder and filename: {e}", 40, exc_info=e)
             return []
 
+    async def get_files_with_size_matches(self, sizes: Iterable[int], hash_type: str) -> list[aiosqlite.Row]:
+        """Returns every file with any of the given sizes, with its hash (`NULL` if the file has not been hashed).
+
+        Files of the same size are returned in the order they were added to the database"""
+        rows: list[aiosqlite.Row] = []
+        sizes_iter = iter(sorted(set(sizes)))
+        try:
+            while batch := list(itertools.islice(sizes_iter, _MAX_QUERY_PARAMS)):
+                query = f"""
+                SELECT files.folder, files.download_filename, files.file_size, hash.hash
+                FROM files LEFT JOIN hash ON hash.folder = files.folder
+                AND hash.download_filename = files.download_filename AND hash.hash_type = ?
+                WHERE files.file_size IN ({",".join("?" * len(batch))})
+                ORDER BY files.file_size, files.rowid;
+                """
+                cursor = await self.db_conn.execute(query, (hash_type, *batch))
+                rows.extend(await cursor.fetchall())
+        except Exception as e:
+            log(f"Error retrieving files by size: {e}", 40, exc_info=e)
+        return rows
+
     async def check_hash_exists(self, hash_type: str, hash_value: str) -> bool:
         if self._database.ignore_history:
             return False
@@ -175,6 +203,22 @@ class HashTable:
             return False
         return True
 
+    async def insert_or_update_files(self, rows: Iterable[tuple[str, str, str | None, int, str | None, int]]) -> None:
+        """Inserts or updates multiple files at once.
+
+        Each row must be `(folder, download_filename, original_filename, file_size, referer, date)`"""
+        query = """
+        INSERT INTO files (folder, download_filename, original_filename, file_size, referer, date)
+        VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(download_filename, folder)
+        DO UPDATE SET original_filename = excluded.original_filename, file_size = excluded.file_size,
+        referer = excluded.referer, date = excluded.date;
+        """
+        try:
+            await self.db_conn.executemany(query, rows)
+            await self.db_conn.commit()
+        except Exception as e:
+            log(f"Error inserting/updating records: {e}", 40, exc_info=e)
+
     async def get_all_unique_hashes(self, hash_type: str | None = None) -> list[str]:
         """Retrieves a list of hashes
 
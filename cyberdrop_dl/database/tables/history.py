@@ -1,9 +1,9 @@
 from __future__ import annotations
 
-from sqlite3 import IntegrityError, Row
 from typing import TYPE_CHECKING, cast
 
 from cyberdrop_dl.data_structures.url_objects import MediaItem
+from cyberdrop_dl.database.completed_index import CompletedIndex, fingerprint
 from cyberdrop_dl.utils.utilities import log
 
 from .definitions import create_fixed_history, create_history
@@ -11,12 +11,14 @@ from .definitions import create_fixed_history, create_history
 if TYPE_CHECKING:
     import datetime
     from collections.abc import AsyncGenerator
+    from sqlite3 import Row
 
     import aiosqlite
     from yarl import URL
 
     from cyberdrop_dl.crawlers import Crawler
     from cyberdrop_dl.database import Database
+    from cyberdrop_dl.database.write_queue import WriteQueue
 
 
 _FETCH_MANY_SIZE: int = 1000
@@ -25,11 +27,16 @@ _FETCH_MANY_SIZE: int = 1000
 class HistoryTable:
     def __init__(self, database: Database) -> None:
         self._database = database
+        self._completed_index: CompletedIndex | None = None
 
     @property
     def db_conn(self) -> aiosqlite.Connection:
         return self._database._db_conn
 
+    @property
+    def write_queue(self) -> WriteQueue:
+        return self._database.write_queue
+
     async def startup(self) -> None:
         """Startup process for the HistoryTable."""
         from cyberdrop_dl.crawlers import jpg5, redgifs
@@ -41,6 +48,26 @@ class HistoryTable:
         await self.fix_primary_keys()
         await self.add_columns_media()
         await self.run_updates()
+        await self.load_completed_index()
+
+    async def load_completed_index(self) -> None:
+        """Loads every completed download into memory to skip database queries on `check_complete`."""
+        if self._database.ignore_history:
+            return
+
+        await self.write_queue.write_pending()
+        rows: list[tuple[str, str, str]] = []
+        query = "SELECT domain, url_path, referer FROM media WHERE completed = 1"
+        cursor = await self.db_conn.execute(query)
+        while batch := await cursor.fetchmany(_FETCH_MANY_SIZE * 10):
+            rows.extend(tuple(row) for row in batch)  # type: ignore[reportArgumentType]
+
+        self._completed_index = CompletedIndex(rows)
+        log(f"Loaded {len(self._completed_index):,} completed downloads from the database", 10)
+
+    def log_completed_index_stats(self) -> None:
+        if self._completed_index is not None:
+            log(f"History cache stats: {self._completed_index.stats}", 10)
 
     async def update_previously_unsupported(self, crawlers: dict[str, Crawler]) -> None:
         """Update old `no_crawler` entries that are now supported."""
@@ -57,6 +84,8 @@ class HistoryTable:
         query = "DELETE FROM media WHERE domain = 'no_crawler' AND referer LIKE ?"
         await cursor.executemany(query, [[x] for x in domains_to_update.values()])
         await self.db_conn.commit()
+        if self._completed_index is not None:
+            await self.load_completed_index()
 
     async def run_updates(self) -> None:
         updates = (
@@ -80,25 +109,39 @@ class HistoryTable:
             return False
 
         url_path = MediaItem.create_db_path(url, domain)
+        if (index := self._completed_index) is not None:
+            referer_fp = index.get_referer(domain, url_path)
+            if referer_fp is None:
+                index.stats.misses += 1
+                return False
+
+            index.stats.hits += 1
+            if url == referer or fingerprint(str(referer)) == referer_fp:
+                return True
+
+            # The referer may have changed. We need the actual value from the database to update it
+            index.stats.referer_updates += 1
 
         async def select_referer_and_completed() -> tuple[str, bool]:
+            await self.write_queue.write_pending()
             query = "SELECT referer, completed FROM media WHERE domain = ? and url_path = ?"
             cursor = await self.db_conn.execute(query, (domain, url_path))
             if row := await cursor.fetchone():
                 return row[0], row[1]
             return "", False
 
-        async def update_referer() -> None:
+        def update_referer() -> None:
             query = "UPDATE media SET referer = ? WHERE domain = ? and url_path = ?"
-            await self.db_conn.execute(query, (str(referer), domain, url_path))
-            await self.db_conn.commit()
+            self.write_queue.put(query, (str(referer), domain, url_path), key=(domain, url_path))
 
         current_referer, completed = await select_referer_and_completed()
         if completed and url != referer and str(referer) != current_referer:
             # Update the referer if it has changed so that check_complete_by_referer can work
             log(f"Updating referer of {url} from {current_referer} to {referer}")
-            await update_referer()
+            update_referer()
 
+        if completed and index is not None:
+            index.add(domain, url_path, str(referer))
         return completed
 
     async def check_album(self, domain: str, album_id: str) -> dict[str, int]:
@@ -106,6 +149,7 @@ class HistoryTable:
         if self._database.ignore_history:
             return {}
 
+        await self.write_queue.write_pending()
         query = "SELECT url_path, completed FROM media WHERE domain = ? and album_id = ?"
         cursor = await self.db_conn.execute(query, (domain, album_id))
         rows = await cursor.fetchall()
@@ -114,15 +158,16 @@ class HistoryTable:
     async def set_album_id(self, domain: str, media_item: MediaItem) -> None:
         """Sets an album_id in the database."""
 
+        url_path = media_item.db_path
         query = "UPDATE media SET album_id = ? WHERE domain = ? and url_path = ?"
-        await self.db_conn.execute(query, (media_item.album_id, domain, media_item.db_path))
-        await self.db_conn.commit()
+        self.write_queue.put(query, (media_item.album_id, domain, url_path), key=(domain, url_path))
 
     async def check_complete_by_referer(self, domain: str | None, referer: URL) -> bool:
         """Checks whether an individual file has completed given its domain and url path."""
         if self._database.ignore_history:
             return False
 
+        await self.write_queue.write_pending()
         if domain is None:
             query = "SELECT completed FROM media WHERE referer = ?"
             params = (str(referer),)
@@ -144,14 +189,20 @@ class HistoryTable:
         """Inserts an uncompleted file into the database."""
 
         url_path = media_item.db_path
+        referer = str(media_item.referer)
         download_filename = media_item.download_filename or ""
-        cursor = await self.db_conn.cursor()
-        query = "UPDATE media SET domain = ?, album_id = ? WHERE domain = 'no_crawler' and url_path = ? and referer = ?"
-        try:
-            await cursor.execute(query, (domain, media_item.album_id, url_path, str(media_item.referer)))
-        except IntegrityError:
-            delete_query = "DELETE FROM media WHERE domain = 'no_crawler' and url_path = ?"
-            await cursor.execute(delete_query, (url_path,))
+        query = (
+            "UPDATE OR IGNORE media SET domain = ?, album_id = ? "
+            "WHERE domain = 'no_crawler' and url_path = ? and referer = ?"
+        )
+        self.write_queue.put(query, (domain, media_item.album_id, url_path, referer))
+
+        # The update is ignored if the new row already exists. Delete the old entries in that case
+        delete_query = """
+        DELETE FROM media WHERE domain = 'no_crawler' and url_path = ?
+        AND EXISTS (SELECT 1 FROM media WHERE domain = 'no_crawler' and url_path = ? and referer = ?)
+        """
+        self.write_queue.put(delete_query, (url_path, url_path, referer))
 
         insert_query = """
         INSERT OR IGNORE INTO media (domain, url_path, referer, album_id, download_path,
@@ -159,12 +210,12 @@ class HistoryTable:
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP);
         """
 
-        await cursor.execute(
+        self.write_queue.put(
             insert_query,
             (
                 domain,
                 url_path,
-                str(media_item.referer),
+                referer,
                 media_item.album_id,
                 str(media_item.download_folder),
                 download_filename,
@@ -174,16 +225,17 @@ class HistoryTable:
         )
         if download_filename:
             query = "UPDATE media SET download_filename = ? WHERE domain = ? and url_path = ?"
-            await cursor.execute(query, (download_filename, domain, url_path))
-        await self.db_conn.commit()
+            self.write_queue.put(query, (download_filename, domain, url_path))
 
     async def mark_complete(self, domain: str, media_item: MediaItem) -> None:
         """Mark a download as completed in the database."""
 
         url_path = media_item.db_path
         query = "UPDATE media SET completed = 1, completed_at = CURRENT_TIMESTAMP WHERE domain = ? and url_path = ?"
-        await self.db_conn.execute(query, (domain, url_path))
-        await self.db_conn.commit()
+        self.write_queue.put(query, (domain, url_path), key=(domain, url_path))
+        if self._completed_index is not None:
+            # The row may already exist with a different referer (`insert_incompleted` does not replace it)
+            self._completed_index.add(domain, url_path, None)
 
     async def add_filesize(self, domain: str, media_item: MediaItem) -> None:
         """Adds the file size to the db."""
@@ -191,23 +243,19 @@ class HistoryTable:
         url_path = media_item.db_path
         file_size = media_item.complete_file.stat().st_size
         query = """UPDATE media SET file_size=? WHERE domain = ? and url_path = ?"""
-        await self.db_conn.execute(query, (file_size, domain, url_path))
-        await self.db_conn.commit()
+        self.write_queue.put(query, (file_size, domain, url_path), key=(domain, url_path))
 
     async def add_duration(self, domain: str, media_item: MediaItem) -> None:
         """Adds the duration to the db."""
 
         url_path = media_item.db_path
         query = "UPDATE media SET duration=? WHERE domain = ? and url_path = ?"
-        await self.db_conn.execute(query, (media_item.duration, domain, url_path))
-        await self.db_conn.commit()
+        self.write_queue.put(query, (media_item.duration, domain, url_path), key=(domain, url_path))
 
     async def get_duration(self, domain: str, media_item: MediaItem) -> float | None:
         """Returns the duration from the database."""
-        if media_item.is_segment:
-            return
-
         url_path = media_item.db_path
+        await self.write_queue.write_pending()
         query = "SELECT duration FROM media WHERE domain = ? and url_path = ?"
         cursor = await self.db_conn.execute(query, (domain, url_path))
         if row := await cursor.fetchone():
@@ -217,11 +265,11 @@ class HistoryTable:
         """Add the download_filename to the db."""
         url_path = media_item.db_path
         query = "UPDATE media SET download_filename=? WHERE domain = ? and url_path = ? and download_filename = ''"
-        await self.db_conn.execute(query, (media_item.download_filename, domain, url_path))
-        await self.db_conn.commit()
+        self.write_queue.put(query, (media_item.download_filename, domain, url_path))
 
     async def check_filename_exists(self, filename: str) -> bool:
         """Checks whether a downloaded filename exists in the database."""
+        await self.write_queue.write_pending()
         query = "SELECT EXISTS(SELECT 1 FROM media WHERE download_filename = ?)"
         cursor = await self.db_conn.execute(query, (filename,))
         row = await cursor.fetchone()
@@ -230,11 +278,8 @@ class HistoryTable:
 
     async def get_downloaded_filename(self, domain: str, media_item: MediaItem) -> str | None:
         """Returns the downloaded filename from the database."""
-
-        if media_item.is_segment:
-            return media_item.filename
-
         url_path = media_item.db_path
+        await self.write_queue.write_pending()
         query = "SELECT download_filename FROM media WHERE domain = ? and url_path = ?"
         cursor = await self.db_conn.execute(query, (domain, url_path))
         if row := await cursor.fetchone():
@@ -242,6 +287,7 @@ class HistoryTable:
 
     async def get_failed_items(self) -> AsyncGenerator[list[Row]]:
         """Returns a list of failed items."""
+        await self.write_queue.flush()
         query = "SELECT referer, download_path,completed_at,created_at FROM media WHERE completed = 0"
         cursor = await self.db_conn.execute(query)
         while rows := await cursor.fetchmany(_FETCH_MANY_SIZE):
@@ -249,6 +295,7 @@ class HistoryTable:
 
     async def get_all_items(self, after: datetime.date, before: datetime.date) -> AsyncGenerator[list[Row]]:
         """Returns a list of all items."""
+        await self.write_queue.flush()
         query = """
         SELECT referer,download_path,completed_at,created_at
         FROM media WHERE COALESCE(completed_at, '1970-01-01') BETWEEN ? AND ?
@@ -260,6 +307,7 @@ class HistoryTable:
 
     async def get_unique_download_paths(self) -> AsyncGenerator[list[Row]]:
         """Returns a list of unique download paths."""
+        await self.write_queue.flush()
         query = "SELECT DISTINCT download_path FROM media"
         cursor = await self.db_conn.execute(query)
         while rows := await cursor.fetchmany(_FETCH_MANY_SIZE):
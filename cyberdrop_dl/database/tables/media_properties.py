@@ -0,0 +1,101 @@
+"""Cache of ffprobe results, so a file is only probed once (after its download, while sorting, etc).
+
+Rows are keyed by the absolute path of the file and are only valid while its size and mtime do not change.
+Only the stream fields needed to build a `FFprobeResult` are stored"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import TYPE_CHECKING, Any
+
+from cyberdrop_dl.utils import ffmpeg
+from cyberdrop_dl.utils.ffmpeg import FFprobeResult
+
+from .definitions import create_media_properties
+
+if TYPE_CHECKING:
+    import os
+    from pathlib import Path
+
+    import aiosqlite
+
+    from cyberdrop_dl.database import Database
+    from cyberdrop_dl.database.write_queue import WriteQueue
+    from cyberdrop_dl.utils.ffmpeg import FFprobeOutput, StreamDict
+
+
+_STREAM_KEYS = (
+    "index",
+    "codec_type",
+    "codec_name",
+    "width",
+    "height",
+    "avg_frame_rate",
+    "duration",
+    "bit_rate",
+    "sample_rate",
+)
+
+
+class MediaPropertiesTable:
+    def __init__(self, database: Database) -> None:
+        self._database = database
+
+    @property
+    def db_conn(self) -> aiosqlite.Connection:
+        return self._database._db_conn
+
+    @property
+    def write_queue(self) -> WriteQueue:
+        return self._database.write_queue
+
+    async def startup(self) -> None:
+        """Startup process for the MediaPropertiesTable."""
+        await self.db_conn.execute(create_media_properties)
+        await self.db_conn.commit()
+
+    async def probe(self, path: Path) -> FFprobeResult | None:
+        """Returns the ffprobe result of a file, running ffprobe only if the file is not in the cache.
+
+        Returns `None` if the file does not exist or ffprobe is not available"""
+        try:
+            path, stat = await asyncio.to_thread(_absolute_stat, path)
+        except OSError:
+            return
+        if result := await self.get(path, stat):
+            return result
+        if not ffmpeg.which_ffprobe():
+            return
+
+        result = await ffmpeg.probe(path)
+        if result:
+            self.add(path, stat, result.ffprobe_output)
+        return result
+
+    async def get(self, path: Path, stat: os.stat_result) -> FFprobeResult | None:
+        """Returns the cached ffprobe result of a file if it has not changed since it was probed."""
+        await self.write_queue.write_pending()
+        query = "SELECT ffprobe_output FROM media_properties WHERE path = ? AND file_size = ? AND mtime_ns = ?"
+        cursor = await self.db_conn.execute(query, (str(path), stat.st_size, stat.st_mtime_ns))
+        if row := await cursor.fetchone():
+            return FFprobeResult.from_output(json.loads(row[0]))
+
+    def add(self, path: Path, stat: os.stat_result, ffprobe_output: FFprobeOutput) -> None:
+        """Adds (or replaces) the ffprobe result of a file."""
+        output = json.dumps({"streams": [_compact_stream(stream) for stream in ffprobe_output["streams"]]})
+        query = "INSERT OR REPLACE INTO media_properties VALUES (?, ?, ?, ?)"
+        self.write_queue.put(query, (str(path), stat.st_size, stat.st_mtime_ns, output), key=str(path))
+
+
+def _absolute_stat(path: Path) -> tuple[Path, os.stat_result]:
+    path = path.absolute()
+    return path, path.stat()
+
+
+def _compact_stream(stream: StreamDict) -> dict[str, Any]:
+    compact = {key: stream[key] for key in _STREAM_KEYS if key in stream}
+    tags: dict[str, Any] = stream.get("tags", {})  # type: ignore
+    if duration := next((value for name, value in tags.items() if name.casefold() == "duration"), None):
+        compact["tags"] = {"duration": duration}
+    return compact
@@ -0,0 +1,134 @@
+"""Write-behind queue for the database.
+
+Small updates are buffered and written in batches (one `executemany` per run of the same query) inside a single
+transaction, so many updates only cost a single commit (fsync).
+
+Pending writes are applied to the connection (without committing) before any read that needs them,
+so reads on the same connection always see the latest data"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import itertools
+from typing import TYPE_CHECKING
+
+from cyberdrop_dl.utils.logger import log
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Iterable, Sequence
+
+    import aiosqlite
+
+    _Params = Sequence[object]
+
+
+_FLUSH_INTERVAL: float = 1  # seconds
+_MAX_PENDING_ROWS: int = 500
+
+
+class WriteQueue:
+    def __init__(
+        self,
+        db_conn: aiosqlite.Connection,
+        flush_interval: float = _FLUSH_INTERVAL,
+        max_pending_rows: int = _MAX_PENDING_ROWS,
+    ) -> None:
+        self._db_conn = db_conn
+        self.flush_interval = flush_interval
+        self.max_pending_rows = max_pending_rows
+        self._pending: dict[Hashable, tuple[str, _Params]] = {}
+        self._counter = itertools.count()
+        self._uncommitted: int = 0
+        self._lock = asyncio.Lock()
+        self._flush_needed = asyncio.Event()
+        self._flush_task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+        await self.flush()
+
+    def put(self, query: str, params: _Params, key: Hashable | None = None) -> None:
+        """Schedules `query` to be executed with `params`.
+
+        If `key` is not `None`, any pending write with the same `query` and `key` is replaced by this one.
+        Use it only for queries where only the last value matters (ex: `UPDATE media SET completed = 1`)"""
+        if key is None:
+            entry_key = next(self._counter)
+        else:
+            entry_key = query, key
+            _ = self._pending.pop(entry_key, None)  # Re-insert at the end to keep execution order
+        self._pending[entry_key] = query, params
+        if len(self._pending) >= self.max_pending_rows:
+            self._flush_needed.set()
+
+    async def write_pending(self) -> None:
+        """Applies all pending writes to the current transaction, without committing."""
+        if not self._pending:
+            return
+        async with self._lock:
+            await self._write_pending()
+
+    async def flush(self) -> None:
+        """Applies all pending writes and commits them."""
+        async with self._lock:
+            await self._write_pending()
+            if self._uncommitted:
+                await self._db_conn.commit()
+                self._uncommitted = 0
+
+    async def _write_pending(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        # The batch is written inside a savepoint, so a failed batch is rolled back without leaving half of its rows
+        # applied. It is queued again (to be retried by the next write) and the error is raised to the caller
+        if not self._db_conn.in_transaction:
+            await self._db_conn.execute("BEGIN")
+        await self._db_conn.execute("SAVEPOINT write_queue")
+        try:
+            for query, group in _group_by_query(pending.values()):
+                await self._db_conn.executemany(query, group)
+        except Exception:
+            await self._db_conn.execute("ROLLBACK TO write_queue")
+            await self._db_conn.execute("RELEASE write_queue")
+            self._requeue(pending)
+            raise
+        await self._db_conn.execute("RELEASE write_queue")
+        self._uncommitted += len(pending)
+
+    def _requeue(self, pending: dict[Hashable, tuple[str, _Params]]) -> None:
+        # Writes queued while the batch was running go after it.
+        # Same as `put`, they replace the failed writes with the same key
+        for entry_key, entry in self._pending.items():
+            _ = pending.pop(entry_key, None)
+            pending[entry_key] = entry
+        self._pending = pending
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._flush_needed.wait(), self.flush_interval)
+            self._flush_needed.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log(f"Unable to write {len(self)} pending rows to the database, retrying later: {e}", 40, exc_info=e)
+                await asyncio.sleep(self.flush_interval)
+
+
+def _group_by_query(entries: Iterable[tuple[str, _Params]]) -> Iterable[tuple[str, Iterable[_Params]]]:
+    # Only consecutive entries are grouped to keep the order of writes to the same row
+    for query, group in itertools.groupby(entries, key=lambda entry: entry[0]):
+        yield query, (params for _, params in group)
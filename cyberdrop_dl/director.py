@@ -31,7 +31,8 @@ from cyberdrop_dl.utils.logger import (
 )
 from cyberdrop_dl.utils.sorting import Sorter
 from cyberdrop_dl.utils.updates import check_latest_pypi
-from cyberdrop_dl.utils.utilities import check_partials_and_empty_folders
+from cyberdrop_dl.utils.utilities import PartialsAndEmptyFoldersCheck
+from cyberdrop_dl.utils.walker import TreeWalker
 from cyberdrop_dl.utils.webhook import send_webhook_message
 from cyberdrop_dl.utils.yaml import handle_validation_error
 
@@ -153,14 +154,32 @@ async def _post_runtime(manager: Manager) -> None:
     log_spacer(20, log_to_console=False)
     msg = f"Running Post-Download Processes For Config: {manager.config_manager.loaded_config}"
     log_with_color(msg, "green", 20)
+    sort_only = manager.multiconfig and manager.config_manager.settings_data.sorting.sort_downloads
+    # Only look at the files of this run, unless a full scan was requested.
+    # Multiconfig runs with sorting enabled skip the download step, so they always do a full scan
+    full_scan = sort_only or manager.config_manager.settings_data.runtime_options.full_post_run_scan
+    files = None
+    if full_scan:
+        walker = TreeWalker(manager.path_manager.download_folder)
+    else:
+        files = [download.file for download in manager.path_manager.completed_downloads]
+        walker = TreeWalker(*manager.path_manager.download_folders, recursive=False)
+
     # checking and removing dupes
-    if not (manager.multiconfig and manager.config_manager.settings_data.sorting.sort_downloads):
+    if not sort_only:
         await manager.hash_manager.hash_client.cleanup_dupes_after_download()
+
+    # Every stage subscribes to the same walker, so the download folder is only walked once
+    sorter = None
     if manager.config_manager.settings_data.sorting.sort_downloads and not manager.parsed_args.cli_only_args.retry_any:
-        sorter = Sorter(manager)
-        await sorter.run()
+        sorter = Sorter(manager, files)
+        sorter.subscribe(walker)
+    check = PartialsAndEmptyFoldersCheck(manager, walker)
+    await walker.run_async()
 
-    check_partials_and_empty_folders(manager)
+    if sorter is not None:
+        await sorter.run()
+    await check.run()
 
     if manager.config_manager.settings_data.runtime_options.update_last_forum_post:
         await manager.log_manager.update_last_forum_post()
@@ -5,17 +5,18 @@ import os
 import shutil
 import subprocess
 import sys
+import time
 from dataclasses import field
 from datetime import datetime
 from functools import wraps
 from http import HTTPStatus
 from pathlib import Path
-from typing import TYPE_CHECKING, NamedTuple, ParamSpec, TypeVar
+from typing import TYPE_CHECKING, ParamSpec, TypeVar
 
 from aiohttp import ClientConnectorError, ClientError, ClientResponseError
 
+from cyberdrop_dl.clients import hls_stream
 from cyberdrop_dl.constants import CustomHTTPStatus
-from cyberdrop_dl.data_structures.url_objects import HlsSegment, MediaItem
 from cyberdrop_dl.exceptions import (
     DownloadError,
     DurationError,
@@ -32,8 +33,9 @@ from cyberdrop_dl.utils.utilities import error_handling_wrapper, parse_url
 # Windows epoch is January 1, 1601. Unix epoch is January 1, 1970
 WIN_EPOCH_OFFSET = 116444736e9
 MAC_OS_SET_FILE = None
-_VIDEO_HLS_BATCH_SIZE = 10
-_AUDIO_HLS_BATCH_SIZE = 50
+# Max number of segments of a single HLS stream downloaded (or waiting in memory to be written) at the same time
+_VIDEO_HLS_MAX_PENDING = 10
+_AUDIO_HLS_MAX_PENDING = 50
 
 
 # Try to import win32con for Windows constants, fallback to hardcoded values if unavailable
@@ -60,9 +62,11 @@ elif sys.platform == "darwin":
 
 
 if TYPE_CHECKING:
-    from collections.abc import Callable, Coroutine, Generator
+    from collections.abc import Callable, Coroutine, Iterable
 
     from cyberdrop_dl.clients.download_client import DownloadClient
+    from cyberdrop_dl.clients.download_limiter import AdaptiveDownloadLimiter
+    from cyberdrop_dl.data_structures.url_objects import MediaItem
     from cyberdrop_dl.managers.manager import Manager
     from cyberdrop_dl.utils.m3u8 import M3U8, RenditionGroup
 
@@ -70,11 +74,6 @@ P = ParamSpec("P")
 R = TypeVar("R")
 
 
-class SegmentDownloadResult(NamedTuple):
-    item: MediaItem
-    downloaded: bool
-
-
 KNOWN_BAD_URLS = {
     "https://i.imgur.com/removed.png": 404,
     "https://saint2.su/assets/notfound.gif": 404,
@@ -96,6 +95,7 @@ def retry(func: Callable[P, Coroutine[None, None, R]]) -> Callable[P, Coroutine[
             try:
                 return await func(*args, **kwargs)
             except DownloadError as e:
+                self._semaphore.record_error(e)
                 if not e.retry:
                     raise
 
@@ -130,7 +130,7 @@ class Downloader:
         self._current_attempt_filesize: dict[str, int] = {}
         self._file_lock_vault = manager.client_manager.file_locks
         self._ignore_history = manager.config_manager.settings_data.runtime_options.ignore_history
-        self._semaphore: asyncio.Semaphore = field(init=False)
+        self._semaphore: AdaptiveDownloadLimiter = field(init=False)
 
     @property
     def max_attempts(self):
@@ -141,7 +141,7 @@ class Downloader:
     def startup(self) -> None:
         """Starts the downloader."""
         self.client = self.manager.client_manager.download_client
-        self._semaphore = asyncio.Semaphore(self.manager.client_manager.get_download_slots(self.domain))
+        self._semaphore = self.manager.client_manager.get_download_limiter(self.domain)
 
         self.manager.path_manager.download_folder.mkdir(parents=True, exist_ok=True)
         if self.manager.config_manager.settings_data.sorting.sort_downloads:
@@ -162,8 +162,7 @@ class Downloader:
         self.waiting_items += 1
         media_item.current_attempt = 0
         await self.client.mark_incomplete(media_item, self.domain)
-        if not media_item.is_segment:
-            self.update_queued_files()
+        self.update_queued_files()
         server = (media_item.debrid_link or media_item.url).host
         async with self.client.server_limiter(media_item.domain, server), self._semaphore:
             await self.manager.states.RUNNING.wait()
@@ -183,6 +182,7 @@ class Downloader:
             raise DownloadError("FFmpeg Error", msg, media_item) from None
 
         media_item.complete_file = media_item.download_folder / media_item.filename
+        self.manager.path_manager.add_download_folder(media_item.download_folder)
         # TODO: register database duration from m3u8 info
         # TODO: compute approx size for UI from the m3u8 info
         media_item.download_filename = media_item.complete_file.name
@@ -191,16 +191,14 @@ class Downloader:
         task_id = self.manager.progress_manager.file_progress.add_task(domain=self.domain, filename=media_item.filename)
         media_item.set_task_id(task_id)
         video, audio, _subs = await self._download_rendition_group(media_item, m3u8_group)
-        if not audio:
-            await asyncio.to_thread(video.rename, media_item.complete_file)
-        else:
-            # TODO: add remux method to ffmpeg to create an mkv file instead of mp4
-            # Subtitles format may be incompatible with mp4 and they will be silently dropped by ffmpeg
-            # so we leave them as independent files for now
-            ffmpeg_result = await ffmpeg.merge((video, audio), media_item.complete_file)
-
-            if not ffmpeg_result.success:
-                raise DownloadError("FFmpeg Concat Error", ffmpeg_result.stderr, media_item)
+        # TODO: remux to an mkv file instead of mp4
+        # Subtitles format may be incompatible with mp4 and they will be silently dropped by ffmpeg
+        # so we leave them as independent files for now
+        streams = (video, audio) if audio else (video,)
+        ffmpeg_result = await ffmpeg.remux(streams, media_item.complete_file)
+        if not ffmpeg_result.success:
+            raise DownloadError("FFmpeg Remux Error", ffmpeg_result.stderr, media_item)
+        await asyncio.to_thread(_delete_hls_states, streams)
 
         await self.client.process_completed(media_item, self.domain)
         await self.client.handle_media_item_completion(media_item, downloaded=True)
@@ -209,36 +207,15 @@ class Downloader:
     async def _download_rendition_group(
         self, media_item: MediaItem, m3u8_group: RenditionGroup
     ) -> tuple[Path, Path | None, Path | None]:
-        async def download(m3u8: M3U8):
+        async def download(m3u8: M3U8) -> Path:
             assert m3u8.media_type
-            download_folder = media_item.complete_file.with_suffix(".cdl_hls") / m3u8.media_type
-            coros = self._prepare_hls_downloads(media_item, m3u8, download_folder)
-            n_segmets = len(m3u8.segments)
-            if n_segmets > 1:
-                suffix = f".{m3u8.media_type}.ts"
-            else:
-                suffix = media_item.complete_file.suffix + Path(m3u8.segments[0].absolute_uri).suffix
-
-            output = media_item.complete_file.with_suffix(suffix)
-            if await asyncio.to_thread(output.is_file):
-                return output
-
-            batch_size = _VIDEO_HLS_BATCH_SIZE if m3u8.media_type == "video" else _AUDIO_HLS_BATCH_SIZE
-            tasks_results = await aio.gather(coros, batch_size=batch_size)
-            n_successful = sum(1 for result in tasks_results if result.downloaded)
-
-            if n_successful != n_segmets:
-                msg = f"Download of some segments failed. Successful: {n_successful:,}/{n_segmets:,} "
-                raise DownloadError("HLS Seg Error", msg, media_item)
-
-            seg_paths = [result.item.complete_file for result in tasks_results]
-
-            if n_segmets > 1:
-                ffmpeg_result = await ffmpeg.concat(seg_paths, output)
-                if not ffmpeg_result.success:
-                    raise DownloadError("FFmpeg Concat Error", ffmpeg_result.stderr, media_item)
-            else:
-                await asyncio.to_thread(seg_paths[0].rename, output)
+            segment_urls = [parse_url(segment.absolute_uri) for segment in m3u8.segments]
+            suffix = segment_urls[0].suffix if len(segment_urls) == 1 else ""
+            output = media_item.complete_file.with_suffix(f".{m3u8.media_type}{suffix or '.ts'}")
+            max_pending = _VIDEO_HLS_MAX_PENDING if m3u8.media_type == "video" else _AUDIO_HLS_MAX_PENDING
+            await self.client.download_hls_stream(
+                self.domain, media_item, segment_urls, output, max_pending=max_pending, max_attempts=self.max_attempts
+            )
             return output
 
         audio = subtitles = None
@@ -248,6 +225,7 @@ class Downloader:
             except Exception as e:
                 log(f"Unable to download subtitles for {media_item.url}, Skipping. {e!r}", 40)
             else:
+                await asyncio.to_thread(_delete_hls_states, (subtitles,))
                 log(
                     f"Found subtitles for {media_item.url}, but CDL is currently unable to merge them. Subtitle were saved at {subtitles} ",
                     30,
@@ -258,41 +236,6 @@ class Downloader:
         video = await download(m3u8_group.video)
         return video, audio, subtitles
 
-    def _prepare_hls_downloads(
-        self, media_item: MediaItem, m3u8: M3U8, download_folder: Path
-    ) -> list[Coroutine[None, None, SegmentDownloadResult]]:
-        padding = max(5, len(str(len(m3u8.segments))))
-
-        def create_segments() -> Generator[HlsSegment]:
-            for index, segment in enumerate(m3u8.segments, 1):
-                assert segment.uri
-                name = f"{index:0{padding}d}.cdl_hls"
-                yield HlsSegment(segment.title, name, parse_url(segment.absolute_uri))
-
-        async def download_segment(segment: HlsSegment):
-            # TODO: segments download should bypass the downloads slots limits.
-            # They count as a single download
-            seg_media_item = MediaItem.from_item(
-                media_item,
-                segment.url,
-                domain=media_item.domain,
-                download_folder=download_folder,
-                filename=segment.name,
-                ext=media_item.ext,
-                is_segment=True,
-                # add_to_database=False,
-                # quiet=True,
-                # reference=media_item,
-                # skip_hashing=True,
-            )
-
-            return SegmentDownloadResult(
-                seg_media_item,
-                await self.start_download(seg_media_item),
-            )
-
-        return [download_segment(segment) for segment in create_segments()]
-
     async def finalize_download(self, media_item: MediaItem, downloaded: bool) -> None:
         if downloaded:
             await asyncio.to_thread(Path.chmod, media_item.complete_file, 0o666)
@@ -382,8 +325,6 @@ class Downloader:
 
     def attempt_task_removal(self, media_item: MediaItem) -> None:
         """Attempts to remove the task from the progress bar."""
-        if media_item.is_segment:
-            return
         if media_item.task_id is not None:
             try:
                 self.manager.progress_manager.file_progress.remove_task(media_item.task_id)
@@ -400,8 +341,7 @@ class Downloader:
         except TooManyCrawlerErrors:
             return False
 
-        if not media_item.is_segment:
-            log(f"{self.log_prefix} starting: {media_item.url}", 20)
+        log(f"{self.log_prefix} starting: {media_item.url}", 20)
         lock = self._file_lock_vault.get_lock(media_item.filename)
         async with lock:
             return bool(await self.download(media_item))
@@ -417,24 +357,23 @@ class Downloader:
             await self.manager.states.RUNNING.wait()
             self.client.client_manager.check_domain_errors(self.domain)
             media_item.current_attempt = media_item.current_attempt or 1
-            if not media_item.is_segment:
-                media_item.duration = await self.manager.db_manager.history_table.get_duration(self.domain, media_item)
-                await self.check_file_can_download(media_item)
+            media_item.duration = await self.manager.db_manager.history_table.get_duration(self.domain, media_item)
+            await self.check_file_can_download(media_item)
+            start_time = time.perf_counter()
             downloaded = await self.client.download_file(self.domain, media_item)
             if downloaded:
                 await asyncio.to_thread(Path.chmod, media_item.complete_file, 0o666)
-                if not media_item.is_segment:
-                    await self.set_file_datetime(media_item, media_item.complete_file)
-                    self.attempt_task_removal(media_item)
-                    self.manager.progress_manager.download_progress.add_completed()
-                    log(f"Download finished: {media_item.url}", 20)
+                self._semaphore.record_success(media_item.filesize, time.perf_counter() - start_time)
+                await self.set_file_datetime(media_item, media_item.complete_file)
+                self.attempt_task_removal(media_item)
+                self.manager.progress_manager.download_progress.add_completed()
+                log(f"Download finished: {media_item.url}", 20)
             return downloaded
 
         except RestrictedFiletypeError:
-            if not media_item.is_segment:
-                log(f"Download skip {media_item.url} due to ignore_extension config ({media_item.ext})", 10)
-                self.manager.progress_manager.download_progress.add_skipped()
-                self.attempt_task_removal(media_item)
+            log(f"Download skip {media_item.url} due to ignore_extension config ({media_item.ext})", 10)
+            self.manager.progress_manager.download_progress.add_skipped()
+            self.attempt_task_removal(media_item)
 
         except RestrictedDateRangeError:
             timestamp_str = (
@@ -490,6 +429,11 @@ class Downloader:
         )
 
 
+def _delete_hls_states(files: Iterable[Path]) -> None:
+    for file in files:
+        hls_stream.get_state_file(file).unlink(missing_ok=True)
+
+
 def is_4xx_client_error(status_code: int) -> bool:
     """Checks whether the HTTP status code is 4xx client error."""
     return isinstance(status_code, str) or (HTTPStatus.BAD_REQUEST <= status_code < HTTPStatus.INTERNAL_SERVER_ERROR)
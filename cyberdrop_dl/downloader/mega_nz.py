@@ -63,7 +63,6 @@ from http import HTTPStatus
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, Literal, NamedTuple, NotRequired, TypeAlias, TypedDict, TypeVar, cast
 
-import aiofiles
 import aiohttp
 from aiohttp import ClientTimeout
 from aiolimiter import AsyncLimiter
@@ -73,6 +72,7 @@ from Crypto.PublicKey import RSA
 from Crypto.Util import Counter
 
 from cyberdrop_dl.clients.download_client import DownloadClient
+from cyberdrop_dl.clients.file_writer import FileWriter
 from cyberdrop_dl.downloader.downloader import Downloader
 from cyberdrop_dl.exceptions import CDLBaseError, DownloadError
 from cyberdrop_dl.utils.logger import log
@@ -814,6 +814,9 @@ class MegaDownloadClient(DownloadClient):
         super().__init__(manager, manager.client_manager)
         self.decrypt_mapping: dict[URL, DecryptData] = {}
 
+    def _get_number_of_segments(self, *_) -> int:
+        return 1  # Each chunk needs to be decrypted in order
+
     async def _append_content(self, media_item: MediaItem, content: aiohttp.StreamReader) -> None:
         """Appends content to a file."""
 
@@ -826,7 +829,9 @@ class MegaDownloadClient(DownloadClient):
         crypto_data = self.decrypt_mapping[media_item.url]
         chunk_decryptor = MegaDecryptor(crypto_data)
 
-        async with aiofiles.open(media_item.partial_file, mode="ab") as f:
+        media_item.hashes = {}
+        hashers = self.manager.hash_manager.get_download_hashers(media_item)
+        async with FileWriter(media_item.partial_file, hashers=tuple(hashers.values())) as f:
             for _, chunk_size in get_chunks(crypto_data.file_size):
                 await self.manager.states.RUNNING.wait()
                 raw_chunk = await content.readexactly(chunk_size)
@@ -840,6 +845,7 @@ class MegaDownloadClient(DownloadClient):
 
         self._post_download_check(media_item, content)
         chunk_decryptor.check_mac_integrity()
+        media_item.hashes = {hash_type: hasher.hexdigest() for hash_type, hasher in hashers.items()}
 
     def _pre_download_check(self, media_item: MediaItem) -> Coroutine[Any, Any, None]:
         def prepare() -> None:
@@ -864,7 +870,7 @@ class MegaDownloader(Downloader):
     def startup(self) -> None:
         """Starts the downloader."""
         self.client = MegaDownloadClient(self.manager)  # type: ignore[reportIncompatibleVariableOverride]
-        self._semaphore = asyncio.Semaphore(self.manager.client_manager.get_download_slots(self.domain))
+        self._semaphore = self.manager.client_manager.get_download_limiter(self.domain)
 
     def register(self, url: URL, crypto: DecryptData) -> None:
         self.client.decrypt_mapping[url] = crypto
@@ -14,5 +14,6 @@ if ENABLE_DEBUG_CRAWLERS:
 DEBUG_LOG_FOLDER = os.getenv("CDL_DEBUG_LOG_FOLDER")
 PROFILING = os.getenv("CDL_PROFILING")
 PIXELDRAIN_PROXY = os.getenv("CDL_PIXELDRAIN_PROXY")
+HTML_PARSER = os.getenv("CDL_HTML_PARSER")
 MAX_CRAWLER_ERRORS = int(os.getenv("CDL_MAX_CRAWLER_ERRORS") or 10)
 DEBUG_VAR = RUNNING_IN_IDE or DEBUG_LOG_FOLDER or PROFILING
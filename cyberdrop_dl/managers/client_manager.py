@@ -17,12 +17,13 @@ from aiohttp import ClientResponse, ClientSession
 from aiohttp_client_cache.response import CachedResponse
 from aiohttp_client_cache.session import CachedSession
 from aiolimiter import AsyncLimiter
-from bs4 import BeautifulSoup
-from videoprops import get_audio_properties, get_video_properties
 
 from cyberdrop_dl import constants, env
+from cyberdrop_dl.clients import ddos_guard
 from cyberdrop_dl.clients.download_client import DownloadClient
+from cyberdrop_dl.clients.download_limiter import AdaptiveDownloadLimiter
 from cyberdrop_dl.clients.flaresolverr import FlareSolverr
+from cyberdrop_dl.clients.rate_limiter import AdaptiveRateLimiter
 from cyberdrop_dl.clients.response import AbstractResponse
 from cyberdrop_dl.clients.scraper_client import ScraperClient
 from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL, MediaItem
@@ -45,6 +46,7 @@ if TYPE_CHECKING:
     from http.cookies import BaseCookie
 
     from aiohttp_client_cache.response import CachedResponse
+    from bs4 import BeautifulSoup
     from curl_cffi.requests import AsyncSession
     from curl_cffi.requests.models import Response as CurlResponse
 
@@ -66,6 +68,7 @@ _DOWNLOAD_ERROR_ETAGS = {
 }
 
 _crawler_errors: dict[str, int] = defaultdict(int)
+_LEARNED_RATES_CACHE_KEY = "learned_rate_limits"
 
 
 if TYPE_CHECKING:
@@ -94,32 +97,6 @@ class DownloadSpeedLimiter(AsyncLimiter):
         return f"{self.__class__.__name__}(speed_limit={self.max_rate}, chunk_size={self.chunk_size})"
 
 
-class DDosGuard:
-    TITLES = ("Just a moment...", "DDoS-Guard")
-    SELECTORS = (
-        "#cf-challenge-running",
-        ".ray_id",
-        ".attack-box",
-        "#cf-please-wait",
-        "#challenge-spinner",
-        "#trk_jschal_js",
-        "#turnstile-wrapper",
-        ".lds-ring",
-    )
-    ALL_SELECTORS = ", ".join(SELECTORS)
-
-
-class CloudflareTurnstile:
-    TITLES = ("Simpcity Cuck Detection", "Attention Required! | Cloudflare", "Sentinel CAPTCHA")
-    SELECTORS = (
-        "captchawrapper",
-        "cf-turnstile",
-        "script[src*='challenges.cloudflare.com/turnstile']",
-        "script:-soup-contains('Dont open Developer Tools')",
-    )
-    ALL_SELECTORS = ", ".join(SELECTORS)
-
-
 class FileLocksVault:
     """Is this necessary? No. But I want it."""
 
@@ -160,6 +137,7 @@ class ClientManager:
         self.cookies = aiohttp.CookieJar(quote_cookie=False)
         self.rate_limits: dict[str, AsyncLimiter] = {}
         self.download_slots: dict[str, int] = {}
+        self.download_limiters: dict[str, AdaptiveDownloadLimiter] = {}
         self.global_rate_limiter = AsyncLimiter(self.rate_limiting_options.rate_limit, 1)
         self.global_download_slots = asyncio.Semaphore(self.rate_limiting_options.max_simultaneous_downloads)
         self.scraper_client = ScraperClient(self)
@@ -209,6 +187,12 @@ class ClientManager:
 
         return min(instances, self.rate_limiting_options.max_simultaneous_downloads_per_domain)
 
+    def get_download_limiter(self, domain: str) -> AdaptiveDownloadLimiter:
+        """Returns the limiter of simultaneous downloads of a domain."""
+        if domain not in self.download_limiters:
+            self.download_limiters[domain] = AdaptiveDownloadLimiter(domain, self.get_download_slots(domain))
+        return self.download_limiters[domain]
+
     @staticmethod
     def cache_control(session: CachedSession, disabled: bool = False):
         if constants.DISABLE_CACHE or disabled:
@@ -384,15 +368,34 @@ class ClientManager:
             return self.rate_limits[domain]
         return self.rate_limits["other"]
 
+    def restore_learned_rate(self, domain: str) -> None:
+        """Starts the rate limiter of a domain at the rate learned on previous runs (if any)."""
+        limiter = self.rate_limits.get(domain)
+        learned_rates: dict[str, float] = self.manager.cache_manager.get(_LEARNED_RATES_CACHE_KEY) or {}
+        if isinstance(limiter, AdaptiveRateLimiter) and (rate := learned_rates.get(domain)):
+            limiter.set_rate(rate)
+            log(f"Using learned request rate for {domain}: {limiter.rate:.2f} requests per second", 10)
+
+    def save_learned_rates(self) -> None:
+        learned_rates: dict[str, float] = self.manager.cache_manager.get(_LEARNED_RATES_CACHE_KEY) or {}
+        new_rates = learned_rates.copy()
+        for domain, limiter in self.rate_limits.items():
+            if not isinstance(limiter, AdaptiveRateLimiter):
+                continue
+            if limiter.is_throttled:
+                new_rates[domain] = round(limiter.rate, 3)
+            else:
+                _ = new_rates.pop(domain, None)
+
+        if new_rates != learned_rates:
+            self.manager.cache_manager.save(_LEARNED_RATES_CACHE_KEY, new_rates)
+
     async def check_http_status(
         self,
         response: ClientResponse | CachedResponse | CurlResponse | AbstractResponse,
         download: bool = False,
-    ) -> BeautifulSoup | None:
-        """Checks the HTTP status code and raises an exception if it's not acceptable.
-
-        If the response is successful and has valid html, returns soup
-        """
+    ) -> None:
+        """Checks the HTTP status code and raises an exception if it's not acceptable."""
         if not isinstance(response, AbstractResponse):
             response = AbstractResponse.from_resp(response)
 
@@ -403,17 +406,12 @@ class ClientManager:
                 message = _DOWNLOAD_ERROR_ETAGS[e_tag]
                 raise DownloadError(HTTPStatus.NOT_FOUND, message=message)
 
-        async def check_ddos_guard() -> BeautifulSoup | None:
-            if "html" not in response.content_type:
-                return
+        async def check_ddos_guard() -> None:
             try:
-                soup = BeautifulSoup(await response.text(), "html.parser")
+                if await response.is_challenge_page():
+                    raise DDOSGuardError
             except UnicodeDecodeError:
                 return
-            else:
-                if self.check_ddos_guard(soup) or self.check_cloudflare(soup):
-                    raise DDOSGuardError
-                return soup
 
         check_etag()
         if HTTPStatus.OK <= response.status < HTTPStatus.BAD_REQUEST:
@@ -451,40 +449,55 @@ class ClientManager:
 
     @staticmethod
     def check_ddos_guard(soup: BeautifulSoup) -> bool:
-        if (title := soup.select_one("title")) and (title_str := title.string):
-            if any(title.casefold() == title_str.casefold() for title in DDosGuard.TITLES):
-                return True
-
-        return bool(soup.select_one(DDosGuard.ALL_SELECTORS))
+        return ddos_guard.check_ddos_guard(soup)
 
     @staticmethod
     def check_cloudflare(soup: BeautifulSoup) -> bool:
-        if (title := soup.select_one("title")) and (title_str := title.string):
-            if any(title.casefold() == title_str.casefold() for title in CloudflareTurnstile.TITLES):
-                return True
+        return ddos_guard.check_cloudflare(soup)
+
+    async def probe_file_duration(self, media_item: MediaItem) -> None:
+        """Gets the runtime of a downloaded file with ffprobe, if it is unknown and something needs it.
 
-        return bool(soup.select_one(CloudflareTurnstile.ALL_SELECTORS))
+        The ffprobe result is cached in the database, so the sorter does not need to probe the file again"""
+        if media_item.duration:
+            return
+
+        ext = media_item.ext.lower()
+        sorting = self.manager.config.sorting
+        if ext in constants.FILE_FORMATS["Videos"]:
+            needs_duration = self._has_duration_limits("video") or (sorting.sort_downloads and sorting.sorted_video)
+        elif ext in constants.FILE_FORMATS["Audio"]:
+            needs_duration = self._has_duration_limits("audio") or (sorting.sort_downloads and sorting.sorted_audio)
+        else:
+            return
+
+        if not needs_duration:
+            return
+        try:
+            probe_result = await self.manager.db_manager.media_properties_table.probe(media_item.complete_file)
+        except Exception as e:
+            # The file is already downloaded. A probe error must never fail it
+            log(f"Unable to get the duration of {media_item.complete_file}: {e!r}", 30)
+            return
+        if not probe_result:
+            return
+        stream = probe_result.video if ext in constants.FILE_FORMATS["Videos"] else probe_result.audio
+        if stream and stream.duration:
+            media_item.duration = stream.duration
+
+    def _has_duration_limits(self, media_type: Literal["video", "audio"]) -> bool:
+        duration_limits = self.manager.config.media_duration_limits
+        if media_type == "video":
+            return bool(duration_limits.minimum_video_duration or duration_limits.maximum_video_duration)
+        return bool(duration_limits.minimum_audio_duration or duration_limits.maximum_audio_duration)
 
     def check_file_duration(self, media_item: MediaItem) -> bool:
         """Checks the file runtime against the config runtime limits."""
-        if media_item.is_segment:
-            return True
-
         is_video = media_item.ext.lower() in constants.FILE_FORMATS["Videos"]
         is_audio = media_item.ext.lower() in constants.FILE_FORMATS["Audio"]
         if not (is_video or is_audio):
             return True
 
-        def get_duration() -> float | None:
-            if media_item.duration:
-                return media_item.duration
-            props: dict = {}
-            if is_video:
-                props: dict = get_video_properties(str(media_item.complete_file))
-            elif is_audio:
-                props: dict = get_audio_properties(str(media_item.complete_file))
-            return float(props.get("duration", 0)) or None
-
         duration_limits = self.manager.config.media_duration_limits
         min_video_duration: float = duration_limits.minimum_video_duration.total_seconds()
         max_video_duration: float = duration_limits.maximum_video_duration.total_seconds()
@@ -497,9 +510,7 @@ class ClientManager:
         if is_audio and not any(audio_duration_limits):
             return True
 
-        duration: float = get_duration()  # type: ignore
-        media_item.duration = duration
-        if duration is None:
+        if media_item.duration is None:
             return True
 
         max_video_duration = max_video_duration or float("inf")
@@ -509,6 +520,7 @@ class ClientManager:
         return min_audio_duration <= media_item.duration <= max_audio_duration
 
     async def close(self) -> None:
+        self.save_learned_rates()
         await self.flaresolverr.close()
 
 
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import TYPE_CHECKING
 
-import aiofiles
-
-from cyberdrop_dl.clients.hash_client import HashClient
+from cyberdrop_dl.clients.hash_client import MAX_HASHING_WORKERS, HashClient
+from cyberdrop_dl.data_structures.hash import Hashing
 
 try:
     from xxhash import xxh128 as xxhasher
@@ -15,9 +17,29 @@ from hashlib import md5 as md5hasher
 from hashlib import sha256 as sha256hasher
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping, Sequence
+    from typing import Any
+
+    from cyberdrop_dl.data_structures.url_objects import MediaItem
     from cyberdrop_dl.managers.manager import Manager
 
 
+_READ_BUFFER_SIZE: int = 1024 * 1024 * 8  # 8MB
+
+
+def _hash_file(path: Path, hashers: Iterable[Any]) -> None:
+    """Reads the file once, updating every hasher with each chunk.
+
+    Runs in a worker thread. hashlib and xxhash release the GIL while hashing big buffers"""
+    buffer = bytearray(_READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with path.open("rb", buffering=0) as fp:
+        while size := fp.readinto(buffer):
+            chunk = view[:size]
+            for hasher in hashers:
+                hasher.update(chunk)
+
+
 class HashManager:
     def __init__(self, manager: Manager) -> None:
         self.xx_hasher = xxhasher
@@ -29,16 +51,35 @@ class HashManager:
     async def startup(self) -> None:
         await self.hash_client.startup()
 
+    @functools.cached_property
+    def _executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=MAX_HASHING_WORKERS, thread_name_prefix="cdl_hasher")
+
     async def hash_file(self, filename: Path | str, hash_type: str) -> str:
+        hashes = await self.hash_file_multi(filename, (hash_type,))
+        return hashes[hash_type]
+
+    async def hash_file_multi(self, filename: Path | str, hash_types: Sequence[str]) -> dict[str, str]:
+        """Computes multiple hashes of a file with a single read pass."""
         file_path = Path.cwd() / filename
-        async with aiofiles.open(file_path, "rb") as fp:
-            CHUNK_SIZE = 1024 * 1024  # 1MB
-            filedata = await fp.read(CHUNK_SIZE)
-            current_hasher = self._get_hasher(hash_type)  # Use the initialized hasher
-            while filedata:
-                current_hasher.update(filedata)
-                filedata = await fp.read(CHUNK_SIZE)
-            return current_hasher.hexdigest()
+        hashers = {hash_type: self._get_hasher(hash_type) for hash_type in hash_types}
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, _hash_file, file_path, hashers.values())
+        return {hash_type: hasher.hexdigest() for hash_type, hasher in hashers.items()}
+
+    def get_download_hashers(self, media_item: MediaItem) -> dict[str, Any]:
+        """Returns new hashers to hash a file while it is being downloaded.
+
+        Returns an empty dict if the file should not be hashed. Only `Hashing.IN_PLACE` hashes every download,
+        post-download dedupe only hashes files with the same size as another file"""
+        if self.manager.config_manager.settings_data.dupe_cleanup_options.hashing != Hashing.IN_PLACE:
+            return {}
+        return {hash_type: self._get_hasher(hash_type) for hash_type in self.hash_client.hash_types}
+
+    async def update_hashers(self, filename: Path | str, hashers: Mapping[str, Any]) -> None:
+        """Updates `hashers` with the current content of the file (ex: the data of a resumed download)."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, _hash_file, Path(filename), hashers.values())
 
     def _get_hasher(self, hash_type: str):
         if hash_type == "xx128" and not self.xx_hasher:
@@ -4,16 +4,28 @@ import os
 from dataclasses import Field, field
 from datetime import datetime
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, NamedTuple
 
 from cyberdrop_dl import env
 from cyberdrop_dl.utils.utilities import purge_dir_tree
 
 if TYPE_CHECKING:
+    from collections.abc import Collection
+
     from cyberdrop_dl.data_structures.url_objects import MediaItem
     from cyberdrop_dl.managers.manager import Manager
 
 
+class CompletedDownload(NamedTuple):
+    """What post-run processing needs to know about a completed download.
+
+    Keeping this instead of the full `MediaItem` lets the item (and its URLs, parents, callbacks, etc) be freed"""
+
+    file: Path
+    original_filename: str
+    referer: str
+
+
 class PathManager:
     def __init__(self, manager: Manager) -> None:
         self.manager = manager
@@ -31,10 +43,9 @@ class PathManager:
         self.history_db: Path = field(init=False)
         self.cache_db: Path = field(init=False)
 
-        self._completed_downloads: set[MediaItem] = set()
-        self._completed_downloads_paths: set[Path] = set()
-        self._prev_downloads: set[MediaItem] = set()
-        self._prev_downloads_paths: set[Path] = set()
+        self._completed_downloads: dict[Path, CompletedDownload] = {}
+        self._prev_downloads: set[Path] = set()
+        self._download_folders: set[Path] = set()
 
         self.main_log: Path = field(init=False)
         self.last_forum_post_log: Path = field(init=False)
@@ -154,19 +165,25 @@ class PathManager:
             self.pages_folder.mkdir(parents=True, exist_ok=True)
 
     def add_completed(self, media_item: MediaItem) -> None:
-        if media_item.is_segment:
-            return
-        self._completed_downloads.add(media_item)
-        self._completed_downloads_paths.add(media_item.complete_file)
+        file = media_item.complete_file
+        referer = str(media_item.referer) if media_item.referer else ""
+        self._completed_downloads[file] = CompletedDownload(file, media_item.original_filename, referer)
 
     def add_prev(self, media_item: MediaItem) -> None:
-        self._prev_downloads.add(media_item)
-        self._prev_downloads_paths.add(media_item.complete_file)
+        self._prev_downloads.add(media_item.complete_file)
 
     @property
-    def completed_downloads(self) -> set[MediaItem]:
-        return self._completed_downloads
+    def completed_downloads(self) -> Collection[CompletedDownload]:
+        return self._completed_downloads.values()
 
     @property
-    def prev_downloads(self) -> set[MediaItem]:
+    def prev_downloads(self) -> set[Path]:
         return self._prev_downloads
+
+    def add_download_folder(self, folder: Path) -> None:
+        self._download_folders.add(folder)
+
+    @property
+    def download_folders(self) -> set[Path]:
+        """Folders where this run downloaded (or tried to download) files."""
+        return self._download_folders
@@ -0,0 +1,138 @@
+"""Resolves the host of an URL to its crawler and checks it against domain lists (blocked domains, jdownloader whitelist, etc)
+
+Domains are matched as substrings of the host (`bunkr` matches `bunkr.si` and `cdn.bunkrr.su`).
+Instead of checking every domain with `domain in host`, all the domains of a list are compiled into an Aho-Corasick
+automaton once. Matching a host is then a single pass over its characters, regardless of the number of domains"""
+
+from __future__ import annotations
+
+import collections
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+    from cyberdrop_dl.crawlers import Crawler
+    from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL
+
+_T = TypeVar("_T")
+_MAX_CACHE_SIZE = 100_000
+
+
+class DomainMatcher(Generic[_T]):
+    """Finds the longest domain of a mapping that is a substring of a host.
+
+    If several domains of the same length match, the first one of the mapping wins"""
+
+    __slots__ = ("_best", "_transitions", "_values")
+
+    def __init__(self, domains: Mapping[str, _T]) -> None:
+        self._values: list[_T] = list(domains.values())
+        # The automaton is stored as a full DFA: One dict per state with the next state for each char
+        self._transitions: list[dict[str, int]] = [{}]
+        # (length, index) of the best domain that ends at each state. index is -1 if no domain ends there
+        self._best: list[tuple[int, int]] = [(0, -1)]
+        self._build(domains)
+
+    def _build(self, domains: Iterable[str]) -> None:
+        goto, best = self._transitions, self._best
+        for index, domain in enumerate(domains):
+            state = 0
+            for char in domain:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = goto[state][char] = len(goto)
+                    goto.append({})
+                    best.append((0, -1))
+                state = next_state
+            if _is_better((len(domain), index), best[state]):
+                best[state] = (len(domain), index)
+
+        # BFS to compute the fail links and turn the trie into a DFA
+        fail = [0] * len(goto)
+        queue = collections.deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            children = list(goto[state].items())
+            # The fail state is less deep, so its transitions are already complete
+            for char, next_state in goto[fail[state]].items():
+                _ = goto[state].setdefault(char, next_state)
+            for char, child in children:
+                fail[child] = goto[fail[state]].get(char, 0)
+                if _is_better(best[fail[child]], best[child]):
+                    best[child] = best[fail[child]]
+                queue.append(child)
+
+    def get(self, host: str) -> _T | None:
+        goto, best = self._transitions, self._best
+        state, found = 0, (0, -1)
+        for char in host:
+            state = goto[state].get(char, 0)
+            if _is_better(best[state], found):
+                found = best[state]
+        if found[1] == -1:
+            return None
+        return self._values[found[1]]
+
+    def __contains__(self, host: str) -> bool:
+        goto, best = self._transitions, self._best
+        state = 0
+        for char in host:
+            state = goto[state].get(char, 0)
+            if best[state][1] != -1:
+                return True
+        return False
+
+
+def _is_better(new: tuple[int, int], current: tuple[int, int]) -> bool:
+    if new[1] == -1:
+        return False
+    if current[1] == -1:
+        return True
+    return new[0] > current[0] or (new[0] == current[0] and new[1] < current[1])
+
+
+class DomainList:
+    """A domain list where any domain can match as a substring of the host. Results are cached per host"""
+
+    __slots__ = ("_cache", "_matcher")
+
+    def __init__(self, domains: Iterable[str]) -> None:
+        self._matcher: DomainMatcher[bool] = DomainMatcher(dict.fromkeys(domains, True))
+        self._cache: dict[str, bool] = {}
+
+    def __contains__(self, host: str) -> bool:
+        try:
+            return self._cache[host]
+        except KeyError:
+            pass
+        if len(self._cache) >= _MAX_CACHE_SIZE:
+            self._cache.clear()
+        is_in = self._cache[host] = host in self._matcher
+        return is_in
+
+
+class CrawlerRouter:
+    """Maps the host of an URL to its crawler. Results are cached per host"""
+
+    __slots__ = ("_cache", "_crawlers", "_matcher")
+
+    def __init__(self, crawlers: Mapping[str, Crawler]) -> None:
+        self._crawlers = dict(crawlers)
+        self._matcher: DomainMatcher[Crawler] = DomainMatcher(self._crawlers)
+        self._cache: dict[str, Crawler | None] = {}
+
+    def get(self, url: AbsoluteHttpURL) -> Crawler | None:
+        host = url.host
+        try:
+            return self._cache[host]
+        except KeyError:
+            pass
+        # match exact domain
+        crawler = self._crawlers.get(host)
+        if crawler is None:
+            crawler = self._matcher.get(host)
+        if len(self._cache) >= _MAX_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[host] = crawler
+        return crawler
@@ -0,0 +1,239 @@
+"""Caps the number of outstanding tasks created by crawlers.
+
+Crawlers fan out into the task group of the manager (pages -> posts -> files -> downloads). Without a limit,
+a giant profile creates millions of pending coroutines (and their `ScrapeItem`s / `MediaItem`s) long before
+they can be downloaded. Tasks are split into 2 stages:
+
+- scrape: Tasks created with `Crawler.create_task` (and the crawlers started for links found by other crawlers).
+  Only `max_running_scrape_tasks` of them run at the same time. The others wait before they start.
+  Producers wait while `max_pending_scrape_tasks` tasks are already waiting to start: `create_scrape_task` blocks and
+  crawler pagers do not yield the next page, so a big thread or profile is not turned into tasks all at once
+- download: Files handed to the downloader by `Crawler.handle_file`, until their download finishes.
+  `handle_file` waits while the download backlog is full (by count or by size), which pauses the crawler producing them.
+  Scrape tasks do not start while the download backlog is full either
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import contextvars
+import dataclasses
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Coroutine
+
+_T = TypeVar("_T")
+
+
+@dataclasses.dataclass(slots=True)
+class _ScrapeSlot:
+    held: bool = False
+
+
+# Slot of the scrape task running in the current context (if any)
+_SCRAPE_SLOT: contextvars.ContextVar[_ScrapeSlot | None] = contextvars.ContextVar("_SCRAPE_SLOT", default=None)
+
+
+class StageBudget:
+    """Keeps track of the outstanding tasks of a stage and their estimated size (in bytes).
+
+    Waiters are woken up one at a time, in order. Each waiter wakes up the next one if there is still room"""
+
+    def __init__(self, name: str, max_tasks: int, max_bytes: int = 0) -> None:
+        self.name = name
+        self.max_tasks = max_tasks
+        self.max_bytes = max_bytes  # 0 means no limit
+        self.pending = 0
+        self.running = 0
+        self.bytes = 0
+        self._waiters: collections.deque[asyncio.Future[None]] = collections.deque()
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(name={self.name!r}, running={self.running}, pending={self.pending}, "
+            f"max_tasks={self.max_tasks}, bytes={self.bytes}, max_bytes={self.max_bytes})"
+        )
+
+    @property
+    def is_full(self) -> bool:
+        return not self._has_room(0)
+
+    def _has_room(self, size: int) -> bool:
+        if self.running >= self.max_tasks:
+            return False
+        # A single item bigger than the limit is always allowed if nothing else is running
+        return not (self.max_bytes and self.running and self.bytes + size > self.max_bytes)
+
+    async def wait_for_room(self) -> None:
+        """Waits until the stage is not full, without taking a slot. The caller is not counted as pending"""
+        if self._waiters or self.is_full:
+            await self._wait(0, count=False)
+        self._wake_up_next()
+
+    async def acquire(self, size: int = 0) -> None:
+        if self._waiters or not self._has_room(size):
+            await self._wait(size)
+        self.running += 1
+        self.bytes += size
+        if not self.is_full:
+            self._wake_up_next()
+
+    def release(self, size: int = 0) -> None:
+        self.running -= 1
+        self.bytes -= size
+        self._wake_up_next()
+
+    async def _wait(self, size: int, count: bool = True) -> None:
+        self.pending += count
+        try:
+            future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            while True:
+                try:
+                    await future
+                except asyncio.CancelledError:
+                    if future.done() and not future.cancelled():
+                        self._wake_up_next()  # We were woken up. Pass it to the next waiter
+                    else:
+                        with contextlib.suppress(ValueError):
+                            self._waiters.remove(future)
+                    raise
+                if self._has_room(size):
+                    return
+                # Not enough room for this item. Keep our place at the front of the queue
+                future = asyncio.get_running_loop().create_future()
+                self._waiters.appendleft(future)
+        finally:
+            self.pending -= count
+
+    def _wake_up_next(self) -> None:
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+
+
+class TaskScheduler:
+    def __init__(
+        self,
+        task_group: asyncio.TaskGroup,
+        max_scrape_tasks: int,
+        max_downloads: int,
+        max_download_bytes: int = 0,
+        max_pending_scrape_tasks: int | None = None,
+    ) -> None:
+        self.task_group = task_group
+        self.scrape = StageBudget("scrape", max_scrape_tasks)
+        self.downloads = StageBudget("download", max_downloads, max_download_bytes)
+        self.max_pending_scrape_tasks = max_pending_scrape_tasks or max_scrape_tasks
+        self._pending_scrape_tasks = 0  # Created, but not started yet
+        self._paused_scrape_tasks = 0
+        self._blocked_producers = 0
+        self._scrape_room = asyncio.Event()
+        self._scrape_room.set()
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}(scrape={self.scrape!r}, downloads={self.downloads!r}, "
+            f"pending_scrape_tasks={self._pending_scrape_tasks})"
+        )
+
+    @property
+    def is_throttled(self) -> bool:
+        return bool(
+            self.scrape.pending or self.downloads.pending or self._paused_scrape_tasks or self._blocked_producers
+        )
+
+    def queue_depths(self) -> dict[str, int]:
+        return {
+            "scrape_running": self.scrape.running,
+            "scrape_waiting": self._pending_scrape_tasks,
+            "downloads_queued": self.downloads.running,
+            "downloads_waiting": self.downloads.pending,
+            "downloads_queued_bytes": self.downloads.bytes,
+        }
+
+    async def wait_for_scrape_room(self) -> None:
+        """Waits while `max_pending_scrape_tasks` (or more) scrape tasks are waiting to start.
+
+        If the caller is a scrape task, it gives up its slot while waiting, so the pending tasks can start"""
+        if self._scrape_room.is_set():
+            return
+        slot = _SCRAPE_SLOT.get()
+        if slot is not None and not slot.held:
+            slot = None  # Other task with the same context already gave it up
+        if slot is not None:
+            slot.held = False
+            self.scrape.release()
+        self._blocked_producers += 1
+        try:
+            while not self._scrape_room.is_set():
+                await self._scrape_room.wait()
+        finally:
+            self._blocked_producers -= 1
+        if slot is not None:
+            await self.scrape.acquire()
+            slot.held = True
+
+    async def create_scrape_task(self, coro: Coroutine[Any, Any, _T]) -> asyncio.Task[_T]:
+        """Waits until there is room for more pending scrape tasks, then schedules `coro`"""
+        try:
+            await self.wait_for_scrape_room()
+        except BaseException:
+            coro.close()
+            raise
+        return self.create_scrape_task_nowait(coro)
+
+    def create_scrape_task_nowait(self, coro: Coroutine[Any, Any, _T]) -> asyncio.Task[_T]:
+        """Schedules `coro` right away. The producer should call `wait_for_scrape_room` between batches of tasks"""
+        self._update_pending_scrape_tasks(1)
+        return self.task_group.create_task(self._run_scrape_task(coro))
+
+    def _update_pending_scrape_tasks(self, delta: int) -> None:
+        self._pending_scrape_tasks += delta
+        if self._pending_scrape_tasks < self.max_pending_scrape_tasks:
+            self._scrape_room.set()
+        else:
+            self._scrape_room.clear()
+
+    async def _run_scrape_task(self, coro: Coroutine[Any, Any, _T]) -> _T:
+        slot = _ScrapeSlot()
+        _ = _SCRAPE_SLOT.set(slot)
+        try:
+            if self.downloads.is_full:
+                self._paused_scrape_tasks += 1
+                try:
+                    await self.downloads.wait_for_room()
+                finally:
+                    self._paused_scrape_tasks -= 1
+            await self.scrape.acquire()
+        except BaseException:
+            coro.close()
+            raise
+        finally:
+            self._update_pending_scrape_tasks(-1)
+        slot.held = True
+        try:
+            return await coro
+        finally:
+            if slot.held:
+                self.scrape.release()
+
+    async def create_download_task(self, coro: Coroutine[Any, Any, _T], size: int = 0) -> asyncio.Task[_T]:
+        """Waits until the download backlog has room for the item, then schedules it"""
+        try:
+            await self.downloads.acquire(size)
+        except BaseException:
+            coro.close()
+            raise
+        return self.task_group.create_task(self._run_download_task(coro, size))
+
+    async def _run_download_task(self, coro: Coroutine[Any, Any, _T], size: int) -> _T:
+        try:
+            return await coro
+        finally:
+            self.downloads.release(size)
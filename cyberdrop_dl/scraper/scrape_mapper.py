@@ -4,7 +4,7 @@ import asyncio
 import re
 from datetime import date, datetime
 from pathlib import Path
-from typing import TYPE_CHECKING, Literal, Self
+from typing import TYPE_CHECKING, Any, Literal, Self
 
 import aiofiles
 from yarl import URL
@@ -20,13 +20,15 @@ from cyberdrop_dl.crawlers.wordpress import WordPressHTMLCrawler, WordPressMedia
 from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL, MediaItem, ScrapeItem
 from cyberdrop_dl.downloader.downloader import Downloader
 from cyberdrop_dl.exceptions import JDownloaderError, NoExtensionError
-from cyberdrop_dl.scraper.filters import has_valid_extension, is_in_domain_list, is_outside_date_range, is_valid_url
+from cyberdrop_dl.scraper.filters import has_valid_extension, is_outside_date_range, is_valid_url
 from cyberdrop_dl.scraper.jdownloader import JDownloader
+from cyberdrop_dl.scraper.router import CrawlerRouter, DomainList
+from cyberdrop_dl.scraper.scheduler import TaskScheduler
 from cyberdrop_dl.utils.logger import log, log_spacer
 from cyberdrop_dl.utils.utilities import get_download_path, get_filename_and_ext, remove_trailing_slash
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncGenerator, Generator
+    from collections.abc import AsyncGenerator, Callable, Coroutine, Generator
     from types import TracebackType
 
     import aiosqlite
@@ -38,6 +40,7 @@ if TYPE_CHECKING:
 existing_crawlers: dict[str, Crawler] = {}
 _seen_urls: set[AbsoluteHttpURL] = set()
 _crawlers_disabled_at_runtime: set[str] = set()
+_blocked_domains = DomainList(BlockedDomains.partial_match)
 
 
 class ScrapeMapper:
@@ -54,6 +57,11 @@ class ScrapeMapper:
         self.count = 0
         self.fallback_generic: GenericCrawler
         self.real_debrid: RealDebridCrawler
+        self.router: CrawlerRouter
+        self.skip_hosts: DomainList | None = None
+        self.only_hosts: DomainList | None = None
+        self.jdownloader_whitelisted_hosts: DomainList | None = None
+        self.scheduler: TaskScheduler
 
     """~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~"""
 
@@ -78,10 +86,20 @@ class ScrapeMapper:
         for crawler in generic_crawlers:
             register_crawler(self.existing_crawlers, crawler(self.manager), from_user=True)
         disable_crawlers_by_config(self.existing_crawlers, self.global_settings.general.disable_crawlers)
+        self.router = CrawlerRouter(self.existing_crawlers)
+
+        ignore_options = self.manager.config_manager.settings_data.ignore_options
+        if ignore_options.skip_hosts:
+            self.skip_hosts = DomainList(ignore_options.skip_hosts)
+        if ignore_options.only_hosts:
+            self.only_hosts = DomainList(ignore_options.only_hosts)
+        if self.jdownloader_whitelist:
+            self.jdownloader_whitelisted_hosts = DomainList(self.jdownloader_whitelist)
 
     async def start_real_debrid(self) -> None:
         """Starts RealDebrid."""
         self.existing_crawlers["real-debrid"] = self.real_debrid = real = RealDebridCrawler(self.manager)
+        self.router = CrawlerRouter(self.existing_crawlers)
         await real.startup()
 
     async def __aenter__(self) -> Self:
@@ -90,6 +108,13 @@ class ScrapeMapper:
         await self.manager.client_manager.__aenter__()
         self.manager.task_group = asyncio.TaskGroup()
         await self.manager.task_group.__aenter__()
+        rate_limiting_options = self.global_settings.rate_limiting_options
+        self.scheduler = TaskScheduler(
+            self.manager.task_group,
+            max_scrape_tasks=rate_limiting_options.max_running_scrape_tasks,
+            max_downloads=rate_limiting_options.max_queued_downloads,
+            max_download_bytes=rate_limiting_options.max_queued_downloads_size,
+        )
         return self
 
     async def __aexit__(
@@ -108,8 +133,19 @@ class ScrapeMapper:
         self.jdownloader.connect()
         await self.start_real_debrid()
         self.no_crawler_downloader.startup()
-        async for item in self.get_input_items():
-            self.manager.task_group.create_task(self.send_to_crawler(item))
+        await self.process_input_items()
+
+    async def process_input_items(self) -> None:
+        """Sends input items to their crawlers.
+
+        At most `input_queue_size` items can be waiting for their crawler to start them. New items are only read from
+        the input when one of them starts, so a huge input file does not create all of its items (and their tasks) at once
+        """
+        slots = asyncio.Semaphore(self.global_settings.rate_limiting_options.input_queue_size)
+        async with asyncio.TaskGroup() as task_group:
+            async for item in self.get_input_items():
+                await slots.acquire()
+                task_group.create_task(self.send_to_crawler(item, on_start=slots.release))
 
     async def get_input_items(self) -> AsyncGenerator[ScrapeItem]:
         item_limit = 0
@@ -213,24 +249,36 @@ class ScrapeMapper:
         if self.filter_items(scrape_item):
             await self.send_to_crawler(scrape_item)
 
-    async def send_to_crawler(self, scrape_item: ScrapeItem) -> None:
-        """Maps URLs to their respective handlers."""
+    async def send_to_crawler(self, scrape_item: ScrapeItem, *, on_start: Callable[[], object] | None = None) -> None:
+        """Maps URLs to their respective handlers.
+
+        `on_start` is called when the handler starts running (or right away if there is no handler for the URL)"""
+        handler = None
+        try:
+            handler = await self._get_handler(scrape_item)
+        finally:
+            if handler is None and on_start is not None:
+                on_start()
+        if handler is not None:
+            if on_start is not None:
+                handler = _call_on_start(handler, on_start)
+            await self.scheduler.create_scrape_task(handler)
+
+    async def _get_handler(self, scrape_item: ScrapeItem) -> Coroutine[Any, Any, Any] | None:
         scrape_item.url = remove_trailing_slash(scrape_item.url)
-        crawler_match = match_url_to_crawler(self.existing_crawlers, scrape_item.url)
+        crawler_match = self.router.get(scrape_item.url)
         jdownloader_whitelisted = True
-        if self.jdownloader_whitelist:
-            jdownloader_whitelisted = any(domain in scrape_item.url.host for domain in self.jdownloader_whitelist)
+        if self.jdownloader_whitelisted_hosts is not None:
+            jdownloader_whitelisted = scrape_item.url.host in self.jdownloader_whitelisted_hosts
 
         if crawler_match:
             if not crawler_match.ready:
                 await crawler_match.startup()
-            self.manager.task_group.create_task(crawler_match.run(scrape_item))
-            return
+            return crawler_match.run(scrape_item)
 
         if not self.real_debrid.disabled and self.real_debrid.is_supported(scrape_item.url):
             log(f"Using RealDebrid for unsupported URL: {scrape_item.url}", 10)
-            self.manager.task_group.create_task(self.real_debrid.run(scrape_item))
-            return
+            return self.real_debrid.run(scrape_item)
 
         if has_valid_extension(scrape_item.url):
             if await self.skip_no_crawler_by_config(scrape_item):
@@ -245,8 +293,7 @@ class ScrapeMapper:
             except NoExtensionError:
                 filename, _ = get_filename_and_ext(scrape_item.url.name, forum=True)
             media_item = MediaItem.from_item(scrape_item, scrape_item.url, domain, download_folder, filename)
-            self.manager.task_group.create_task(self.no_crawler_downloader.run(media_item))
-            return
+            return self.no_crawler_downloader.run(media_item)
 
         if self.jdownloader.enabled and jdownloader_whitelisted:
             log(f"Sending unsupported URL to JDownloader: {scrape_item.url}", 20)
@@ -272,8 +319,7 @@ class ScrapeMapper:
         if self.enable_generic_crawler:
             if not self.fallback_generic.ready:
                 await self.fallback_generic.startup()
-            self.manager.task_group.create_task(self.fallback_generic.run(scrape_item))
-            return
+            return self.fallback_generic.run(scrape_item)
 
         log(f"Unsupported URL: {scrape_item.url}", 30)
         self.manager.log_manager.write_unsupported_urls_log(
@@ -291,10 +337,7 @@ class ScrapeMapper:
             return False
         _seen_urls.add(scrape_item.url)
 
-        if (
-            is_in_domain_list(scrape_item, BlockedDomains.partial_match)
-            or scrape_item.url.host in BlockedDomains.exact_match
-        ):
+        if scrape_item.url.host in _blocked_domains or scrape_item.url.host in BlockedDomains.exact_match:
             log(f"Skipping {scrape_item.url} as it is a blocked domain", 10)
             return False
 
@@ -304,13 +347,11 @@ class ScrapeMapper:
             log(f"Skipping {scrape_item.url} as it is outside of the desired date range", 10)
             return False
 
-        skip_hosts = self.manager.config_manager.settings_data.ignore_options.skip_hosts
-        if skip_hosts and is_in_domain_list(scrape_item, skip_hosts):
+        if self.skip_hosts is not None and scrape_item.url.host in self.skip_hosts:
             log(f"Skipping URL by skip_hosts config: {scrape_item.url}", 10)
             return False
 
-        only_hosts = self.manager.config_manager.settings_data.ignore_options.only_hosts
-        if only_hosts and not is_in_domain_list(scrape_item, only_hosts):
+        if self.only_hosts is not None and scrape_item.url.host not in self.only_hosts:
             log(f"Skipping URL by only_hosts config: {scrape_item.url}", 10)
             return False
 
@@ -381,6 +422,11 @@ def regex_links(line: str) -> Generator[AbsoluteHttpURL]:
             log(f"Unable to parse URL from input file: {link} {e:!r}", 40)
 
 
+async def _call_on_start(handler: Coroutine[Any, Any, Any], on_start: Callable[[], object]) -> None:
+    on_start()
+    await handler
+
+
 def _create_item_from_row(row: aiosqlite.Row) -> ScrapeItem:
     referer: str = row["referer"]
     url = AbsoluteHttpURL(referer, encoded="%" in referer)
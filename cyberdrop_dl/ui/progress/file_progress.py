@@ -42,6 +42,22 @@ class FileProgress(DequeProgress):
             use_columns = vertical_columns
         self._progress = Progress(*use_columns)
         super().__init__("Downloads", visible_tasks_limit)
+        self._limits = Progress("[progress.description]{task.description}")
+        self._limits_task_id = self._limits.add_task("", visible=False)
+        self._progress_group.renderables.append(self._limits)
+
+    def redraw(self) -> None:
+        super().redraw()
+        throttled = [
+            f"{limiter.domain} ({limiter.limit}/{limiter.max_limit})"
+            for limiter in self.manager.client_manager.download_limiters.values()
+            if limiter.is_throttled
+        ]
+        self._limits.update(
+            self._limits_task_id,
+            description=f"[{self.color}]Reduced download limits: {', '.join(throttled)}",
+            visible=bool(throttled),
+        )
 
     def get_queue_length(self) -> int:
         """Returns the number of tasks in the downloader queue."""
@@ -22,6 +22,9 @@ class ScrapingProgress(DequeProgress):
         self._progress = Progress(SpinnerColumn(), "[progress.description]{task.description}")
         visible_tasks_limit: int = manager.config_manager.global_settings_data.ui_options.scraping_item_limit
         super().__init__("Scraping", visible_tasks_limit)
+        self._scheduler = Progress("[progress.description]{task.description}")
+        self._scheduler_task_id = self._scheduler.add_task("", visible=False)
+        self._progress_group.renderables.append(self._scheduler)
 
     def get_queue_length(self) -> int:
         """Returns the number of tasks in the scraper queue."""
@@ -38,6 +41,18 @@ class ScrapingProgress(DequeProgress):
 
     def redraw(self, passed: bool = False) -> None:
         super().redraw()
+        scheduler = getattr(self.manager.scrape_mapper, "scheduler", None)
+        if scheduler is not None:
+            depths = scheduler.queue_depths()
+            self._scheduler.update(
+                self._scheduler_task_id,
+                description=(
+                    f"[{self.color}]Task budget reached: {depths['scrape_running']:,} scrape tasks running"
+                    f" ({depths['scrape_waiting']:,} waiting), {depths['downloads_queued']:,} files queued"
+                    f" ({depths['downloads_waiting']:,} waiting)"
+                ),
+                visible=scheduler.is_throttled,
+            )
         if not passed:
             self.manager.progress_manager.file_progress.redraw()
 
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import functools
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING, Any, NamedTuple, ParamSpec, TypeVar
 
 import bs4.css
+from bs4 import BeautifulSoup
 
+from cyberdrop_dl import env
 from cyberdrop_dl.exceptions import ScrapeError
 
 if TYPE_CHECKING:
@@ -17,6 +22,47 @@ P = ParamSpec("P")
 R = TypeVar("R")
 
 
+def _get_html_parser() -> str:
+    """Returns the fastest tree builder available for BeautifulSoup.
+
+    `lxml` is a C extension, several times faster than the builtin `html.parser`. It is optional"""
+    if env.HTML_PARSER:
+        return env.HTML_PARSER
+    try:
+        import lxml  # noqa: F401  # pyright: ignore[reportMissingModuleSource, reportUnusedImport]
+    except ImportError:
+        return "html.parser"
+    return "lxml"
+
+
+HTML_PARSER: str = _get_html_parser()
+_MIN_SIZE_TO_PARSE_IN_THREAD: int = 1024 * 32  # 32KB. Smaller pages parse faster than the thread hop
+
+
+def make_soup(markup: str | bytes) -> BeautifulSoup:
+    return BeautifulSoup(markup, HTML_PARSER)
+
+
+@functools.cache
+def _get_parser_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="cdl_html_parser")
+
+
+async def run_in_parser_pool(func: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+    """Runs a parsing / extraction function in a worker thread, to keep the event loop responsive.
+
+    The function must only work with objects no one else is using at the same time (ex: a new soup)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_parser_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def make_soup_async(markup: str | bytes) -> BeautifulSoup:
+    """Same as `make_soup`, but big pages are parsed in a worker thread."""
+    if len(markup) < _MIN_SIZE_TO_PARSE_IN_THREAD:
+        return make_soup(markup)
+    return await run_in_parser_pool(make_soup, markup)
+
+
 class SelectorError(ScrapeError):
     def __init__(self, message: str | None = None) -> None:
         super().__init__(422, message)
@@ -31,7 +31,8 @@ class Args:
     CODEC_COPY = "-c", "copy"
     MAP_ALL_STREAMS = "-map", "0"
     CONCAT = "-f", "concat", "-safe", "0", "-i"
-    FIXUP_MP4 = *MAP_ALL_STREAMS, "-ignore_unknown", *CODEC_COPY, "-f", "mp4", "-movflags", "+faststart"
+    REMUX_MP4 = "-ignore_unknown", *CODEC_COPY, "-f", "mp4", "-movflags", "+faststart"
+    FIXUP_MP4 = *MAP_ALL_STREAMS, *REMUX_MP4
     FIXUP_AUDIO_DTS_FILTER = "-bsf:a", "aac_adtstoasc"
 
 
@@ -96,6 +97,14 @@ async def merge(input_files: Sequence[Path], output_file: Path) -> SubProcessRes
     return result
 
 
+async def remux(input_files: Sequence[Path], output_file: Path) -> SubProcessResult:
+    """Copies every stream of all the inputs into a single mp4 file, without re-encoding. Deletes the inputs on success"""
+    result = await _remux(input_files, output_file=output_file)
+    if result.success:
+        await _async_delete_files(input_files)
+    return result
+
+
 @overload
 async def probe(input: Path, /) -> FFprobeResult: ...
 
@@ -156,6 +165,17 @@ async def _concat(concat_input_file: Path, output_file: Path) -> SubProcessResul
     return await _fixup_concatenated_video_file(concatenated_file, output_file)
 
 
+async def _remux(input_files: Sequence[Path], output_file: Path) -> SubProcessResult:
+    inputs = itertools.chain.from_iterable(("-i", path) for path in input_files)
+    maps = itertools.chain.from_iterable(("-map", str(index)) for index in range(len(input_files)))
+    command = *_FFMPEG_CALL_PREFIX, *inputs, *maps, *Args.REMUX_MP4
+    probe_results = await asyncio.gather(*(probe(file) for file in input_files))
+    if any((audio := result.audio) and audio.codec == "aac" for result in probe_results):
+        command += Args.FIXUP_AUDIO_DTS_FILTER
+    command = *command, output_file
+    return await _run_command(command)
+
+
 async def _merge(input_files: Sequence[Path], output_file: Path) -> SubProcessResult:
     inputs = itertools.chain.from_iterable(("-i", path) for path in input_files)
     command = *_FFMPEG_CALL_PREFIX, *inputs, *Args.MAP_ALL_STREAMS, *Args.CODEC_COPY, output_file
@@ -198,7 +218,7 @@ class Duration(NamedTuple):
         if other_parts:
             days = "".join(char for char in days if char.isdigit())
         else:
-            other_parts = days
+            other_parts, days = days, "0"
 
         days = days or "0"
         time_parts = other_parts.split(":")
@@ -67,7 +67,7 @@ class LenientJSONEncoder(json.JSONEncoder):
             return o.isoformat()
         if isinstance(o, enum.Enum):
             return self.default(o.value)
-        if isinstance(o, set):
+        if isinstance(o, set | frozenset):
             return sorted(o)
         if _is_namedtuple_instance(o):
             return o._asdict()
@@ -2,24 +2,29 @@ from __future__ import annotations
 
 import asyncio
 import itertools
+import os
 from datetime import datetime
-from fractions import Fraction
 from pathlib import Path
-from subprocess import CalledProcessError
 from typing import TYPE_CHECKING
 
 import imagesize
-from videoprops import get_audio_properties, get_video_properties
 
 from cyberdrop_dl.constants import FILE_FORMATS
-from cyberdrop_dl.utils import strings
+from cyberdrop_dl.database import Database
+from cyberdrop_dl.utils import ffmpeg, strings
 from cyberdrop_dl.utils.logger import log, log_with_color
-from cyberdrop_dl.utils.utilities import purge_dir_tree
+from cyberdrop_dl.utils.utilities import purge_folders
+from cyberdrop_dl.utils.walker import TreeWalker
 
 if TYPE_CHECKING:
-    from collections.abc import AsyncGenerator
+    from collections.abc import Iterable, Sequence
+
+    from rich.progress import TaskID
 
     from cyberdrop_dl.managers.manager import Manager
+    from cyberdrop_dl.utils.ffmpeg import FFprobeResult
+
+_SKIP_EXTS = ".cdl_hls", ".cdl_hsl", ".cdl_segments", ".part"
 
 
 async def get_modified_date(file: Path) -> datetime:
@@ -28,9 +33,19 @@ async def get_modified_date(file: Path) -> datetime:
 
 
 class Sorter:
-    def __init__(self, manager: Manager) -> None:
+    """Sorts files in 3 stages:
+
+    1. Walk: The scan folder is walked once in a worker thread (or the files are collected from a shared walker)
+    2. Probe: Files are probed concurrently. At most `sort_workers` ffprobe (or imagesize) calls run at the same time
+    3. Move: Files are renamed in the default thread pool
+
+    If `files` are given (and there is no `scan_folder`), only those files are sorted instead of the entire folder
+    """
+
+    def __init__(self, manager: Manager, files: Iterable[Path] | None = None) -> None:
         self.manager = manager
         self.download_folder = manager.path_manager.scan_folder or manager.path_manager.download_folder
+        self.files = None if files is None or manager.path_manager.scan_folder else list(files)
         self.sorted_folder = manager.path_manager.sorted_folder
         self.incrementer_format: str = manager.config_manager.settings_data.sorting.sort_incrementer_format
         self.db_manager = manager.db_manager
@@ -40,17 +55,53 @@ class Sorter:
         self.image_format: str | None = settings.sorted_image
         self.video_format: str | None = settings.sorted_video
         self.other_format: str | None = settings.sorted_other
+        self.workers: int = settings.sort_workers or os.cpu_count() or 1
+        self._probe_limiter = asyncio.Semaphore(self.workers)
+        self._walker: TreeWalker | None = None
+        self._files_to_sort: dict[str, list[Path]] = {}
+
+    def subscribe(self, walker: TreeWalker) -> bool:
+        """Collects the files to sort from the batches of `walker`, so `run` does not need to walk the download folder.
 
-    async def _get_files(self, directory: Path) -> AsyncGenerator[Path]:
-        """Finds all files in a directory and returns them in a list."""
+        `walker` must be run before `run` is called. Does nothing (and returns `False`) if only some `files` are going
+        to be sorted or if `walker` is not a recursive walk of the download folder"""
+        if self.files is not None or not walker.recursive or walker.roots != (os.fspath(self.download_folder),):
+            return False
+        self._walker = walker
+        walker.subscribe(self._add_files)
+        return True
+
+    def _add_files(self, entries: Sequence[os.DirEntry[str]]) -> None:
+        root_len = len(os.fspath(self.download_folder)) + 1
+        for entry in entries:
+            subfolder, sep, _ = entry.path[root_len:].partition(os.sep)
+            # Files directly inside the download folder are not sorted
+            if sep and entry.is_file():
+                self._files_to_sort.setdefault(subfolder, []).append(Path(entry.path).resolve())
 
-        def resolve_if_file(path: Path) -> Path | None:
-            if path.is_file():
-                return path.resolve()
+    async def _get_files_to_sort(self) -> dict[str, list[Path]]:
+        """Finds all files in the subfolders of the download folder, grouped by subfolder, with a single walk.
 
-        for file in directory.rglob("*"):
-            if file := await asyncio.to_thread(resolve_if_file, file):
-                yield file
+        The walk is skipped if the sorter is subscribed to a walker shared with other stages"""
+        if self.files is not None:
+            return await asyncio.to_thread(self._group_files, self.files)
+
+        if self._walker is None:
+            walker = TreeWalker(self.download_folder)
+            self.subscribe(walker)
+            await walker.run_async()
+        return self._files_to_sort
+
+    def _group_files(self, files: Iterable[Path]) -> dict[str, list[Path]]:
+        files_to_sort: dict[str, list[Path]] = {}
+        for file in files:
+            try:
+                subfolder, *rest = file.relative_to(self.download_folder).parts
+            except ValueError:
+                continue
+            if rest and file.is_file():
+                files_to_sort.setdefault(subfolder, []).append(file.resolve())
+        return files_to_sort
 
     def _move_file(self, old_path: Path, new_path: Path) -> bool:
         """Moves a file to a destination folder."""
@@ -89,56 +140,84 @@ class Sorter:
         log_with_color("\nSorting downloads, please wait", "cyan", 20)
         await asyncio.to_thread(self.sorted_folder.mkdir, parents=True, exist_ok=True)
 
-        files_to_sort: dict[str, list[Path]] = {}
-
         with self.manager.live_manager.get_sort_live(stop=True):
-            for subfolder in self.download_folder.iterdir():
-                if not await asyncio.to_thread(subfolder.is_dir):
-                    continue
-                files_to_sort[subfolder.name] = [file async for file in self._get_files(subfolder)]
+            files_to_sort = await self._get_files_to_sort()
             await self._sort_files(files_to_sort)
             log_with_color("DONE!", "green", 20)
 
-        purge_dir_tree(self.download_folder)
+        if self.files is not None:
+            await asyncio.to_thread(purge_folders, {file.parent for file in self.files}, self.download_folder)
+        elif self._walker is not None:
+            # The folders were already found by the walk, there is no need to walk the tree again
+            await asyncio.to_thread(self._walker.remove_empty_dirs)
 
     async def _sort_files(self, files_to_sort: dict[str, list[Path]]) -> None:
+        sort_progress = self.manager.progress_manager.sort_progress
         queue_length = len(files_to_sort)
-        self.manager.progress_manager.sort_progress.set_queue_length(queue_length)
-
-        for folder_name, files in files_to_sort.items():
-            task_id = self.manager.progress_manager.sort_progress.add_task(folder_name, len(files))
-
-            for file in files:
-                ext = file.suffix.lower()
-
-                if ext in (".cdl_hls", ".cdl_hsl", ".part"):
+        sort_progress.set_queue_length(queue_length)
+
+        # Limits the files in flight, so folders are started (and shown) in order instead of all at once
+        in_flight = asyncio.Semaphore(self.workers * 2)
+        remaining: dict[TaskID, int] = {}
+
+        async def sort_file(file: Path, folder_name: str, task_id: TaskID) -> None:
+            try:
+                await self._sort_file(file, folder_name)
+            finally:
+                in_flight.release()
+                sort_progress.advance_folder(task_id)
+                remaining[task_id] -= 1
+                if not remaining[task_id]:
+                    del remaining[task_id]
+                    sort_progress.remove_task(task_id)
+
+        async with asyncio.TaskGroup() as task_group:
+            for folder_name, files in files_to_sort.items():
+                queue_length -= 1
+                sort_progress.set_queue_length(queue_length)
+                task_id = sort_progress.add_task(folder_name, len(files))
+                if not files:
+                    sort_progress.remove_task(task_id)
                     continue
-                if ext in FILE_FORMATS["Audio"]:
-                    await self.sort_audio(file, folder_name)
-                elif ext in FILE_FORMATS["Images"]:
-                    await self.sort_image(file, folder_name)
-                elif ext in FILE_FORMATS["Videos"]:
-                    await self.sort_video(file, folder_name)
-                else:
-                    await self.sort_other(file, folder_name)
 
-                self.manager.progress_manager.sort_progress.advance_folder(task_id)
+                remaining[task_id] = len(files)
+                for file in files:
+                    await in_flight.acquire()
+                    task_group.create_task(sort_file(file, folder_name, task_id))
 
-            self.manager.progress_manager.sort_progress.remove_task(task_id)
-            queue_length -= 1
-            self.manager.progress_manager.sort_progress.set_queue_length(queue_length)
+    async def _sort_file(self, file: Path, folder_name: str) -> None:
+        ext = file.suffix.lower()
+        if ext in _SKIP_EXTS:
+            return
+        if ext in FILE_FORMATS["Audio"]:
+            await self.sort_audio(file, folder_name)
+        elif ext in FILE_FORMATS["Images"]:
+            await self.sort_image(file, folder_name)
+        elif ext in FILE_FORMATS["Videos"]:
+            await self.sort_video(file, folder_name)
+        else:
+            await self.sort_other(file, folder_name)
+
+    async def _probe(self, file: Path) -> FFprobeResult | None:
+        async with self._probe_limiter:
+            try:
+                if isinstance(self.db_manager, Database):
+                    return await self.db_manager.media_properties_table.probe(file)
+                if ffmpeg.which_ffprobe():
+                    return await ffmpeg.probe(file)
+            except (OSError, ValueError):
+                return
 
     async def sort_audio(self, file: Path, base_name: str) -> None:
         """Sorts an audio file into the sorted audio folder."""
         if not self.audio_format:
             return
         bitrate = duration = sample_rate = None
-        try:
-            props: dict = get_audio_properties(str(file))
-            duration = int(float(props.get("duration", 0))) or None
-            bitrate = int(float(props.get("bit_rate", 0))) or None
-            sample_rate = int(float(props.get("sample_rate", 0))) or None
-        except (RuntimeError, CalledProcessError):
+        if (probe_result := await self._probe(file)) and (audio := probe_result.audio):
+            duration = int(audio.duration or 0) or None
+            bitrate = audio.bitrate
+            sample_rate = audio.sample_rate
+        else:
             log(f"Unable to get audio properties of '{file}'")
 
         if await self._process_file_move(
@@ -158,7 +237,8 @@ class Sorter:
             return
         height = resolution = width = None
         try:
-            width, height = await asyncio.to_thread(imagesize.get, file)
+            async with self._probe_limiter:
+                width, height = await asyncio.to_thread(imagesize.get, file)
             if width > 0 and height > 0:
                 resolution = f"{width}x{height}"
             else:
@@ -184,26 +264,14 @@ class Sorter:
 
         codec = duration = fps = height = resolution = width = None
 
-        try:
-            props: dict = get_video_properties(str(file))
-            width = int(float(props.get("width", 0))) or None
-            height = int(float(props.get("height", 0))) or None
-            if width and height:
-                resolution = f"{width}x{height}"
-
-            codec: str | None = props.get("codec_name")
-            duration = int(float(props.get("duration", 0))) or None
-            fps = (
-                float(Fraction(props.get("avg_frame_rate", 0)))
-                if str(props.get("avg_frame_rate", 0)) not in {"0/0", "0"}
-                else None
-            )
-        except (RuntimeError, CalledProcessError):
+        if (probe_result := await self._probe(file)) and (video := probe_result.video):
+            width, height, resolution = video.width, video.height, video.resolution
+            codec = video.codec_name or None
+            duration = int(video.duration or 0) or None
+            fps = str(video.fps) if video.fps else None
+        else:
             log(f"Unable to get some video properties of '{file}'")
 
-        if fps is not None:
-            fps = str(int(fps)) if fps.is_integer() else f"{fps:.2f}"
-
         if await self._process_file_move(
             file,
             base_name,
@@ -247,4 +315,4 @@ class Sorter:
         )
 
         new_file = Path(file_path)
-        return self._move_file(file, new_file)
+        return await asyncio.to_thread(self._move_file, file, new_file)
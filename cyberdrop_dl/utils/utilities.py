@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import contextlib
 import dataclasses
 import inspect
@@ -45,9 +46,10 @@ from cyberdrop_dl.exceptions import (
 )
 from cyberdrop_dl.utils import json
 from cyberdrop_dl.utils.logger import log, log_with_color
+from cyberdrop_dl.utils.walker import TreeWalker, delete_empty_files
 
 if TYPE_CHECKING:
-    from collections.abc import Callable, Coroutine, Generator, Iterable, Mapping
+    from collections.abc import Callable, Coroutine, Generator, Iterable, Mapping, Sequence
 
     from cyberdrop_dl.crawlers import Crawler
     from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL, AnyURL, MediaItem, ScrapeItem
@@ -67,6 +69,7 @@ if TYPE_CHECKING:
 
 _ALLOWED_FILEPATH_PUNCTUATION = " .-_!#$%'()+,;=@[]^{}~"
 _BLOB_OR_SVG = ("data:", "blob:", "javascript:")
+_PARTIAL_SUFFIXES = (".part", ".part.cdl_segments")
 
 
 @contextlib.contextmanager
@@ -74,7 +77,6 @@ def error_handling_context(self: Crawler | Downloader, item: ScrapeItem | MediaI
     link: URL = item if isinstance(item, URL) else item.url
     error_log_msg = origin = exc_info = None
     link_to_show: URL | str = ""
-    is_segment: bool = getattr(item, "is_segment", False)
     is_downloader: bool = bool(getattr(self, "log_prefix", False))
     try:
         yield
@@ -107,7 +109,7 @@ def error_handling_context(self: Crawler | Downloader, item: ScrapeItem | MediaI
         exc_info = e
         error_log_msg = ErrorLogMessage.from_unknown_exc(e)
 
-    if error_log_msg is None or is_segment:
+    if error_log_msg is None:
         return
 
     link_to_show = link_to_show or link
@@ -229,14 +231,19 @@ def get_filename_and_ext(filename: str, forum: bool = False) -> tuple[str, str]:
 
 def get_download_path(manager: Manager, scrape_item: ScrapeItem, domain: str) -> Path:
     """Returns the path to the download folder."""
-    download_dir = manager.path_manager.download_folder
-
     if scrape_item.retry:
         return scrape_item.retry_path  # type: ignore
-    if scrape_item.parent_title and scrape_item.part_of_album:
-        return download_dir / scrape_item.parent_title
-    if scrape_item.parent_title:
-        return download_dir / scrape_item.parent_title / f"Loose Files ({domain})"
+    download_dir = manager.path_manager.download_folder
+    return _get_download_path(download_dir, scrape_item.parent_title, scrape_item.part_of_album, domain)
+
+
+@lru_cache(maxsize=1024)
+def _get_download_path(download_dir: Path, parent_title: str, part_of_album: bool, domain: str) -> Path:
+    # Cached so every item of an album shares the same Path object
+    if parent_title and part_of_album:
+        return download_dir / parent_title
+    if parent_title:
+        return download_dir / parent_title / f"Loose Files ({domain})"
     return download_dir / f"Loose Files ({domain})"
 
 
@@ -269,79 +276,98 @@ def clear_term():
     os.system("cls" if os.name == "nt" else "clear")
 
 
-def get_size(path: os.DirEntry) -> int | None:
-    try:
-        return path.stat(follow_symlinks=False).st_size
-    except (OSError, ValueError):
-        return
-
-
 def purge_dir_tree(dirname: Path | str) -> bool:
-    """walks and removes in place"""
+    """Deletes empty files and empty folders inside `dirname` (including itself). Returns `True` if `dirname` was deleted"""
+    walker = TreeWalker(dirname)
+    walker.subscribe(delete_empty_files)
+    walker.run()
+    return walker.remove_empty_dirs()
+
+
+def purge_folders(folders: Iterable[Path], root: Path) -> None:
+    """Same as `purge_dir_tree`, but only looks at the files directly inside `folders`.
+
+    Empty parents of the folders are also deleted, up to `root` (not included)"""
+    folders = set(folders)
+    walker = TreeWalker(*folders, recursive=False)
+    walker.subscribe(delete_empty_files)
+    walker.run()
+    _remove_empty_folders(folders, root)
+
+
+def _remove_empty_folders(folders: Iterable[Path], root: Path) -> None:
+    candidates: set[Path] = set()
+    for folder in folders:
+        while folder != root and folder.is_relative_to(root):
+            candidates.add(folder)
+            folder = folder.parent
+
+    for folder in sorted(candidates, key=lambda folder: len(folder.parts), reverse=True):
+        try:
+            folder.rmdir()
+        except OSError:
+            continue
 
-    has_non_empty_files = False
-    has_non_empty_subfolders = False
 
-    try:
-        for entry in os.scandir(dirname):
+class PartialsAndEmptyFoldersCheck:
+    """Checks for partial downloads, deletes partial files, empty files and empty folders.
+
+    Files are found by subscribing to `walker`, which is shared with the other post-run stages, so the download folder
+    is only walked once. Nothing is deleted until `run` is called (after the walk and the other stages).
+    If the walker is not recursive (its roots are the folders of this run), empty parents of the roots are also deleted"""
+
+    def __init__(self, manager: Manager, walker: TreeWalker) -> None:
+        settings = manager.config_manager.settings_data.runtime_options
+        self.manager = manager
+        self.walker = walker
+        self.delete_partials: bool = settings.delete_partial_files
+        self.check_partials: bool = not settings.skip_check_for_partial_files
+        self.delete_empty: bool = not settings.skip_check_for_empty_folders
+        self.partial_files: list[str] = []
+        self.empty_files: list[str] = []
+        if self.delete_partials or self.check_partials:
+            walker.subscribe(self._find_partial_files)
+        if self.delete_empty:
+            walker.subscribe(self._find_empty_files)
+
+    def _find_partial_files(self, entries: Sequence[os.DirEntry[str]]) -> None:
+        self.partial_files.extend(entry.path for entry in entries if entry.name.endswith(_PARTIAL_SUFFIXES))
+
+    def _find_empty_files(self, entries: Sequence[os.DirEntry[str]]) -> None:
+        for entry in entries:
             try:
-                is_dir = entry.is_dir(follow_symlinks=False)
-            except OSError:
-                is_dir = False
-            if is_dir:
-                deleted = purge_dir_tree(entry.path)
-                if not deleted:
-                    has_non_empty_subfolders = True
-            elif get_size(entry) == 0:
-                os.unlink(entry)  # noqa: PTH108
-            else:
-                has_non_empty_files = True
-
-    except (OSError, PermissionError):
-        pass
-
-    if has_non_empty_files or has_non_empty_subfolders:
-        return False
-    try:
-        os.rmdir(dirname)  # noqa: PTH106
-        return True
-    except OSError:
-        return False
-
-
-def check_partials_and_empty_folders(manager: Manager):
-    """Checks for partial downloads, deletes partial files and empty folders."""
-    settings = manager.config_manager.settings_data.runtime_options
-    if settings.delete_partial_files:
-        delete_partial_files(manager)
-    if not settings.skip_check_for_partial_files:
-        check_for_partial_files(manager)
-    if not settings.skip_check_for_empty_folders:
-        delete_empty_folders(manager)
-
-
-def delete_partial_files(manager: Manager):
-    """Deletes partial download files recursively."""
-    log_red("Deleting partial downloads...")
-    for file in manager.path_manager.download_folder.rglob("*.part"):
-        file.unlink(missing_ok=True)
-
-
-def check_for_partial_files(manager: Manager):
-    """Checks if there are partial downloads in any subdirectory and logs if found."""
-    log_yellow("Checking for partial downloads...")
-    if next(manager.path_manager.download_folder.rglob("*.part"), None) is not None:
-        log_yellow("There are partial downloads in the downloads folder")
-
-
-def delete_empty_folders(manager: Manager):
-    """Deletes empty folders efficiently."""
-    log_yellow("Checking for empty folders...")
-    purge_dir_tree(manager.path_manager.download_folder)
-
-    sorted_folder = manager.path_manager.sorted_folder
-    if sorted_folder and manager.config_manager.settings_data.sorting.sort_downloads:
-        purge_dir_tree(sorted_folder)
+                if entry.stat(follow_symlinks=False).st_size == 0:
+                    self.empty_files.append(entry.path)
+            except (OSError, ValueError):
+                continue
+
+    async def run(self) -> None:
+        if self.delete_partials:
+            log_red("Deleting partial downloads...")
+        if self.check_partials:
+            log_yellow("Checking for partial downloads...")
+            if not self.delete_partials and any(file.endswith(".part") for file in self.partial_files):
+                log_yellow("There are partial downloads in the downloads folder")
+        if self.delete_empty:
+            log_yellow("Checking for empty folders...")
+        await asyncio.to_thread(self._delete_files)
+
+    def _delete_files(self) -> None:
+        if self.delete_partials:
+            for file in self.partial_files:
+                Path(file).unlink(missing_ok=True)
+
+        if not self.delete_empty:
+            return
+        for file in self.empty_files:
+            Path(file).unlink(missing_ok=True)
+        if not self.walker.recursive:
+            _remove_empty_folders(map(Path, self.walker.roots), self.manager.path_manager.download_folder)
+            return
+        self.walker.remove_empty_dirs()
+        sorted_folder = self.manager.path_manager.sorted_folder
+        if sorted_folder and self.manager.config_manager.settings_data.sorting.sort_downloads:
+            purge_dir_tree(sorted_folder)
 
 
 def get_valid_dict(dataclass: Dataclass | type[Dataclass], info: Mapping[str, Any]) -> dict[str, Any]:
@@ -0,0 +1,116 @@
+"""Single pass `os.scandir` walker for post-run maintenance.
+
+Walking a big download folder is slow (specially on network shares), so every stage that needs the files of a tree
+(partial files, empty folders, sorting, hashing) should subscribe to a single `TreeWalker` instead of walking the tree
+on its own. The walk runs in a worker thread and subscribers get the `DirEntry`s of the files in batches.
+Subscribers are called from the worker thread, so they must not touch the event loop"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, Callable, Generator, Sequence
+    from pathlib import Path
+
+    _Subscriber = Callable[[Sequence[os.DirEntry[str]]], object]
+
+
+_BATCH_SIZE: int = 1000
+
+
+class TreeWalker:
+    """Walks one or more directory trees iteratively, without following symlinks.
+
+    Only entries that are not directories are yielded. Every directory found (including the roots)
+    is added to `directories`, parents always before their children.
+    If `recursive` is `False`, only the direct children of the roots are yielded"""
+
+    def __init__(self, *roots: Path | str, recursive: bool = True, batch_size: int = _BATCH_SIZE) -> None:
+        self.roots = tuple(map(os.fspath, roots))
+        self.recursive = recursive
+        self.batch_size = batch_size
+        self.directories: list[str] = []
+        self._subscribers: list[_Subscriber] = []
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(roots={self.roots!r}, subscribers={len(self._subscribers)})"
+
+    def subscribe(self, callback: _Subscriber) -> None:
+        self._subscribers.append(callback)
+
+    def iter_batches(self) -> Generator[list[os.DirEntry[str]]]:
+        self.directories.clear()
+        stack = list(reversed(self.roots))
+        batch: list[os.DirEntry[str]] = []
+        while stack:
+            dirname = stack.pop()
+            try:
+                scandir_it = os.scandir(dirname)
+            except OSError:
+                continue
+            self.directories.append(dirname)
+            with scandir_it:
+                while True:
+                    try:
+                        entry = next(scandir_it)
+                    except (StopIteration, OSError):
+                        break
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if self.recursive:
+                            stack.append(entry.path)
+                        continue
+                    batch.append(entry)
+                    if len(batch) >= self.batch_size:
+                        yield batch
+                        batch = []
+        if batch:
+            yield batch
+
+    async def iter_batches_async(self) -> AsyncGenerator[list[os.DirEntry[str]]]:
+        """Same as `iter_batches`, but each batch is read in a worker thread."""
+        batches = self.iter_batches()
+        while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+            yield batch
+
+    def run(self) -> None:
+        """Walks the tree on the current thread, passing every batch to all the subscribers.
+
+        Does nothing if there are no subscribers"""
+        if not self._subscribers:
+            return
+        for batch in self.iter_batches():
+            for callback in self._subscribers:
+                callback(batch)
+
+    async def run_async(self) -> None:
+        await asyncio.to_thread(self.run)
+
+    def remove_empty_dirs(self) -> bool:
+        """Removes every empty directory found by the last walk (children first).
+
+        Returns `True` if all the roots were removed"""
+        removed: set[str] = set()
+        for dirname in reversed(self.directories):
+            try:
+                os.rmdir(dirname)  # noqa: PTH106
+            except OSError:
+                continue
+            removed.add(dirname)
+        return bool(self.roots) and removed.issuperset(self.roots)
+
+
+def delete_empty_files(entries: Sequence[os.DirEntry[str]]) -> None:
+    """Subscriber that deletes files with a size of 0 bytes."""
+    for entry in entries:
+        try:
+            if entry.stat(follow_symlinks=False).st_size == 0:
+                os.unlink(entry)  # noqa: PTH108
+        except (OSError, ValueError):
+            continue
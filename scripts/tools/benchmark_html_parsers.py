@@ -0,0 +1,102 @@
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "beautifulsoup4",
+#     "lxml",
+#     "rich",
+#     "selectolax",
+# ]
+# ///
+"""Compares the time to parse saved HTML pages with every available parser.
+
+Pages can be saved with the `save_pages_html` config option. They will be inside the `cdl_responses` folder of the logs"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+from rich import print
+from rich.markup import escape
+from rich.table import Table
+
+SELECTOR = "a[href]"
+
+
+def bs4_parser(features: str) -> Callable[[str], int] | None:
+    try:
+        _ = BeautifulSoup("", features)
+    except Exception:
+        return None
+
+    def parse(html: str) -> int:
+        return len(BeautifulSoup(html, features).select(SELECTOR))
+
+    return parse
+
+
+def selectolax_parser() -> Callable[[str], int] | None:
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+    except ImportError:
+        return None
+
+    def parse(html: str) -> int:
+        return len(LexborHTMLParser(html).css(SELECTOR))
+
+    return parse
+
+
+def benchmark(parse: Callable[[str], int], pages: list[str], rounds: int) -> list[float]:
+    times: list[float] = []
+    for html in pages:
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            _ = parse(html)
+            best = min(best, time.perf_counter() - start)
+        times.append(best)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark HTML parsers with pages saved by cyberdrop-dl")
+    parser.add_argument("folder", help="Folder with the saved HTML files (cdl_responses)", type=Path)
+    parser.add_argument("--rounds", help="Number of times to parse each page (best time is used)", type=int, default=3)
+    args = parser.parse_args()
+    folder: Path = args.folder
+    pages = [file.read_text(encoding="utf8") for file in sorted(folder.rglob("*.html"))]
+    if not pages:
+        print(f"No HTML files found in {folder.resolve()}")
+        return
+
+    parsers = {
+        "bs4 + html.parser": bs4_parser("html.parser"),
+        "bs4 + lxml": bs4_parser("lxml"),
+        "selectolax (lexbor)": selectolax_parser(),
+    }
+    total_size = sum(len(html) for html in pages) / 1024 / 1024
+    table = Table(title=f"Parse + select('{escape(SELECTOR)}') of {len(pages)} pages ({total_size:.1f} MB)")
+    for column in ("Parser", "Mean (ms)", "Median (ms)", "Max (ms)", "Total (s)"):
+        table.add_column(column, justify="right" if column != "Parser" else "left")
+
+    for name, parse in parsers.items():
+        if parse is None:
+            table.add_row(name, *["not installed"] * 4)
+            continue
+        times = benchmark(parse, pages, args.rounds)
+        table.add_row(
+            name,
+            f"{statistics.mean(times) * 1000:.2f}",
+            f"{statistics.median(times) * 1000:.2f}",
+            f"{max(times) * 1000:.2f}",
+            f"{sum(times):.2f}",
+        )
+
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
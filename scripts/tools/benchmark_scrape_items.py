@@ -0,0 +1,64 @@
+"""Measures how many child `ScrapeItem`s (and `MediaItem`s) can be created per second.
+
+`ScrapeItem.copy` used to be a `copy.deepcopy`. The deepcopy numbers are included to compare both approaches.
+
+Needs to run inside the cyberdrop-dl environment"""
+
+import argparse
+import copy
+import time
+from pathlib import Path
+
+from rich import print
+from rich.table import Table
+
+from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL, MediaItem, ScrapeItem
+
+
+def make_parent(depth: int) -> ScrapeItem:
+    item = ScrapeItem(url=AbsoluteHttpURL("https://forum.example.com/threads/thread.1"))
+    item.children_limits = [0, 0, 0, 0]
+    for idx in range(depth):
+        item.add_parent(AbsoluteHttpURL(f"https://forum.example.com/threads/thread.1/post-{idx}"))
+        item.add_parent_thread(AbsoluteHttpURL(f"https://forum.example.com/threads/thread.{idx}"))
+        item.add_to_parent_title(f"Title {idx}")
+    return item
+
+
+def bench(name: str, parent: ScrapeItem, count: int, copy_func) -> tuple[str, float]:
+    urls = [AbsoluteHttpURL(f"https://host.example.com/file/{idx}.jpg") for idx in range(count)]
+    original_copy = ScrapeItem.copy
+    ScrapeItem.copy = copy_func
+    try:
+        start = time.perf_counter()
+        for url in urls:
+            child = parent.create_child(url)
+            _ = MediaItem.from_item(child, url, "example", Path("downloads"), url.name)
+        elapsed = time.perf_counter() - start
+    finally:
+        ScrapeItem.copy = original_copy
+    return name, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ScrapeItem creation")
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--depth", help="Number of parents of each item", type=int, default=3)
+    args = parser.parse_args()
+
+    parent = make_parent(args.depth)
+    results = [
+        bench("deepcopy (old)", parent, args.items, copy.deepcopy),
+        bench("shallow copy (current)", parent, args.items, ScrapeItem.copy),
+    ]
+    table = Table(title=f"{args.items:,} child items with {args.depth} parents")
+    table.add_column("ScrapeItem.copy")
+    table.add_column("Total (s)", justify="right")
+    table.add_column("Items / s", justify="right")
+    for name, elapsed in results:
+        table.add_row(name, f"{elapsed:.2f}", f"{args.items / elapsed:,.0f}")
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
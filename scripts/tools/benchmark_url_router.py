@@ -0,0 +1,86 @@
+"""Compares the time to map URLs to crawlers with a linear scan of all domains vs the compiled `CrawlerRouter`
+
+Needs to run inside the cyberdrop-dl environment (it uses the real list of supported domains)"""
+
+import argparse
+import random
+import string
+import time
+
+from rich import print
+from rich.table import Table
+
+from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL
+from cyberdrop_dl.scraper.router import CrawlerRouter, DomainMatcher
+from cyberdrop_dl.scraper.scrape_mapper import get_crawlers_mapping
+
+
+def make_hosts(domains: list[str], count: int, unique: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+
+    def random_host() -> str:
+        if rng.random() < 0.5:
+            return f"{rng.choice(('cdn', 'www', 's3', 'i'))}{rng.randint(1, 99)}.{rng.choice(domains)}"
+        name = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 15)))
+        return f"www.{name}.{rng.choice(('com', 'net', 'org'))}"
+
+    pool = [random_host() for _ in range(unique)]
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def linear_scan(domains: dict[str, object], host: str) -> object | None:
+    if crawler := domains.get(host):
+        return crawler
+    matches = (domain for domain in domains if domain in host)
+    if domain := max(matches, key=len, default=None):
+        return domains[domain]
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark URL to crawler mapping")
+    parser.add_argument("--urls", help="Number of URLs to map", type=int, default=1_000_000)
+    parser.add_argument("--unique", help="Number of unique hosts among the URLs", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    crawlers = dict(get_crawlers_mapping())
+    domains = list(crawlers)
+    hosts = make_hosts(domains, args.urls, args.unique, args.seed)
+    url_by_host = {host: AbsoluteHttpURL(f"https://{host}/file") for host in set(hosts)}
+    urls = [url_by_host[host] for host in hosts]
+
+    start = time.perf_counter()
+    matcher = DomainMatcher(crawlers)
+    router = CrawlerRouter(crawlers)
+    build_time = time.perf_counter() - start
+
+    results: dict[str, float] = {}
+    start = time.perf_counter()
+    for host in hosts:
+        _ = linear_scan(crawlers, host)
+    results["linear scan (no cache)"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for host in hosts:
+        _ = matcher.get(host)
+    results["DomainMatcher (no cache)"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for url in urls:
+        _ = router.get(url)
+    results["CrawlerRouter (cached per host)"] = time.perf_counter() - start
+
+    table = Table(title=f"{len(hosts):,} hosts ({args.unique:,} unique), {len(domains)} domains")
+    table.add_column("Method")
+    table.add_column("Total (s)", justify="right")
+    table.add_column("Per URL (µs)", justify="right")
+    for name, elapsed in results.items():
+        table.add_row(name, f"{elapsed:.2f}", f"{elapsed / len(hosts) * 1e6:.2f}")
+
+    print(table)
+    print(f"Automaton build time: {build_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
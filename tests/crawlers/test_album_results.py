@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+from unittest import mock
+
+from cyberdrop_dl.crawlers.crawler import Crawler
+from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL, ScrapeItem
+from cyberdrop_dl.scraper.scheduler import TaskScheduler
+
+_ALBUM_ID = "album_id"
+_N_FILES = 3
+
+
+class AlbumTestCrawler(Crawler):
+    SUPPORTED_PATHS = {"Album": "/a/<album_id>"}  # noqa: RUF012
+    DOMAIN = "album.test"
+    PRIMARY_URL = AbsoluteHttpURL("https://album.test")
+
+    async def fetch(self, scrape_item: ScrapeItem) -> None:
+        await self.get_album_results(_ALBUM_ID)
+        for index in range(_N_FILES):
+            self.create_task(self._process_file(index))
+
+    async def _process_file(self, index: int) -> None:
+        await asyncio.sleep(0)
+        await self.get_album_results(_ALBUM_ID)
+        media_item = mock.Mock(datetime=None, filesize=None, album_id=_ALBUM_ID, db_path=f"/file_{index}")
+        await self._schedule_download(media_item)
+
+
+async def test_album_results_are_kept_until_child_tasks_finish() -> None:
+    manager = mock.MagicMock()
+    manager.states.RUNNING = asyncio.Event()
+    manager.states.RUNNING.set()
+    history_table = manager.db_manager.history_table
+    history_table.check_album = mock.AsyncMock(return_value={f"/file_{index}": 0 for index in range(_N_FILES)})
+    history_table.check_complete = mock.AsyncMock(return_value=False)
+
+    crawler = AlbumTestCrawler(manager)
+    crawler.check_skip_by_config = mock.AsyncMock(return_value=False)
+    crawler._download = mock.AsyncMock()
+
+    async with asyncio.TaskGroup() as task_group:
+        manager.scrape_mapper.scheduler = TaskScheduler(task_group, max_scrape_tasks=10, max_downloads=10)
+        await crawler.run(ScrapeItem(url=AbsoluteHttpURL("https://album.test/a/album_id")))
+        # The album was scraped, but its files are still being processed by other tasks
+        assert _ALBUM_ID in crawler._album_results
+
+    history_table.check_album.assert_awaited_once()
+    history_table.check_complete.assert_not_awaited()
+    assert crawler._download.await_count == _N_FILES
+    assert not crawler._album_results
+    assert not crawler._album_refs
@@ -423,6 +423,26 @@ def test_lazy_load_embeds() -> None:
     assert "//redgifs.com/ifr/downrightcluelesswirm" == result[0]
 
 
+def test_parse_posts_malformed_post_should_only_fail_that_post() -> None:
+    malformed_embed = (
+        """<div class="generic2wide-iframe-div" onclick="loadMedia(this, '//redgifs.com/ifr/bad);"></div>"""
+    )
+    valid_embed = (
+        """<div class="generic2wide-iframe-div" onclick="loadMedia(this, '//redgifs.com/ifr/valid');"></div>"""
+    )
+    posts_html = "".join(
+        POST_TEMPLATE.format(id=id, message_body=body, message_attachments="")
+        for id, body in ((1, malformed_embed), (2, valid_embed))
+    )
+    soup = BeautifulSoup(_html(posts_html), "html.parser")
+    malformed, valid = TEST_CRAWLER.parse_posts(soup)
+    assert (malformed.id, malformed.links) == (1, ())
+    assert isinstance(malformed.error, ValueError)
+    assert valid.id == 2
+    assert valid.error is None
+    assert ("lazy_load_embeds", "//redgifs.com/ifr/valid") in valid.links
+
+
 @pytest.mark.parametrize(
     ("cls", "post_content", "expected_result"),
     [
@@ -1184,3 +1204,29 @@ POST_TEMPLATE = """
 </article>
 
 """
+
+
+@pytest.mark.parametrize(
+    "current_page, last_page, expected_pages",
+    [
+        ("/threads/name.123/", "/threads/name.123/page-4", [2, 3, 4]),
+        ("/threads/name.123/page-3", "/threads/name.123/page-4", [4]),
+        ("/threads/page-10-name.123/page-4", "/threads/page-10-name.123/page-4", []),
+    ],
+)
+def test_get_remaining_pages(current_page: str, last_page: str, expected_pages: list[int]) -> None:
+    html = _html(f"""
+    <ul class="pageNav-main">
+      <li class="pageNav-page pageNav-page--current"><a href="{current_page}">1</a></li>
+      <li class="pageNav-page"><a href="{last_page}">4</a></li>
+    </ul>
+    """)
+    soup = BeautifulSoup(html, "html.parser")
+    pages = _forum.get_remaining_pages(soup, TEST_CRAWLER.SELECTORS, TEST_CRAWLER.PAGE_URL_PART_NAME)
+    thread_url = last_page.rsplit("/", 1)[0]
+    assert pages == [f"{thread_url}/page-{page}" for page in expected_pages]
+
+
+def test_get_remaining_pages_single_page_thread() -> None:
+    soup = BeautifulSoup(_html("<div></div>"), "html.parser")
+    assert _forum.get_remaining_pages(soup, TEST_CRAWLER.SELECTORS, TEST_CRAWLER.PAGE_URL_PART_NAME) is None
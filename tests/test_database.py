@@ -1,17 +1,24 @@
 from __future__ import annotations
 
+import asyncio
+import os
 from datetime import datetime
 from pathlib import Path
+from types import SimpleNamespace
 from typing import TYPE_CHECKING, cast
 
+import aiosqlite
 import pytest
 
 from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL, MediaItem, ScrapeItem
+from cyberdrop_dl.database.completed_index import UNKNOWN_REFERER, CompletedIndex, fingerprint
+from cyberdrop_dl.database.tables import MediaPropertiesTable
+from cyberdrop_dl.database.write_queue import WriteQueue
 from cyberdrop_dl.scraper.scrape_mapper import _create_item_from_row
 from cyberdrop_dl.utils.utilities import parse_url
 
 if TYPE_CHECKING:
-    import aiosqlite
+    from collections.abc import AsyncGenerator
 
 _MOCK_ROW = {
     "referer": "https://drive.google.com/file/d/1F0YBsnQRvrMbK0p9UlnyLu88kqQ0j_F6/edit",
@@ -111,3 +118,117 @@ def test_create_db_path(url: str, expected: str) -> None:
     url_ = parse_url(url)
     path = MediaItem.create_db_path(url_, url_.host)
     assert path == expected
+
+
+@pytest.fixture
+async def db_conn() -> AsyncGenerator[aiosqlite.Connection]:
+    async with aiosqlite.connect(":memory:") as conn:
+        await conn.execute("CREATE TABLE media (url_path TEXT PRIMARY KEY, completed INTEGER, file_size INTEGER)")
+        yield conn
+
+
+async def test_write_queue_is_visible_before_flush(db_conn: aiosqlite.Connection) -> None:
+    queue = WriteQueue(db_conn)
+    queue.put("INSERT INTO media VALUES (?, 0, 0)", ("a",))
+    queue.put("INSERT INTO media VALUES (?, 0, 0)", ("b",))
+    queue.put("UPDATE media SET completed = 1 WHERE url_path = ?", ("a",))
+    assert len(queue) == 3
+
+    await queue.write_pending()
+    assert len(queue) == 0
+    cursor = await db_conn.execute("SELECT url_path, completed FROM media ORDER BY url_path")
+    assert [tuple(row) for row in await cursor.fetchall()] == [("a", 1), ("b", 0)]
+    assert db_conn.in_transaction
+
+    await queue.flush()
+    assert not db_conn.in_transaction
+
+
+async def test_write_queue_replaces_writes_with_the_same_key(db_conn: aiosqlite.Connection) -> None:
+    queue = WriteQueue(db_conn)
+    query = "UPDATE media SET file_size = ? WHERE url_path = ?"
+    queue.put("INSERT INTO media VALUES (?, 0, 0)", ("a",))
+    queue.put(query, (10, "a"), key="a")
+    queue.put(query, (20, "a"), key="a")
+    assert len(queue) == 2
+
+    await queue.close()
+    cursor = await db_conn.execute("SELECT file_size FROM media")
+    assert (await cursor.fetchone())[0] == 20  # type: ignore[reportOptionalSubscript]
+
+
+async def test_write_queue_retries_a_failed_batch(db_conn: aiosqlite.Connection) -> None:
+    queue = WriteQueue(db_conn)
+    queue.put("INSERT INTO media VALUES (?, 0, 0)", ("a",))
+    queue.put("INSERT INTO albums VALUES (?)", ("album",))
+    with pytest.raises(aiosqlite.OperationalError):
+        await queue.write_pending()
+
+    # Nothing from the failed batch was applied, and it is still pending
+    assert len(queue) == 2
+    cursor = await db_conn.execute("SELECT COUNT(*) FROM media")
+    assert (await cursor.fetchone())[0] == 0  # type: ignore[reportOptionalSubscript]
+
+    await db_conn.execute("CREATE TABLE albums (album_id TEXT)")
+    await queue.flush()
+    assert len(queue) == 0
+    cursor = await db_conn.execute("SELECT COUNT(*) FROM media")
+    assert (await cursor.fetchone())[0] == 1  # type: ignore[reportOptionalSubscript]
+
+
+async def test_write_queue_keeps_flushing_after_an_error(db_conn: aiosqlite.Connection) -> None:
+    queue = WriteQueue(db_conn, flush_interval=0.01)
+    queue.put("INSERT INTO albums VALUES (?)", ("album",))
+    queue.start()
+    await asyncio.sleep(0.05)
+    assert len(queue) == 1
+
+    await db_conn.execute("CREATE TABLE albums (album_id TEXT)")
+    await asyncio.sleep(0.05)
+    assert len(queue) == 0
+    assert not db_conn.in_transaction
+    await queue.close()
+
+
+def test_completed_index() -> None:
+    rows = [("bunkr", f"/file_{idx}", f"https://bunkr.cr/a/{idx}") for idx in range(100)]
+    index = CompletedIndex(rows)
+    assert len(index) == 100
+    assert index.get_referer("bunkr", "/file_50") == fingerprint("https://bunkr.cr/a/50")
+    assert index.get_referer("bunkr", "/file_100") is None
+    assert index.get_referer("gofile", "/file_50") is None
+
+    index.add("bunkr", "/file_100", None)
+    assert index.get_referer("bunkr", "/file_100") == UNKNOWN_REFERER
+    index.add("bunkr", "/file_50", "https://bunkr.cr/a/new")
+    assert index.get_referer("bunkr", "/file_50") == fingerprint("https://bunkr.cr/a/new")
+    assert len(index) == 101
+
+
+async def test_media_properties_cache(db_conn: aiosqlite.Connection, tmp_path: Path) -> None:
+    database = SimpleNamespace(_db_conn=db_conn, write_queue=WriteQueue(db_conn))
+    table = MediaPropertiesTable(database)  # type: ignore[reportArgumentType]
+    await table.startup()
+
+    file = tmp_path / "video.mp4"
+    file.write_bytes(b"0" * 100)
+    stat = file.stat()
+    stream = {
+        "index": 0,
+        "codec_type": "video",
+        "codec_name": "h264",
+        "width": 1920,
+        "height": 1080,
+        "avg_frame_rate": "30/1",
+        "tags": {"DURATION": "00:01:00.500000000", "encoder": "x264"},
+    }
+    assert await table.get(file, stat) is None
+    table.add(file, stat, {"streams": [stream]})  # type: ignore[reportArgumentType]
+
+    result = await table.get(file, stat)
+    assert result and (video := result.video)
+    assert (video.resolution, video.codec, str(video.fps), video.duration) == ("1920x1080", "h264", "30", 60.5)
+    assert dict(video.tags) == {"duration": "00:01:00.500000000"}
+
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert await table.get(file, file.stat()) is None
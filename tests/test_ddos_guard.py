@@ -0,0 +1,46 @@
+import pytest
+
+from cyberdrop_dl.clients import ddos_guard
+from cyberdrop_dl.utils import css
+
+CHALLENGE_PAGES = [
+    "<html><head><title>Just a moment...</title></head><body></body></html>",
+    "<html><head><title>DDoS-Guard</title></head><body></body></html>",
+    "<html><head><title>Attention Required! | Cloudflare</title></head><body></body></html>",
+    "<html><head><title>Page</title></head><body><div id='cf-please-wait'></div></body></html>",
+    "<html><body><span class='ray_id'>1234</span></body></html>",
+    "<html><head><script src='https://challenges.cloudflare.com/turnstile/v0/api.js'></script></head></html>",
+    "<html><body><script>alert('Dont open Developer Tools')</script></body></html>",
+]
+
+NORMAL_PAGES = [
+    "<html><head><title>Not Found</title></head><body><h1>404</h1></body></html>",
+    "<html><head><title>Post about ray_id</title></head><body><p>the ray_id of the page</p></body></html>",
+    "<html><body>" + "<p>filler</p>" * 5000 + "</body></html>",
+]
+
+
+@pytest.mark.parametrize("html", CHALLENGE_PAGES)
+def test_challenge_pages(html: str) -> None:
+    assert ddos_guard.is_challenge_page(html)
+    assert ddos_guard.check_soup(css.make_soup(html))
+
+
+@pytest.mark.parametrize("html", NORMAL_PAGES)
+def test_normal_pages(html: str) -> None:
+    assert not ddos_guard.is_challenge_page(html)
+    assert not ddos_guard.check_soup(css.make_soup(html))
+
+
+def test_quick_check() -> None:
+    assert ddos_guard.quick_check(CHALLENGE_PAGES[0]) is True
+    assert ddos_guard.quick_check(NORMAL_PAGES[0]) is False
+    # Markers need a full parse to confirm
+    assert ddos_guard.quick_check(NORMAL_PAGES[1]) is None
+    assert ddos_guard.quick_check(CHALLENGE_PAGES[3]) is None
+
+
+def test_title_outside_of_the_head() -> None:
+    html = "<html><head>" + "<meta name='x'>" * 1000 + "<title>Just a moment...</title></head></html>"
+    assert ddos_guard.quick_check(html) is None
+    assert ddos_guard.is_challenge_page(html)
@@ -0,0 +1,51 @@
+import asyncio
+
+from cyberdrop_dl.clients.download_limiter import AdaptiveDownloadLimiter
+from cyberdrop_dl.exceptions import DownloadError, SlowDownloadError
+
+
+async def test_limits_concurrency() -> None:
+    limiter = AdaptiveDownloadLimiter("example.com", 2)
+    running = max_running = 0
+
+    async def task() -> None:
+        nonlocal running, max_running
+        async with limiter:
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(task() for _ in range(6)))
+    assert max_running == 2
+    assert limiter.in_use == 0
+
+
+def test_aimd() -> None:
+    limiter = AdaptiveDownloadLimiter("example.com", 8)
+    limiter.record_error(DownloadError(404))
+    assert limiter.limit == 8
+
+    limiter.record_error(DownloadError(429))
+    assert limiter.limit == 4
+    limiter.record_error(SlowDownloadError())  # cooldown
+    assert limiter.limit == 4
+
+    for _ in range(4):
+        limiter.record_success()
+    assert limiter.limit == 5
+    assert limiter.is_throttled
+
+
+async def test_growing_limit_wakes_up_waiters() -> None:
+    limiter = AdaptiveDownloadLimiter("example.com", 2)
+    limiter.limit = 1
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    limiter.record_success()
+    await asyncio.sleep(0)
+    assert waiter.done()
+    assert limiter.in_use == 2
@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from cyberdrop_dl.clients.download_segments import MIN_SEGMENT_SIZE, SegmentedDownload, plan_segments
+
+
+def test_new_covers_whole_file() -> None:
+    state = SegmentedDownload.new(Path("file.part"), 1001, 4)
+    assert state.segments[0].start == 0
+    assert state.segments[-1].end == 1000
+    assert sum(segment.size for segment in state.segments) == 1001
+    for prev, next_ in zip(state.segments, state.segments[1:], strict=False):
+        assert next_.start == prev.end + 1
+
+
+def test_plan_segments() -> None:
+    assert plan_segments(MIN_SEGMENT_SIZE - 1, 8) == 1
+    assert plan_segments(MIN_SEGMENT_SIZE * 3, 8) == 3
+    assert plan_segments(MIN_SEGMENT_SIZE * 100, 8) == 8
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    file = tmp_path / "video.mp4.part"
+    state = SegmentedDownload.new(file, 100, 2)
+    state.preallocate()
+    state.segments[0].downloaded = 50
+    state.save()
+
+    loaded = SegmentedDownload.load(file, 100)
+    assert loaded is not None
+    assert loaded.downloaded == 50
+    assert len(loaded.pending) == 1
+    assert loaded.segments[1].range_header == "bytes=50-99"
+
+    assert SegmentedDownload.load(file, 200) is None
+    loaded.delete()
+    assert SegmentedDownload.load(file, 100) is None
@@ -0,0 +1,47 @@
+import hashlib
+from pathlib import Path
+
+import pytest
+import xxhash
+
+from cyberdrop_dl.clients.file_writer import FileWriter
+
+
+async def test_append_and_coalesce(tmp_path: Path) -> None:
+    file = tmp_path / "file.part"
+    file.write_bytes(b"abc")
+    async with FileWriter(file, buffer_size=4) as writer:
+        for chunk in (b"d", b"ef", b"ghi", b"j"):
+            await writer.write(chunk)
+    assert file.read_bytes() == b"abcdefghij"
+    assert writer.written == 7
+
+
+async def test_write_at_offset(tmp_path: Path) -> None:
+    file = tmp_path / "file.part"
+    file.write_bytes(b"0" * 10)
+    async with FileWriter(file, offset=4) as writer:
+        await writer.write(b"xyz")
+    assert file.read_bytes() == b"0000xyz000"
+
+
+async def test_flush_received_data_on_error(tmp_path: Path) -> None:
+    file = tmp_path / "file.part"
+    with pytest.raises(ValueError):
+        async with FileWriter(file) as writer:
+            await writer.write(b"data")
+            raise ValueError
+    assert file.read_bytes() == b"data"
+    assert writer.written == 4
+
+
+async def test_hash_written_data(tmp_path: Path) -> None:
+    file = tmp_path / "file.part"
+    chunks = [bytes([i]) * 1000 for i in range(20)]
+    hashers = xxhash.xxh128(), hashlib.md5()
+    async with FileWriter(file, buffer_size=2048, hashers=hashers) as writer:
+        for chunk in chunks:
+            await writer.write(chunk)
+    content = file.read_bytes()
+    assert hashers[0].hexdigest() == xxhash.xxh128(content).hexdigest()
+    assert hashers[1].hexdigest() == hashlib.md5(content).hexdigest()
@@ -3,10 +3,14 @@ from __future__ import annotations
 import sqlite3
 from collections import Counter
 from typing import TYPE_CHECKING
+from unittest import mock
 
 import pytest
+import xxhash
 
-from cyberdrop_dl.clients.hash_client import hash_directory_scanner
+from cyberdrop_dl.clients.hash_client import _get_partial_hashes, hash_directory_scanner
+from cyberdrop_dl.data_structures.hash import Hashing
+from cyberdrop_dl.managers.hash_manager import HashManager
 
 if TYPE_CHECKING:
     from pathlib import Path
@@ -66,3 +70,31 @@ def test_hash_directory_scanner(manager: Manager, expected_results: set[tuple[st
     results = get_hashes(db_path)
     assert len(results) == len(expected_results)
     assert results == expected_results
+
+
+def test_partial_hashes(tmp_path: Path) -> None:
+    small, small_copy = tmp_path / "small", tmp_path / "small_copy"
+    small.write_bytes(b"a" * 1000)
+    small_copy.write_bytes(b"a" * 1000)
+    partial_hashes = _get_partial_hashes([small, small_copy, tmp_path / "missing"], 1000)
+    # Small files are hashed entirely
+    assert partial_hashes == dict.fromkeys((small, small_copy), xxhash.xxh128(b"a" * 1000).hexdigest())
+
+    size = 1024 * 1024
+    big, same_ends, different_end = tmp_path / "big", tmp_path / "same_ends", tmp_path / "different_end"
+    big.write_bytes(b"\x00" * size)
+    same_ends.write_bytes(b"\x00" * (size // 2) + b"\x01" + b"\x00" * (size // 2 - 1))
+    different_end.write_bytes(b"\x00" * (size - 1) + b"\x01")
+    partial_hashes = _get_partial_hashes([big, same_ends, different_end], size)
+    assert partial_hashes[big] == partial_hashes[same_ends]
+    assert partial_hashes[big] != partial_hashes[different_end]
+
+
+@pytest.mark.parametrize(
+    "hashing, hash_while_downloading",
+    [(Hashing.OFF, False), (Hashing.IN_PLACE, True), (Hashing.POST_DOWNLOAD, False)],
+)
+def test_get_download_hashers(manager: Manager, hashing: Hashing, hash_while_downloading: bool) -> None:
+    manager.config_manager.settings_data.dupe_cleanup_options.hashing = hashing
+    hashers = HashManager(manager).get_download_hashers(mock.Mock())
+    assert bool(hashers) is hash_while_downloading
@@ -0,0 +1,62 @@
+import asyncio
+import random
+from pathlib import Path
+
+import pytest
+
+from cyberdrop_dl.clients.hls_stream import HlsStream, fetch_in_order
+
+
+def test_load_or_create_truncates_file(tmp_path: Path) -> None:
+    file = tmp_path / "video.video.ts"
+    state = HlsStream.load_or_create(file, 10)
+    assert (state.written, state.size) == (0, 0)
+    assert file.is_file()
+
+    file.write_bytes(b"a" * 150)
+    state.written, state.size = 3, 100
+    state.save()
+
+    # The last 50 bytes are from a segment that was not completely written
+    resumed = HlsStream.load_or_create(file, 10)
+    assert (resumed.written, resumed.size) == (3, 100)
+    assert file.stat().st_size == 100
+
+    assert HlsStream.load(file, 11) is None
+    resumed.delete()
+    assert HlsStream.load(file, 10) is None
+
+
+async def test_fetch_in_order() -> None:
+    running = max_running = 0
+
+    async def fetch(index: int) -> int:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(running, max_running)
+        await asyncio.sleep(random.random() / 100)
+        running -= 1
+        return index * 2
+
+    results = [result async for result in fetch_in_order(fetch, range(3, 50), 5)]
+    assert results == [(index, index * 2) for index in range(3, 50)]
+    assert max_running <= 5
+
+
+async def test_fetch_in_order_cancels_pending_on_error() -> None:
+    cancelled: list[int] = []
+
+    async def fetch(index: int) -> int:
+        if index == 1:
+            raise ValueError
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        return index
+
+    with pytest.raises(ValueError):
+        async for _ in fetch_in_order(fetch, range(1, 100), 4):
+            pass
+    assert sorted(cancelled) == [2, 3, 4]
@@ -0,0 +1,73 @@
+import random
+from typing import Any
+
+import pytest
+
+from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL
+from cyberdrop_dl.scraper import scrape_mapper
+from cyberdrop_dl.scraper.router import CrawlerRouter, DomainList, DomainMatcher
+
+
+def _linear_match(domains: dict[str, int], host: str) -> int | None:
+    matches = [domain for domain in domains if domain in host]
+    if not matches:
+        return None
+    return domains[max(matches, key=len)]
+
+
+def test_domain_matcher_matches_linear_scan() -> None:
+    rng = random.Random(0)
+
+    def word(min_len: int, max_len: int) -> str:
+        return "".join(rng.choice("abco.-") for _ in range(rng.randint(min_len, max_len)))
+
+    for _ in range(200):
+        domains = {domain: idx for idx, domain in enumerate(dict.fromkeys(word(1, 6) for _ in range(20)))}
+        matcher = DomainMatcher(domains)
+        for _ in range(50):
+            host = word(0, 25)
+            assert matcher.get(host) == _linear_match(domains, host)
+            assert (host in matcher) == any(domain in host for domain in domains)
+
+
+def test_domain_matcher_prefers_longest_domain() -> None:
+    matcher = DomainMatcher({"bunkr": 1, "bunkr.cr": 2, "kr.c": 3})
+    assert matcher.get("bunkr.cr") == 2
+    assert matcher.get("cdn.bunkrr.su") == 1
+    assert matcher.get("xkr.com") == 3
+    assert matcher.get("example.com") is None
+
+
+def test_domain_list() -> None:
+    domains = DomainList(["facebook", ".x.com"])
+    assert "m.facebook.com" in domains
+    assert "www.x.com" in domains
+    assert "x.com" not in domains
+    assert "example.com" not in DomainList([])
+
+
+_CRAWLERS: dict[str, Any] = {
+    domain: object()
+    for domain in ("bunkr", "bunkrr", "bunkr.cr", "pixeldrain", "reddit", "redd.it", "x.com", "cyberdrop")
+}
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://bunkr.cr/a/1",
+        "https://cdn.bunkrr.su/file.mp4",
+        "https://bunkr.site/f/abc",
+        "https://pixeldrain.com/u/abc",
+        "https://www.reddit.com/r/pics",
+        "https://i.redd.it/abc.jpg",
+        "https://some.unsupported.site.org",
+    ],
+)
+def test_crawler_router_matches_linear_scan(url: str) -> None:
+    router = CrawlerRouter(_CRAWLERS)
+    url_ = AbsoluteHttpURL(url)
+    expected = scrape_mapper.match_url_to_crawler(dict(_CRAWLERS), url_)
+    assert router.get(url_) is expected
+    # Cached result
+    assert router.get(url_) is expected
@@ -0,0 +1,31 @@
+from cyberdrop_dl.data_structures.url_objects import AbsoluteHttpURL, ScrapeItem
+
+PARENT_URL = AbsoluteHttpURL("https://forum.example.com/threads/thread.1")
+
+
+def test_copies_do_not_share_changes() -> None:
+    item = ScrapeItem(url=PARENT_URL)
+    item.add_parent_thread(PARENT_URL)
+    item.add_to_parent_title("thread")
+    child = item.create_child(AbsoluteHttpURL("https://host.example.com/a/1"))
+    assert child.parents == (PARENT_URL,)
+    assert item.parents == ()
+    assert child.parent_threads is item.parent_threads
+
+    other_thread = AbsoluteHttpURL("https://forum.example.com/threads/thread.2")
+    child.add_parent_thread(other_thread)
+    child.add_to_parent_title("album")
+    assert child.parent_threads == {PARENT_URL, other_thread}
+    assert item.parent_threads == {PARENT_URL}
+    assert child.parent_title == "thread/album"
+    assert item.parent_title == "thread"
+
+
+def test_copy_keeps_every_attribute() -> None:
+    item = ScrapeItem(url=PARENT_URL, album_id="abc", possible_datetime=10)
+    item.children_limits = [1, 2, 3, 4]
+    item.setup_as_album("album")
+    item.add_children()
+    new_item = item.copy()
+    assert new_item == item
+    assert new_item is not item
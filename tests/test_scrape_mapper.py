@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from typing import TYPE_CHECKING
 
 import pytest
@@ -55,3 +56,42 @@ def test_generic_crawlers_that_do_no_match_supported_crawlers_should_be_created(
     assert len(new_crawlers) == 1
     created_crawler = next(iter(new_crawlers))
     assert issubclass(type(created_crawler), TEST_BASE_CRAWLER)
+
+
+async def test_input_items_are_processed_through_a_bounded_queue(
+    running_manager: Manager, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    mapper = scrape_mapper.ScrapeMapper(running_manager)
+    size = running_manager.config_manager.global_settings_data.rate_limiting_options.input_queue_size
+    total_items = size * 5
+    created = started = 0
+    processed: list[int] = []
+    all_items_read = asyncio.Event()
+    runs: list[asyncio.Task[None]] = []
+
+    async def get_input_items():
+        nonlocal created
+        for idx in range(total_items):
+            created += 1
+            # The producer can never be ahead of the started items by more than the queue size (+ the item being sent)
+            assert created - started <= size + 1
+            yield idx
+        all_items_read.set()
+
+    async def send_to_crawler(item, *, on_start) -> None:
+        async def run() -> None:
+            nonlocal started
+            await asyncio.sleep(0)
+            started += 1
+            on_start()
+            # Crawlers may take a long time to finish. Started items must not block new ones
+            await all_items_read.wait()
+            processed.append(item)
+
+        runs.append(asyncio.create_task(run()))
+
+    monkeypatch.setattr(mapper, "get_input_items", get_input_items)
+    monkeypatch.setattr(mapper, "send_to_crawler", send_to_crawler)
+    await asyncio.wait_for(mapper.process_input_items(), timeout=5)
+    await asyncio.gather(*runs)
+    assert sorted(processed) == list(range(total_items))
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest import mock
+
+from cyberdrop_dl.utils.sorting import Sorter
+from cyberdrop_dl.utils.utilities import PartialsAndEmptyFoldersCheck
+from cyberdrop_dl.utils.walker import TreeWalker
+
+if TYPE_CHECKING:
+    from cyberdrop_dl.managers.manager import Manager
+
+
+async def test_sort_files_progress(manager: Manager) -> None:
+    manager.config.sorting.sort_workers = 2
+    manager.progress_manager = mock.Mock()
+    sort_progress = manager.progress_manager.sort_progress
+    sort_progress.add_task.side_effect = range(100)
+
+    download_folder = manager.path_manager.download_folder
+    files_per_folder = {"album_1": 7, "album_2": 0, "album_3": 3}
+    files_to_sort = {}
+    for folder_name, n_files in files_per_folder.items():
+        folder = download_folder / folder_name
+        folder.mkdir(parents=True)
+        files_to_sort[folder_name] = files = [folder / f"file_{i}.txt" for i in range(n_files)]
+        for file in files:
+            file.write_text(file.name, encoding="utf-8")
+
+    (download_folder / "album_3" / "file.part").touch()
+    files_to_sort["album_3"].append(download_folder / "album_3" / "file.part")
+
+    sorter = Sorter(manager)
+    await sorter._sort_files(files_to_sort)
+
+    assert sort_progress.add_task.call_count == len(files_per_folder)
+    assert sorted(call.args[0] for call in sort_progress.remove_task.call_args_list) == [0, 1, 2]
+    assert sort_progress.advance_folder.call_count == sum(files_per_folder.values()) + 1
+    assert sort_progress.increment_other.call_count == sum(files_per_folder.values())
+    assert sort_progress.set_queue_length.call_args.args == (0,)
+    for folder_name, n_files in files_per_folder.items():
+        sorted_files = sorted((manager.path_manager.sorted_folder / folder_name / "Other").glob("*"))
+        assert len(sorted_files) == n_files
+
+
+async def test_sort_only_files_of_this_run(manager: Manager) -> None:
+    manager.progress_manager = mock.Mock()
+    manager.live_manager = mock.MagicMock()
+    download_folder = manager.path_manager.download_folder
+    old_file, new_file = download_folder / "album/old.txt", download_folder / "album/new.txt"
+    new_file.parent.mkdir(parents=True)
+    old_file.write_text("old", encoding="utf-8")
+    new_file.write_text("new", encoding="utf-8")
+    (download_folder / "other_album").mkdir()
+
+    await Sorter(manager, [new_file, download_folder / "album/deleted.txt"]).run()
+
+    sorted_folder = manager.path_manager.sorted_folder / "album" / "Other"
+    assert [file.name for file in sorted_folder.iterdir()] == ["new.txt"]
+    assert old_file.is_file()
+    # Only the folders of the sorted files are purged
+    assert (download_folder / "other_album").is_dir()
+
+
+async def test_sort_and_check_share_a_single_walk(manager: Manager) -> None:
+    manager.config.runtime_options.delete_partial_files = True
+    manager.progress_manager = mock.Mock()
+    manager.live_manager = mock.MagicMock()
+    download_folder = manager.path_manager.download_folder
+    (download_folder / "album/empty").mkdir(parents=True)
+    (download_folder / "album/file.txt").write_text("file", encoding="utf-8")
+    (download_folder / "album/file.mp4.part").write_text("partial", encoding="utf-8")
+    (download_folder / "loose.txt").touch()
+
+    walker = TreeWalker(download_folder)
+    sorter = Sorter(manager)
+    assert sorter.subscribe(walker)
+    check = PartialsAndEmptyFoldersCheck(manager, walker)
+    with mock.patch.object(TreeWalker, "iter_batches", autospec=True, side_effect=TreeWalker.iter_batches) as walk:
+        await walker.run_async()
+        await sorter.run()
+        await check.run()
+
+    walk.assert_called_once()
+    sorted_folder = manager.path_manager.sorted_folder / "album" / "Other"
+    assert [file.name for file in sorted_folder.iterdir()] == ["file.txt"]
+    assert not (download_folder / "album").exists()
+    assert not (download_folder / "loose.txt").exists()
@@ -0,0 +1,95 @@
+import asyncio
+
+from cyberdrop_dl.scraper.scheduler import StageBudget, TaskScheduler
+
+
+async def test_stage_budget_limits_running_tasks() -> None:
+    budget = StageBudget("test", 3)
+    running = max_running = 0
+
+    async def task() -> None:
+        nonlocal running, max_running
+        await budget.acquire()
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        budget.release()
+
+    await asyncio.gather(*(task() for _ in range(10)))
+    assert max_running == 3
+    assert budget.running == budget.pending == 0
+
+
+async def test_stage_budget_limits_bytes() -> None:
+    budget = StageBudget("test", 10, max_bytes=100)
+    await budget.acquire(60)
+    # A single item bigger than the limit is allowed if nothing else is running
+    waiter = asyncio.create_task(budget.acquire(60))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    assert budget.pending == 1
+    budget.release(60)
+    await waiter
+    assert budget.running == 1
+    assert budget.bytes == 60
+
+
+async def test_cancelled_waiter_does_not_block_the_queue() -> None:
+    budget = StageBudget("test", 1)
+    await budget.acquire()
+    first = asyncio.create_task(budget.acquire())
+    second = asyncio.create_task(budget.acquire())
+    await asyncio.sleep(0)
+    first.cancel()
+    budget.release()
+    await second
+    assert budget.running == 1
+    assert budget.pending == 0
+
+
+async def test_scheduler_pauses_scrape_tasks_while_downloads_are_full() -> None:
+    events: list[str] = []
+    finish_download = asyncio.Event()
+
+    async def download() -> None:
+        await finish_download.wait()
+        events.append("download")
+
+    async def scrape() -> None:
+        events.append("scrape")
+
+    async with asyncio.TaskGroup() as task_group:
+        scheduler = TaskScheduler(task_group, max_scrape_tasks=5, max_downloads=1)
+        await scheduler.create_download_task(download())
+        await scheduler.create_scrape_task(scrape())
+        await asyncio.sleep(0.01)
+        assert events == []
+        assert scheduler.queue_depths()["scrape_waiting"] == 1
+        assert scheduler.is_throttled
+        finish_download.set()
+
+    assert events == ["download", "scrape"]
+    assert not scheduler.is_throttled
+
+
+async def test_scheduler_blocks_producers_while_too_many_scrape_tasks_are_pending() -> None:
+    pending: list[int] = []
+
+    async def child() -> None:
+        await asyncio.sleep(0)
+
+    async def producer() -> None:
+        # Runs as a scrape task, so it must give up its slot while blocked or the children could never start
+        for _ in range(50):
+            await scheduler.create_scrape_task(child())
+            pending.append(scheduler.queue_depths()["scrape_waiting"])
+
+    async with asyncio.TaskGroup() as task_group:
+        scheduler = TaskScheduler(task_group, max_scrape_tasks=1, max_downloads=1, max_pending_scrape_tasks=5)
+        await scheduler.create_scrape_task(producer())
+
+    assert len(pending) == 50
+    assert max(pending) == 5
+    assert scheduler.scrape.running == 0
+    assert not scheduler.is_throttled
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from cyberdrop_dl.utils.walker import TreeWalker, delete_empty_files
+
+if TYPE_CHECKING:
+    import os
+    from collections.abc import Sequence
+    from pathlib import Path
+
+
+def create_tree(root: Path) -> None:
+    for folder in ("a/b/c", "a/empty/nested", "d"):
+        (root / folder).mkdir(parents=True)
+    for file in ("a/file_1", "a/b/c/file_2", "d/file_3"):
+        (root / file).write_text(file, encoding="utf-8")
+    (root / "a/b/zero_bytes").touch()
+
+
+def test_tree_walker_subscribers(tmp_path: Path) -> None:
+    create_tree(tmp_path)
+    walker = TreeWalker(tmp_path, batch_size=2)
+    batch_sizes: list[int] = []
+    names: list[str] = []
+
+    def add_names(entries: Sequence[os.DirEntry[str]]) -> None:
+        names.extend(entry.name for entry in entries)
+
+    walker.subscribe(lambda entries: batch_sizes.append(len(entries)))
+    walker.subscribe(add_names)
+    walker.run()
+    assert sorted(names) == ["file_1", "file_2", "file_3", "zero_bytes"]
+    assert batch_sizes == [2, 2]
+    assert walker.directories[0] == str(tmp_path)
+    assert len(walker.directories) == 7
+    for index, folder in enumerate(walker.directories[1:], 1):
+        parent = str((tmp_path / folder).parent)
+        assert walker.directories.index(parent) < index
+
+
+def test_tree_walker_remove_empty_dirs(tmp_path: Path) -> None:
+    create_tree(tmp_path)
+    walker = TreeWalker(tmp_path)
+    walker.subscribe(delete_empty_files)
+    walker.run()
+    assert not walker.remove_empty_dirs()
+    assert not (tmp_path / "a/empty").exists()
+    assert not (tmp_path / "a/b/zero_bytes").exists()
+    assert (tmp_path / "a/b/c/file_2").is_file()
+
+    for file in tmp_path.rglob("file_*"):
+        file.unlink()
+    walker.run()
+    assert walker.remove_empty_dirs()
+    assert not tmp_path.exists()
+
+
+async def test_tree_walker_async(tmp_path: Path) -> None:
+    create_tree(tmp_path)
+    walker = TreeWalker(tmp_path, batch_size=3)
+    batches = [batch async for batch in walker.iter_batches_async()]
+    assert [len(batch) for batch in batches] == [3, 1]